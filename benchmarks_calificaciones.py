@@ -0,0 +1,2126 @@
+#Benchmarks y verificaciones del Sistema de Gestión de Calificaciones
+#Uso: python benchmarks_calificaciones.py <nombre> [opciones]
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import sistema_calificaciones_proyecto as sc
+from sistema_calificaciones_proyecto import ReglasLogicas, CodigoError
+
+
+def _columnas_aleatorias(filas: int, semilla: int = 42):
+    #columnas con valores cerca de los limites de cada regla
+    rnd = random.Random(semilla)
+    base = datetime(2025, 3, 1, 12, 0, 0)
+    notas = [rnd.choice([rnd.uniform(-1, 6), 0.0, 5.0, -0.0001, 5.0001, float("nan")])
+             for _ in range(filas)]
+    porcentajes = [rnd.choice([rnd.uniform(-10, 110), 0, 100, 100.0001, -0.0001])
+                   for _ in range(filas)]
+    justificaciones = [rnd.choice(["x" * rnd.randint(0, 40), " " * 5 + "y" * 19 + " " * 5,
+                                   "\t" + "z" * 20, "w" * 20 + "\n"])
+                       for _ in range(filas)]
+    fechas = [base - timedelta(seconds=rnd.randint(0, 8 * 86400)) for _ in range(filas)]
+    return notas, porcentajes, justificaciones, fechas, base
+
+
+def verificar_validadores(casos: int = 20000, semilla: int = 42) -> bool:
+    #propiedad: las versiones en lote coinciden con las reglas escalares fila a fila
+    notas, porcentajes, justificaciones, fechas, actual = _columnas_aleatorias(casos, semilla)
+    mascara, codigos = ReglasLogicas.validar_lote(
+        notas, porcentajes, justificaciones, fechas, actual, dias_limite=3
+    )
+
+    for i in range(casos):
+        esperado = CodigoError.NINGUNO
+        if not ReglasLogicas.validar_nota(notas[i]):
+            esperado |= CodigoError.NOTA_INVALIDA
+        if not ReglasLogicas.validar_porcentaje(porcentajes[i]):
+            esperado |= CodigoError.PORCENTAJE_INVALIDO
+        if not ReglasLogicas.validar_justificacion(justificaciones[i]):
+            esperado |= CodigoError.JUSTIFICACION_CORTA
+        if not ReglasLogicas.dentro_plazo_apelacion(fechas[i], actual, 3):
+            esperado |= CodigoError.FUERA_DE_PLAZO
+
+        if int(codigos[i]) != int(esperado) or bool(mascara[i]) != (esperado == 0):
+            print(f"✗ Fila {i}: lote={int(codigos[i])} escalar={int(esperado)} "
+                  f"({notas[i]!r}, {porcentajes[i]!r}, {justificaciones[i]!r}, {fechas[i]})")
+            return False
+
+    print(f"✓ {casos} filas: validacion en lote y escalar coinciden")
+    return True
+
+
+def benchmark_validadores(filas: int = 1_000_000) -> bool:
+    if not verificar_validadores():
+        return False
+
+    notas, porcentajes, justificaciones, fechas, actual = _columnas_aleatorias(filas)
+
+    inicio = time.perf_counter()
+    for i in range(filas):
+        codigo = CodigoError.NINGUNO
+        if not ReglasLogicas.validar_nota(notas[i]):
+            codigo |= CodigoError.NOTA_INVALIDA
+        if not ReglasLogicas.validar_porcentaje(porcentajes[i]):
+            codigo |= CodigoError.PORCENTAJE_INVALIDO
+        if not ReglasLogicas.validar_justificacion(justificaciones[i]):
+            codigo |= CodigoError.JUSTIFICACION_CORTA
+    t_escalar = time.perf_counter() - inicio
+
+    if sc.np is not None:
+        notas = sc.np.asarray(notas)
+        porcentajes = sc.np.asarray(porcentajes)
+        fechas = sc.np.asarray(fechas, dtype="datetime64[us]")
+
+    inicio = time.perf_counter()
+    ReglasLogicas.validar_lote(notas, porcentajes, justificaciones)
+    t_lote = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    ReglasLogicas.validar_lote(notas, porcentajes, justificaciones, fechas, actual)
+    t_lote_fechas = time.perf_counter() - inicio
+
+    motor = "NumPy" if sc.np is not None else "Python puro"
+    print(f"Validadores ({filas} filas, {motor}):")
+    print(f"  escalar fila por fila:  {t_escalar:8.3f} s")
+    print(f"  lote:                   {t_lote:8.3f} s  ({t_escalar / t_lote:.1f}x)")
+    print(f"  lote con plazo:         {t_lote_fechas:8.3f} s")
+    return True
+
+
+PALABRAS = ("parcial taller quiz exposicion proyecto laboratorio revision calculo "
+            "error procedimiento respuesta correcta incompleta ortografia formato "
+            "entrega tardia sustentacion grupo individual rubrica criterio puntos "
+            "ejercicio demostracion grafica informe codigo prueba").split()
+
+
+def _texto(rnd: random.Random, palabras: int) -> str:
+    #vocabulario comun mas un codigo de caso poco frecuente
+    comunes = " ".join(rnd.choice(PALABRAS) for _ in range(palabras))
+    return f"{comunes} caso{rnd.randint(0, 20000)}"
+
+
+def crear_datos_sinteticos(db_name: str, estudiantes: int = 2000, asignaturas: int = 60,
+                           profesores: int = 20, asignaturas_por_estudiante: int = 5,
+                           actividades_por_corte: int = 3, semilla: int = 42,
+                           cortes: int = 3) -> Dict:
+    #dataset de benchmark: cada inscripcion tiene notas en los primeros `cortes`
+    #cortes con porcentajes que suman 100%, mas historial y apelaciones de muestra
+    rnd = random.Random(semilla)
+    conn = sc.BaseDatos(db_name).obtener_conexion()
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM usuarios")
+    base_usuario = cursor.fetchone()[0]
+    cursor.executemany(
+        "INSERT INTO usuarios (username, password, rol, nombre_completo) VALUES (?, ?, ?, ?)",
+        [(f"prof_sint{i}", "pass123", "profesor", f"Profesor Sintético {i}")
+         for i in range(profesores)] +
+        [(f"est_sint{i}", "pass123", "estudiante", f"Estudiante Sintético {i}")
+         for i in range(estudiantes)]
+    )
+    ids_profesores = list(range(base_usuario + 1, base_usuario + 1 + profesores))
+    ids_estudiantes = list(range(base_usuario + 1 + profesores,
+                                 base_usuario + 1 + profesores + estudiantes))
+
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM asignaturas")
+    base_asignatura = cursor.fetchone()[0]
+    cursor.executemany(
+        "INSERT INTO asignaturas (codigo, nombre, creditos, profesor_id) VALUES (?, ?, ?, ?)",
+        [(f"SIN{base_asignatura + i:04d}", f"Asignatura Sintética {i}", rnd.randint(2, 5),
+          ids_profesores[i % profesores]) for i in range(asignaturas)]
+    )
+    ids_asignaturas = list(range(base_asignatura + 1, base_asignatura + 1 + asignaturas))
+    profesor_de = {a: ids_profesores[i % profesores] for i, a in enumerate(ids_asignaturas)}
+
+    inscripciones = []
+    for est in ids_estudiantes:
+        for asig in rnd.sample(ids_asignaturas, min(asignaturas_por_estudiante, asignaturas)):
+            inscripciones.append((est, asig, rnd.choice(["2024-2", "2025-1"])))
+    cursor.executemany(
+        "INSERT INTO inscripciones (estudiante_id, asignatura_id, periodo) VALUES (?, ?, ?)",
+        inscripciones
+    )
+
+    inicio_periodo = datetime(2025, 2, 1)
+    notas = []
+    for est, asig, periodo in inscripciones:
+        for corte in range(1, cortes + 1):
+            restante = 100.0
+            for k in range(actividades_por_corte):
+                porcentaje = (restante if k == actividades_por_corte - 1
+                              else float(rnd.choice([20, 25, 30, 35])))
+                restante -= porcentaje
+                fecha = inicio_periodo + timedelta(days=(corte - 1) * 35 + k * 10,
+                                                   minutes=rnd.randint(0, 1440))
+                notas.append((est, asig, corte, f"Actividad {corte}.{k + 1}",
+                              round(rnd.uniform(1.0, 5.0), 1), porcentaje,
+                              fecha.isoformat(), profesor_de[asig], _texto(rnd, 8)))
+    cursor.executemany('''
+        INSERT INTO notas (estudiante_id, asignatura_id, corte, actividad, nota,
+                          porcentaje, fecha_registro, profesor_id, justificacion)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', notas)
+
+    cursor.execute("SELECT id, estudiante_id, nota, fecha_registro, profesor_id FROM notas "
+                   "WHERE estudiante_id >= ?", (ids_estudiantes[0],))
+    historial, apelaciones = [], []
+    for nota_id, est, valor, fecha, profesor in cursor.fetchall():
+        if rnd.random() < 0.05:
+            creada = datetime.fromisoformat(fecha) + timedelta(days=rnd.randint(0, 4))
+            apelaciones.append((nota_id, est, _texto(rnd, 12),
+                                rnd.choice(["pendiente", "aprobada", "rechazada"]),
+                                creada.isoformat(), _texto(rnd, 10),
+                                (creada + timedelta(days=1)).isoformat()))
+        if rnd.random() < 0.10:
+            nueva = round(min(5.0, max(0.0, valor + rnd.choice([-0.5, 0.3, 0.5, 1.0]))), 1)
+            modificada = datetime.fromisoformat(fecha) + timedelta(days=rnd.randint(1, 20))
+            historial.append((nota_id, valor, nueva, modificada.isoformat(), profesor,
+                              _texto(rnd, 10)))
+    cursor.executemany('''
+        INSERT INTO apelaciones (nota_id, estudiante_id, descripcion, estado, fecha_creacion,
+                                 respuesta_profesor, fecha_respuesta)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', apelaciones)
+    cursor.executemany('''
+        INSERT INTO historial_modificaciones
+        (nota_id, nota_anterior, nota_nueva, fecha_modificacion, profesor_id, justificacion)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', historial)
+    cursor.executemany("UPDATE notas SET nota = ? WHERE id = ?",
+                       [(h[2], h[0]) for h in historial])
+
+    conn.commit()
+    conn.close()
+    return {"estudiantes": ids_estudiantes, "asignaturas": ids_asignaturas,
+            "profesores": ids_profesores, "inscripciones": inscripciones,
+            "notas": len(notas)}
+
+
+def generar_carga(host: str, puerto: int, rutas: List[Tuple[str, str]], concurrencia: int = 16,
+                  duracion: float = 10.0) -> Dict:
+    #cada hilo mantiene viva su conexion HTTP y repite rutas al azar, cada una
+    #con el token de su dueño; un 401/403 tambien es un error
+    latencias: List[float] = []
+    errores = [0]
+    candado = threading.Lock()
+    fin = time.perf_counter() + duracion
+
+    def cliente(semilla: int):
+        rnd = random.Random(semilla)
+        propias, fallidas = [], 0
+        conn = http.client.HTTPConnection(host, puerto, timeout=30)
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            try:
+                ruta, token = rnd.choice(rutas)
+                conn.request("GET", ruta, headers={"Authorization": f"Bearer {token}"})
+                respuesta = conn.getresponse()
+                respuesta.read()
+                if respuesta.status >= 500 or respuesta.status in (401, 403):
+                    fallidas += 1
+            except (OSError, http.client.HTTPException):
+                fallidas += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, puerto, timeout=30)
+                continue
+            propias.append(time.perf_counter() - inicio)
+        conn.close()
+        with candado:
+            latencias.extend(propias)
+            errores[0] += fallidas
+
+    hilos = [threading.Thread(target=cliente, args=(i,)) for i in range(concurrencia)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    transcurrido = time.perf_counter() - inicio
+
+    latencias.sort()
+
+    def percentil(p: float) -> float:
+        if not latencias:
+            return 0.0
+        return latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000
+
+    return {
+        "solicitudes": len(latencias),
+        "errores": errores[0],
+        "solicitudes_por_segundo": len(latencias) / transcurrido,
+        "p50_ms": percentil(0.50),
+        "p95_ms": percentil(0.95),
+        "p99_ms": percentil(0.99),
+        "max_ms": latencias[-1] * 1000 if latencias else 0.0,
+    }
+
+
+def benchmark_servidor(duracion: float = 10.0, concurrencia: int = 16,
+                       trabajadores: int = 8, url: Optional[str] = None) -> bool:
+    #sin url levanta un servidor local sobre el dataset de benchmark
+    with tempfile.TemporaryDirectory() as directorio:
+        servidor = None
+        if url:
+            host, _, puerto = url.replace("http://", "").rstrip("/").partition(":")
+            puerto = int(puerto or 80)
+            estudiantes, asignaturas = {3: "estudiante1", 4: "estudiante2"}, [1, 2, 3]
+        else:
+            db_name = os.path.join(directorio, "benchmark.db")
+            datos = crear_datos_sinteticos(db_name)
+            #cada estudiante solo puede leer lo suyo, asi que la carga usa la
+            #sesion de cada uno; pocos para no agotar el limite de intentos
+            estudiantes = {est: f"est_sint{i}" for i, est in enumerate(datos["estudiantes"][:20])}
+            asignaturas = datos["asignaturas"]
+            servidor = sc.ServidorCalificaciones(("127.0.0.1", 0), db_name, trabajadores)
+            host, puerto = servidor.server_address
+            threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+        try:
+            tokens = {}
+            for est, username in estudiantes.items():
+                conn = http.client.HTTPConnection(host, puerto, timeout=30)
+                conn.request("POST", "/sesiones", json.dumps(
+                    {"username": username, "password": "pass123"}),
+                    {"Content-Type": "application/json"})
+                tokens[est] = json.loads(conn.getresponse().read())["resultado"]["token"]
+                conn.close()
+
+            #Content-Length invalido o excesivo: 400/413 sin leer ni esperar el cuerpo
+            longitudes = {}
+            for longitud in ("-1", "abc", str(64 << 20)):
+                conn = http.client.HTTPConnection(host, puerto, timeout=5)
+                conn.request("POST", "/sesiones", b"{}", {"Content-Length": longitud})
+                longitudes[longitud] = conn.getresponse().status
+                conn.close()
+
+            rnd = random.Random(7)
+            rutas = []
+            for _ in range(500):
+                est, asig = rnd.choice(list(tokens)), rnd.choice(asignaturas)
+                rutas.extend((ruta, tokens[est]) for ruta in [
+                    f"/estudiantes/{est}/notas?asignatura_id={asig}",
+                    f"/estudiantes/{est}/asignaturas/{asig}/promedio",
+                    f"/estudiantes/{est}/asignaturas/{asig}/simulacion?nota_objetivo=3.5",
+                    f"/estudiantes/{est}/apelaciones",
+                ])
+            r = generar_carga(host, puerto, rutas, concurrencia, duracion)
+        finally:
+            if servidor:
+                servidor.shutdown()
+                servidor.server_close()
+
+    print(f"Servidor HTTP ({concurrencia} clientes, {duracion:.0f} s):")
+    print(f"  solicitudes: {r['solicitudes']}  errores: {r['errores']}")
+    print(f"  throughput:  {r['solicitudes_por_segundo']:.0f} req/s")
+    print(f"  latencia:    p50 {r['p50_ms']:.1f} ms | p95 {r['p95_ms']:.1f} ms | "
+          f"p99 {r['p99_ms']:.1f} ms | max {r['max_ms']:.1f} ms")
+    print("  Content-Length: " + ", ".join(f"{longitud} -> {estado}"
+                                          for longitud, estado in longitudes.items()))
+    return r["errores"] == 0 and list(longitudes.values()) == [400, 400, 413]
+
+
+def _token(procesador, username: str, password: str = "pass123") -> str:
+    #sesion para las operaciones de escritura de ProcesadorComandos
+    return procesador.ejecutar({"op": "autenticar", "username": username,
+                                "password": password})["resultado"]["token"]
+
+
+def _percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p * len(valores)))]
+
+
+def benchmark_escrituras(concurrencia: int = 32, filas: int = 4000) -> bool:
+    #notas/s y latencia por escritura: directo vs coalescedor con distintas ventanas
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "escrituras.db")
+        datos = crear_datos_sinteticos(db_name, estudiantes=200, asignaturas=10)
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+        db.activar_wal()
+        pares = [(est, asig) for est, asig, _ in datos["inscripciones"]]
+
+        def ejecutar(escritor) -> Dict:
+            por_hilo = filas // concurrencia
+            latencias: List[float] = []
+            errores = [0]
+            candado = threading.Lock()
+
+            def trabajador(semilla: int):
+                rnd = random.Random(semilla)
+                propias = []
+                for _ in range(por_hilo):
+                    est, asig = rnd.choice(pares)
+                    nota = sc.Nota(None, est, asig, rnd.randint(1, 3), "Bono", 4.0, 0.0,
+                                   datetime.now(), 1, "Bonificacion por asistencia")
+                    inicio = time.perf_counter()
+                    try:
+                        escritor.registrar_nota(nota)
+                    except Exception:
+                        with candado:
+                            errores[0] += 1
+                        continue
+                    propias.append(time.perf_counter() - inicio)
+                with candado:
+                    latencias.extend(propias)
+
+            hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(concurrencia)]
+            inicio = time.perf_counter()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            transcurrido = time.perf_counter() - inicio
+            return {"notas_por_segundo": len(latencias) / transcurrido, "errores": errores[0],
+                    "p50_ms": _percentil(latencias, 0.5) * 1000,
+                    "p99_ms": _percentil(latencias, 0.99) * 1000}
+
+        print(f"Registro de notas ({concurrencia} hilos, {filas} notas por prueba):")
+        print(f"  {'modo':<22} {'notas/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'lote prom':>10}")
+        r = ejecutar(db)
+        print(f"  {'directo':<22} {r['notas_por_segundo']:9.0f} {r['p50_ms']:8.2f} "
+              f"{r['p99_ms']:8.2f} {'1.0':>10}")
+        exito = r["errores"] == 0
+        for ventana in (0.0, 0.001, 0.002, 0.005, 0.010):
+            coalescedor = sc.CoalescedorEscrituras(db, max_lote=128, max_espera=ventana)
+            r = ejecutar(coalescedor)
+            coalescedor.cerrar()
+            promedio_lote = coalescedor.escrituras / max(1, coalescedor.lotes)
+            print(f"  {f'agrupado {ventana * 1000:.0f} ms':<22} {r['notas_por_segundo']:9.0f} "
+                  f"{r['p50_ms']:8.2f} {r['p99_ms']:8.2f} {promedio_lote:10.1f}")
+            exito = exito and r["errores"] == 0
+        #cerrado, una escritura falla de inmediato en lugar de quedar esperando
+        futuro = coalescedor.enviar_registro(sc.Nota(
+            None, 3, 1, 1, "Tras cerrar", 3.0, 0.0, datetime.now(), 1, "x" * 20))
+        cerrado = isinstance(futuro.exception(timeout=1.0), sqlite3.ProgrammingError)
+        print(f"  escritura tras cerrar: {'rechazada' if cerrado else 'NO RECHAZADA'}")
+        #si no se puede abrir la conexion del fragmento, ese lote falla y el
+        #hilo escritor sigue atendiendo los siguientes
+        abrir, fallos = db.obtener_conexion_escritura, [1]
+
+        def abrir_con_fallo(fragmento: int = 0):
+            if fallos[0]:
+                fallos[0] -= 1
+                raise sqlite3.OperationalError("unable to open database file")
+            return abrir(fragmento)
+
+        db.obtener_conexion_escritura = abrir_con_fallo
+        coalescedor = sc.CoalescedorEscrituras(db)
+        nota = sc.Nota(None, 3, 1, 1, "Tras el fallo", 3.0, 0.0, datetime.now(), 1, "x" * 20)
+        fallida = coalescedor.enviar_registro(nota).exception(timeout=5.0)
+        try:
+            recuperado = coalescedor.enviar_registro(nota).result(timeout=5.0) > 0
+        except Exception:
+            recuperado = False
+        coalescedor.cerrar()
+        del db.obtener_conexion_escritura
+        recuperado = recuperado and isinstance(fallida, sqlite3.OperationalError)
+        print(f"  fallo al abrir la conexión: "
+              f"{'lote rechazado, hilo activo' if recuperado else 'HILO DETENIDO'}")
+        db.cerrar()
+    return exito and cerrado and recuperado
+
+
+def benchmark_concurrencia_notas(concurrencia: int = 16, filas: int = 200) -> bool:
+    #prueba de estres: hilos que leen una nota y la incrementan con
+    #modificar_nota(version_esperada); al final cada incremento exitoso debe
+    #estar reflejado en la nota y en el historial, sin "database is locked"
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "concurrencia.db")
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+        db.activar_wal()
+        ids = [db.registrar_nota(sc.Nota(None, 3, 1, 1, f"Taller {i}", 0.0, 0.0, datetime.now(),
+                                         1, "Nota inicial para la prueba"))
+               for i in range(4)]
+        exitos = {nota_id: 0 for nota_id in ids}
+        conflictos = [0]
+        bloqueos: List[str] = []
+        candado = threading.Lock()
+
+        def trabajador(semilla: int):
+            rnd = random.Random(semilla)
+            for _ in range(filas):
+                nota_id = rnd.choice(ids)
+                while True:
+                    nota = db.obtener_nota(nota_id)
+                    try:
+                        db.modificar_nota(nota_id, round(nota.nota + 0.001, 3),
+                                          "Incremento de la prueba de estres", 1,
+                                          version_esperada=nota.version)
+                    except sc.ConflictoVersion:
+                        with candado:
+                            conflictos[0] += 1
+                        continue
+                    except sqlite3.OperationalError as e:
+                        with candado:
+                            bloqueos.append(str(e))
+                        break
+                    with candado:
+                        exitos[nota_id] += 1
+                    break
+
+        hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(concurrencia)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        transcurrido = time.perf_counter() - inicio
+
+        perdidas = 0
+        for nota_id in ids:
+            nota = db.obtener_nota(nota_id)
+            historial = db.obtener_historial_modificaciones(nota_id)
+            if (round(nota.nota, 3) != round(exitos[nota_id] * 0.001, 3)
+                    or len(historial) != exitos[nota_id] or nota.version != exitos[nota_id]):
+                perdidas += 1
+        db.cerrar()
+
+    total = sum(exitos.values())
+    print(f"Modificaciones concurrentes ({concurrencia} hilos sobre {len(ids)} notas):")
+    print(f"  exitosas: {total} en {transcurrido:.2f} s ({total / transcurrido:.0f}/s)")
+    print(f"  conflictos reintentados: {conflictos[0]}")
+    print(f"  errores de bloqueo: {len(bloqueos)}  notas inconsistentes: {perdidas}")
+    return not bloqueos and perdidas == 0
+
+
+def benchmark_busqueda(filas: int = 200) -> bool:
+    #FTS5 contra LIKE sobre el dataset sintetico; filas = consultas por modo
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "busqueda.db")
+        datos = crear_datos_sinteticos(db_name)
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+        if not db.fts_disponible:
+            print("✗ Esta compilación de SQLite no incluye FTS5")
+            return False
+
+        rnd = random.Random(3)
+        grupos = {
+            #terminos raros: el caso tipico de buscar un caso o un nombre concreto
+            "raros": [f"caso{rnd.randint(0, 20000)}" for _ in range(filas)],
+            #terminos que aparecen en buena parte de los textos
+            "comunes": [" ".join(rnd.sample(PALABRAS, 2)) for _ in range(filas)],
+        }
+        profesores = datos["profesores"]
+        resultados = {}
+        for grupo, consultas in grupos.items():
+            for nombre, buscar in (("FTS5", db.buscar_texto), ("LIKE", db.buscar_texto_like)):
+                tiempos = []
+                for i, consulta in enumerate(consultas):
+                    filtro = {"profesor_id": profesores[i % len(profesores)]} if i % 2 else {}
+                    inicio = time.perf_counter()
+                    buscar(consulta, limite=20, **filtro)
+                    tiempos.append(time.perf_counter() - inicio)
+                resultados[(grupo, nombre)] = tiempos
+        db.cerrar()
+
+    print(f"Búsqueda de texto ({datos['notas']} notas, {filas} consultas por grupo):")
+    for (grupo, nombre), tiempos in resultados.items():
+        print(f"  {grupo:<8} {nombre:<5} promedio {statistics.mean(tiempos) * 1000:8.2f} ms | "
+              f"p95 {_percentil(tiempos, 0.95) * 1000:8.2f} ms")
+    return True
+
+
+def benchmark_promedios_acumulados() -> bool:
+    #recalculo institucional del promedio por creditos: consulta agrupada sobre
+    #promedios materializados contra calcular_promedio_final por inscripcion
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "promedios.db")
+        datos = crear_datos_sinteticos(db_name)
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+        servicio = sc.ServicioCalificaciones(db)
+
+        inicio = time.perf_counter()
+        acumulados = servicio.calcular_promedios_acumulados()
+        t_lote = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        diferencias = 0
+        for est, asig, _ in datos["inscripciones"]:
+            esperado = servicio.calcular_promedio_final(est, asig)
+            conn = db._conexion()
+            materializado = conn.execute(
+                "SELECT promedio_final FROM promedios_asignatura "
+                "WHERE estudiante_id = ? AND asignatura_id = ?", (est, asig)).fetchone()[0]
+            if abs(esperado - materializado) > 0.005:
+                diferencias += 1
+        t_uno_a_uno = time.perf_counter() - inicio
+        db.cerrar()
+
+    print(f"Promedios acumulados ({len(acumulados)} estudiantes, "
+          f"{len(datos['inscripciones'])} inscripciones):")
+    print(f"  consulta agrupada:               {t_lote:8.3f} s")
+    print(f"  calcular_promedio_final c/u:     {t_uno_a_uno:8.3f} s")
+    print(f"  promedios materializados distintos al cálculo directo: {diferencias}")
+    return diferencias == 0
+
+
+def benchmark_ranking(filas: int = 5000) -> bool:
+    #ranking de cursos de miles de estudiantes con funciones de ventana contra
+    #calcular_promedio_final por estudiante y ordenamiento en Python
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "ranking.db")
+        datos = crear_datos_sinteticos(db_name, estudiantes=filas, asignaturas=4,
+                                       asignaturas_por_estudiante=2, actividades_por_corte=2)
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+        servicio = sc.ServicioCalificaciones(db)
+        asignatura = datos["asignaturas"][0]
+        inscritos = sorted({est for est, asig, _ in datos["inscripciones"] if asig == asignatura})
+
+        inicio = time.perf_counter()
+        directos = {est: servicio.calcular_promedio_final(est, asignatura) for est in inscritos}
+        ordenados = sorted(directos.values(), reverse=True)
+        t_directo = time.perf_counter() - inicio
+
+        tiempos_pagina = []
+        ranking = []
+        for desplazamiento in range(0, len(inscritos), 50):
+            inicio = time.perf_counter()
+            pagina = servicio.ranking_asignatura(asignatura, 50, desplazamiento)
+            tiempos_pagina.append(time.perf_counter() - inicio)
+            ranking.extend(pagina["estudiantes"])
+
+        tiempos_posicion = []
+        for est in inscritos[:200]:
+            inicio = time.perf_counter()
+            servicio.posicion_estudiante(est, asignatura)
+            tiempos_posicion.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        mejores = servicio.mejores_promedios(10)
+        t_mejores = time.perf_counter() - inicio
+        db.cerrar()
+
+    #posicion esperada: 1 + cantidad de promedios estrictamente mayores
+    errores = sum(1 for fila in ranking
+                  if abs(fila["promedio_final"] - directos[fila["estudiante_id"]]) > 0.005
+                  or fila["posicion"] != 1 + ordenados.index(directos[fila["estudiante_id"]]))
+    errores += len(inscritos) - len({fila["estudiante_id"] for fila in ranking})
+    print(f"Ranking de un curso de {len(inscritos)} estudiantes:")
+    print(f"  promedio final c/u + sort:  {t_directo * 1000:8.1f} ms")
+    print(f"  página de 50 (p50/p99):     {_percentil(tiempos_pagina, 0.5) * 1000:8.2f} / "
+          f"{_percentil(tiempos_pagina, 0.99) * 1000:.2f} ms")
+    print(f"  posición de un estudiante:  {_percentil(tiempos_posicion, 0.5) * 1000:8.2f} ms (p50)")
+    print(f"  top-10 institucional:       {t_mejores * 1000:8.2f} ms")
+    print(f"  filas con posición o promedio incorrecto: {errores}")
+    return errores == 0 and len(mejores) == 10
+
+
+def benchmark_alertas(filas: int = 20000) -> bool:
+    #proceso nocturno de alertas sobre ~5 inscripciones por estudiante con dos
+    #cortes calificados: ejecucion completa, incremental tras cambiar 1% de las
+    #notas y sin cambios; se contrasta con simular_nota_necesaria
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "alertas.db")
+        datos = crear_datos_sinteticos(db_name, estudiantes=filas, asignaturas=100,
+                                       actividades_por_corte=1, cortes=2)
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+        servicio = sc.ServicioCalificaciones(db)
+
+        inicio = time.perf_counter()
+        completo = servicio.actualizar_alertas()
+        t_completo = time.perf_counter() - inicio
+
+        rnd = random.Random(7)
+        conn = db._conexion()
+        ids = [fila[0] for fila in conn.execute(
+            "SELECT id FROM notas WHERE estudiante_id >= ?", (datos["estudiantes"][0],))]
+        cambiadas = rnd.sample(ids, len(ids) // 100)
+        conn.executemany("UPDATE notas SET nota = ? WHERE id = ?",
+                         [(round(rnd.uniform(0.0, 5.0), 1), nota_id) for nota_id in cambiadas])
+        conn.commit()
+
+        inicio = time.perf_counter()
+        incremental = servicio.actualizar_alertas()
+        t_incremental = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        sin_cambios = servicio.actualizar_alertas()
+        t_sin_cambios = time.perf_counter() - inicio
+
+        niveles = {(a["estudiante_id"], a["asignatura_id"]): a["nivel"]
+                   for a in servicio.obtener_alertas(limite=10 ** 9)}
+        errores = 0
+        for est, asig, _ in rnd.sample(datos["inscripciones"], 500):
+            simulacion = servicio.simular_nota_necesaria(est, asig, 3.0)
+            esperado = ("inalcanzable" if not simulacion["es_alcanzable"] else
+                        "riesgo" if simulacion["nota_necesaria"] > sc.ReglasLogicas.UMBRAL_ALERTA
+                        else None)
+            errores += niveles.get((est, asig)) != esperado
+
+        #al retirar la inscripcion su alerta desaparece con ella
+        alerta = servicio.obtener_alertas(limite=1)[0]
+        db.desinscribir([(alerta["estudiante_id"], alerta["asignatura_id"], alerta["periodo"])])
+        retirada = all((a["estudiante_id"], a["asignatura_id"])
+                       != (alerta["estudiante_id"], alerta["asignatura_id"])
+                       for a in servicio.obtener_alertas(asignatura_id=alerta["asignatura_id"],
+                                                         limite=10 ** 9))
+        db.cerrar()
+
+    print(f"Alertas sobre {completo['evaluadas']} inscripciones "
+          f"({completo['en_riesgo']} en riesgo, {completo['inalcanzables']} inalcanzables):")
+    print(f"  ejecución completa:          {t_completo:8.3f} s")
+    print(f"  incremental ({incremental['evaluadas']:>5} cambiadas): {t_incremental:8.3f} s")
+    print(f"  incremental sin cambios:     {t_sin_cambios:8.3f} s")
+    print(f"  inscripciones de muestra distintas a simular_nota_necesaria: {errores}")
+    print(f"  alerta tras retirar la inscripción: {'eliminada' if retirada else 'SE CONSERVA'}")
+    return (errores == 0 and retirada and sin_cambios["evaluadas"] == 0
+            and 0 < incremental["evaluadas"] <= len(cambiadas))
+
+
+def benchmark_fragmentos(concurrencia: int = 16, filas: int = 4000) -> bool:
+    #notas/s con 1, 4 y 8 archivos de notas, con journal por defecto y en WAL:
+    #cada hilo escribe en su propia asignatura y las asignaturas se reparten
+    #entre los fragmentos
+    exito = True
+    print(f"Registro de notas fragmentado ({concurrencia} hilos, {filas} notas por prueba):")
+    print(f"  {'journal':<9} {'fragmentos':<12} {'notas/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for journal, fragmentos in [(j, f) for j in ("delete", "wal") for f in (1, 4, 8)]:
+        with tempfile.TemporaryDirectory() as directorio:
+            db = sc.BaseDatosFragmentada(os.path.join(directorio, "catalogo.db"), fragmentos,
+                                         reutilizar_conexion=True)
+            if journal == "wal":
+                db.activar_wal()
+            conn = db._conexion()
+            cursor = conn.execute("SELECT COALESCE(MAX(id), 0) FROM asignaturas")
+            base = cursor.fetchone()[0]
+            conn.executemany(
+                "INSERT INTO asignaturas (codigo, nombre, creditos, profesor_id) VALUES (?, ?, ?, 1)",
+                [(f"FRG{i:03d}", f"Asignatura {i}", 3) for i in range(concurrencia)]
+            )
+            conn.commit()
+            asignaturas = list(range(base + 1, base + 1 + concurrencia))
+            latencias: List[float] = []
+            errores = [0]
+            candado = threading.Lock()
+
+            def trabajador(asignatura: int):
+                propias = []
+                for i in range(filas // concurrencia):
+                    nota = sc.Nota(None, 3 + i % 50, asignatura, 1 + i % 3, "Bono", 4.0, 0.0,
+                                   datetime.now(), 1, "Bonificacion por asistencia")
+                    inicio = time.perf_counter()
+                    try:
+                        db.registrar_nota(nota)
+                    except Exception:
+                        with candado:
+                            errores[0] += 1
+                        continue
+                    propias.append(time.perf_counter() - inicio)
+                with candado:
+                    latencias.extend(propias)
+
+            hilos = [threading.Thread(target=trabajador, args=(a,)) for a in asignaturas]
+            inicio = time.perf_counter()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            transcurrido = time.perf_counter() - inicio
+
+            #cada nota quedo en el fragmento de su asignatura y su id lo indica
+            mal_ubicadas = 0
+            for k, esquema in db._esquemas_notas():
+                for nota_id, asignatura in db._conexion().execute(
+                        f"SELECT id, asignatura_id FROM {esquema}.notas"):
+                    mal_ubicadas += (db.fragmento_de(asignatura_id=asignatura) != k
+                                     or db.fragmento_de(id_registro=nota_id) != k)
+            db.cerrar()
+
+        print(f"  {journal:<9} {fragmentos:<12} {len(latencias) / transcurrido:9.0f} "
+              f"{_percentil(latencias, 0.5) * 1000:8.2f} {_percentil(latencias, 0.99) * 1000:8.2f}")
+        exito = exito and errores[0] == 0 and mal_ubicadas == 0 and \
+            len(latencias) == filas // concurrencia * concurrencia
+
+    #las vistas ocultarian notas: una base de un solo archivo abierta con
+    #fragmentos, o un catalogo abierto con menos fragmentos de los que usa
+    with tempfile.TemporaryDirectory() as directorio:
+        unico = os.path.join(directorio, "unico.db")
+        db = sc.BaseDatos(unico)
+        db.registrar_nota(sc.Nota(None, 3, 1, 1, "Bono", 4.0, 0.0, datetime.now(), 1,
+                                  "Bonificacion por asistencia"))
+        catalogo = os.path.join(directorio, "catalogo.db")
+        db = sc.BaseDatosFragmentada(catalogo, 4)
+        db.asignar_fragmento(1, 3)
+        rechazos = {}
+        for nombre, archivo, fragmentos in (("un solo archivo", unico, 2),
+                                             ("menos fragmentos", catalogo, 2)):
+            try:
+                sc.BaseDatosFragmentada(archivo, fragmentos).inicializar()
+                rechazos[nombre] = False
+            except ValueError:
+                rechazos[nombre] = True
+        sc.BaseDatosFragmentada(catalogo, 4).inicializar()
+    print("  aperturas incompatibles rechazadas: "
+          + ", ".join(f"{nombre} {'sí' if ok else 'NO'}" for nombre, ok in rechazos.items()))
+    return exito and all(rechazos.values())
+
+
+def _huella(db_name: str) -> Tuple:
+    #conteos y sumas de las tablas base y derivadas, para comparar copias
+    conn = sqlite3.connect(db_name)
+    huella = tuple(conn.execute(consulta).fetchone() for consulta in (
+        "SELECT COUNT(*), TOTAL(nota), TOTAL(version) FROM notas",
+        "SELECT COUNT(*), TOTAL(nota_nueva) FROM historial_modificaciones",
+        "SELECT COUNT(*), TOTAL(id) FROM apelaciones",
+        "SELECT COUNT(*), TOTAL(promedio_final) FROM promedios_asignatura",
+        "SELECT COUNT(*), TOTAL(suma_ponderada) FROM totales_corte",
+    ))
+    conn.close()
+    return huella
+
+
+def benchmark_respaldo(concurrencia: int = 4, duracion: float = 2.0) -> bool:
+    #latencia de registrar_nota sin respaldo y durante un respaldo en linea,
+    #y restauracion de completo + incremental contra la base original, tambien
+    #sobre una base en uso con su -wal. El registro de cambios solo crece
+    #despues de activarlo y un respaldo completo suelto no corta la cadena
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "respaldo.db")
+        datos = crear_datos_sinteticos(db_name)
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+        db.activar_wal()
+        pares = [(est, asig) for est, asig, _ in datos["inscripciones"]]
+        detener = threading.Event()
+        latencias: List[float] = []
+        candado = threading.Lock()
+
+        def escritor(semilla: int):
+            rnd = random.Random(semilla)
+            propias = []
+            while not detener.is_set():
+                est, asig = rnd.choice(pares)
+                inicio = time.perf_counter()
+                nota_id = db.registrar_nota(sc.Nota(None, est, asig, rnd.randint(1, 3), "Bono",
+                                                    4.0, 0.0, datetime.now(), 1,
+                                                    "Bonificacion por asistencia"))
+                if rnd.random() < 0.3:
+                    db.modificar_nota(nota_id, 4.5, "Ajuste de bonificacion por asistencia", 1)
+                propias.append(time.perf_counter() - inicio)
+            with candado:
+                latencias.extend(propias)
+
+        def medir(accion) -> Tuple[List[float], Any]:
+            latencias.clear()
+            detener.clear()
+            hilos = [threading.Thread(target=escritor, args=(i,)) for i in range(concurrencia)]
+            for hilo in hilos:
+                hilo.start()
+            resultado = accion()
+            detener.set()
+            for hilo in hilos:
+                hilo.join()
+            return list(latencias), resultado
+
+        sin_respaldo, _ = medir(lambda: time.sleep(duracion))
+        conn = db._conexion()
+        sin_registro = conn.execute("SELECT COUNT(*) FROM registro_cambios").fetchone()[0]
+        try:
+            db.respaldar_cambios(os.path.join(directorio, "sin_base.jsonl"))
+            sin_base_rechazado = False
+        except ValueError:
+            sin_base_rechazado = True
+        durante, completo = medir(lambda: db.respaldar(
+            os.path.join(directorio, "completo.db"), paginas=64, pausa=0.001, comprimir=True,
+            registrar_cambios=True)[0])
+        _, suelto = medir(lambda: db.respaldar(os.path.join(directorio, "suelto.db"))[0])
+        _, _ = medir(lambda: time.sleep(duracion / 2))
+        incremental = db.respaldar_cambios(os.path.join(directorio, "cambios.jsonl"))[0]
+        db.cerrar()
+
+        #la restauracion escribe sobre una base abierta con marcos sin
+        #aplicar en su -wal, que no deben reaparecer
+        restaurada = os.path.join(directorio, "restaurada.db")
+        sc.restaurar_respaldo(suelto["destino"], [], restaurada)
+        en_uso = sqlite3.connect(restaurada)
+        en_uso.execute("PRAGMA journal_mode=WAL")
+        en_uso.execute("PRAGMA wal_autocheckpoint=0")
+        en_uso.execute("DELETE FROM notas WHERE id % 2 = 0")
+        en_uso.commit()
+        restauracion = sc.restaurar_respaldo(completo["destino"], [incremental["destino"]],
+                                             restaurada)
+        en_uso.close()
+        coincide = _huella(db_name) == _huella(restaurada)
+        try:
+            sc.restaurar_respaldo(completo["destino"], [], os.path.join(directorio, "x.db"))
+            sin_incremental_distinta = _huella(os.path.join(directorio, "x.db")) != _huella(db_name)
+        except ValueError:
+            sin_incremental_distinta = False
+        tamano = os.path.getsize(db_name) / 2 ** 20
+        comprimido = os.path.getsize(completo["destino"]) / 2 ** 20
+
+    print(f"Respaldo en línea ({concurrencia} escritores, base de {tamano:.1f} MB):")
+    print(f"  escrituras sin respaldo:  {len(sin_respaldo) / duracion:7.0f}/s  "
+          f"p50 {_percentil(sin_respaldo, 0.5) * 1000:6.2f} ms  "
+          f"p99 {_percentil(sin_respaldo, 0.99) * 1000:6.2f} ms")
+    print(f"  durante el respaldo:      {len(durante) / completo['segundos']:7.0f}/s  "
+          f"p50 {_percentil(durante, 0.5) * 1000:6.2f} ms  "
+          f"p99 {_percentil(durante, 0.99) * 1000:6.2f} ms")
+    print(f"  respaldo completo:        {completo['segundos']:.2f} s, {completo['pasos']} pasos, "
+          f"{comprimido:.1f} MB comprimido")
+    print(f"  incremental:              {incremental['cambios']} cambios")
+    print(f"  restauración:             {restauracion['cambios_aplicados']} cambios aplicados, "
+          f"{'coincide' if coincide else 'NO coincide'} con la base original")
+    print(f"  registro sin activar:     {sin_registro} cambios, incremental sin base "
+          f"{'rechazado' if sin_base_rechazado else 'NO rechazado'}")
+    return (coincide and sin_incremental_distinta and len(durante) > 0
+            and sin_registro == 0 and sin_base_rechazado)
+
+
+def benchmark_perfil(consultas: int = 400) -> bool:
+    #costo de --perfil sobre una carga de consultas del servicio y forma de
+    #la salida: cada pila colapsada empieza en un metodo del servicio
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "perfil.db")
+        datos = crear_datos_sinteticos(db_name)
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+        muestra = random.Random(3).sample(datos["inscripciones"], consultas)
+
+        def carga(servicio: sc.ServicioCalificaciones) -> float:
+            inicio = time.perf_counter()
+            for est, asig, _ in muestra:
+                servicio.calcular_promedio_final(est, asig)
+                servicio.simular_nota_necesaria(est, asig, 3.0)
+                servicio.posicion_estudiante(est, asig)
+                servicio.obtener_expediente(est)
+            return time.perf_counter() - inicio
+
+        carga(sc.ServicioCalificaciones(db))
+        sin_perfil = min(carga(sc.ServicioCalificaciones(db)) for _ in range(3))
+        perfilador = sc.Perfilador(os.path.join(directorio, "perfil"))
+        perfilador.iniciar()
+        servicio = perfilador.instrumentar(sc.ServicioCalificaciones(db))
+        con_perfil = min(carga(servicio) for _ in range(3))
+        archivos = perfilador.detener()
+        db.cerrar()
+
+        with open(os.path.join(directorio, "perfil.collapsed"), encoding="utf-8") as entrada:
+            pilas = [linea.rsplit(" ", 1) for linea in entrada.read().splitlines()]
+        raices = {pila.split(";", 1)[0] for pila, _ in pilas}
+        with open(os.path.join(directorio, "perfil.txt"), encoding="utf-8") as entrada:
+            resumen = entrada.read()
+
+    llamadas = perfilador.secciones["ServicioCalificaciones.calcular_promedio_final"][0]
+    print(f"Perfilado de {consultas} x 4 consultas del servicio:")
+    print(f"  sin perfil:  {sin_perfil:.3f} s")
+    print(f"  con perfil:  {con_perfil:.3f} s  ({(con_perfil / sin_perfil - 1) * 100:+.0f}%)")
+    print(f"  {sum(int(n) for _, n in pilas)} muestras en {len(pilas)} pilas distintas, "
+          f"raíces: {', '.join(sorted(raices))}")
+    print(f"  archivos: {', '.join(os.path.basename(a) for a in archivos)}")
+    return (len(archivos) == 3 and bool(pilas)
+            and all(r.startswith("ServicioCalificaciones.") for r in raices)
+            and "calcular_promedio_final" in resumen
+            and llamadas >= 3 * consultas)
+
+
+def benchmark_inscripciones(estudiantes: int = 500) -> bool:
+    #inscripcion masiva de un curso, registro de una nota por estudiante con
+    #el roster en cache (contando consultas a inscripciones) y migracion de
+    #una base con inscripciones duplicadas
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "inscripciones.db")
+        datos = crear_datos_sinteticos(db_name, estudiantes=estudiantes, asignaturas=2,
+                                       asignaturas_por_estudiante=1, cortes=1)
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+        procesador = sc.ProcesadorComandos(db)
+        asignatura = datos["asignaturas"][0]
+        curso = datos["estudiantes"]
+        #prof_sint0 dicta la primera asignatura sintetica
+        token = _token(procesador, "prof_sint0")
+
+        inicio = time.perf_counter()
+        conn = db._conexion()
+        for est in curso:
+            conn.execute("INSERT OR IGNORE INTO inscripciones (estudiante_id, asignatura_id, "
+                         "periodo) VALUES (?, ?, '2025-2')", (est, asignatura))
+            conn.commit()
+        t_individual = time.perf_counter() - inicio
+        conn.execute("DELETE FROM inscripciones WHERE periodo = '2025-2'")
+        conn.commit()
+
+        inicio = time.perf_counter()
+        inscritas = procesador.ejecutar({"op": "inscribir", "asignatura_id": asignatura,
+                                         "estudiante_ids": curso, "periodo": "2025-2",
+                                         "token": token})
+        t_masivo = time.perf_counter() - inicio
+        repetida = db.inscribir([(est, asignatura, "2025-2") for est in curso])
+        try:
+            db.inscribir([(curso[0], asignatura, "2026-1"), (1, asignatura, "2026-1")])
+            rechazada = False
+        except ValueError:
+            rechazada = True
+        parcial = conn.execute(
+            "SELECT COUNT(*) FROM inscripciones WHERE periodo = '2026-1'").fetchone()[0]
+
+        consultas = []
+        conn.set_trace_callback(lambda sql: consultas.append(sql)
+                                if "FROM inscripciones" in sql else None)
+
+        def registrar_curso(cache: bool) -> Tuple[float, List[Dict]]:
+            #como InterfazCLI.registrar_nota: roster de la asignatura y luego la nota;
+            #sin cache se consulta el roster en cada nota, como antes
+            inicio = time.perf_counter()
+            respuestas = []
+            for est in curso:
+                if not cache:
+                    db.invalidar_rosters([asignatura])
+                db.obtener_estudiantes_asignatura(asignatura)
+                respuestas.append(procesador.ejecutar({
+                    "op": "registrar_nota", "estudiante_id": est, "asignatura_id": asignatura,
+                    "corte": 2, "actividad": "Parcial 2", "nota": 4.0, "porcentaje": 1.0,
+                    "justificacion": "Nota del segundo parcial del curso",
+                    "token": token}))
+            return time.perf_counter() - inicio, respuestas
+
+        db.invalidar_rosters()
+        t_cache, respuestas = registrar_curso(cache=True)
+        consultas_cache = len(consultas)
+        consultas.clear()
+        t_sin_cache, _ = registrar_curso(cache=False)
+        consultas_sin_cache = len(consultas)
+        conn.set_trace_callback(None)
+
+        retiradas = procesador.ejecutar({"op": "desinscribir", "asignatura_id": asignatura,
+                                         "estudiante_ids": curso[:100], "periodo": "2025-2",
+                                         "token": token})
+        roster = db.obtener_estudiantes_asignatura(asignatura)
+        fuera = procesador.ejecutar({"op": "registrar_nota", "estudiante_id": 3,
+                                     "asignatura_id": asignatura, "corte": 1, "actividad": "X",
+                                     "nota": 3.0, "porcentaje": 1.0,
+                                     "justificacion": "Estudiante que no esta inscrito",
+                                     "token": token})
+        esperado = len({est for est, asig, _ in datos["inscripciones"]
+                        if asig == asignatura} | set(curso[100:]))
+
+        #otro proceso retira y vuelve a inscribir: la cache lo ve sin invalidar
+        externo = sqlite3.connect(db_name)
+        externo.execute("DELETE FROM inscripciones WHERE estudiante_id = ? AND asignatura_id = ?",
+                        (curso[100], asignatura))
+        externo.commit()
+        retiro_externo = not db.esta_inscrito(curso[100], asignatura)
+        externo.execute("INSERT INTO inscripciones (estudiante_id, asignatura_id, periodo) "
+                        "VALUES (?, ?, '2025-2')", (curso[100], asignatura))
+        externo.commit()
+        externo.close()
+        inscripcion_externa = db.esta_inscrito(curso[100], asignatura)
+        db.cerrar()
+
+        #base anterior a la restriccion: quitar el indice y duplicar filas
+        conn = sqlite3.connect(db_name)
+        conn.execute("DROP INDEX idx_inscripciones_unica")
+        conn.execute("PRAGMA user_version = 0")
+        conn.execute("INSERT INTO inscripciones (estudiante_id, asignatura_id, periodo) "
+                     "SELECT estudiante_id, asignatura_id, periodo FROM inscripciones")
+        conn.commit()
+        antes = conn.execute("SELECT COUNT(*) FROM inscripciones").fetchone()[0]
+        inicio = time.perf_counter()
+        sc.BaseDatos(db_name).inicializar()
+        t_migracion = time.perf_counter() - inicio
+        despues = conn.execute("SELECT COUNT(*) FROM inscripciones").fetchone()[0]
+        conn.close()
+
+    print(f"Inscripción de {len(curso)} estudiantes en una asignatura:")
+    print(f"  una transacción por inscripción: {t_individual * 1000:8.1f} ms")
+    print(f"  inscribir masivo:                {t_masivo * 1000:8.1f} ms  {inscritas['resultado']}")
+    print(f"  repetido:                        {repetida}")
+    print(f"  lote con un no estudiante:       {'rechazado' if rechazada else 'ACEPTADO'}, "
+          f"{parcial} filas parciales")
+    print("Registro de una nota por estudiante (consultas a inscripciones):")
+    print(f"  roster en cache:  {t_cache * 1000:8.1f} ms  {consultas_cache:5d} consultas")
+    print(f"  sin cache:        {t_sin_cache * 1000:8.1f} ms  {consultas_sin_cache:5d} consultas")
+    print(f"  retiro de 100:    {retiradas['resultado']}, roster de {len(roster)} "
+          f"(esperado {esperado})")
+    print(f"  cambios de otro proceso vistos por la cache: retiro "
+          f"{'sí' if retiro_externo else 'NO'}, inscripción {'sí' if inscripcion_externa else 'NO'}")
+    print(f"Migración: {antes} -> {despues} inscripciones en {t_migracion * 1000:.1f} ms")
+    return (inscritas["resultado"] == {"inscritas": len(curso), "existentes": 0}
+            and repetida == {"inscritas": 0, "existentes": len(curso)}
+            and rechazada and parcial == 0 and all(r["ok"] for r in respuestas) and not fuera["ok"]
+            and consultas_cache == 1 and consultas_sin_cache >= len(curso)
+            and retiradas["resultado"]["retiradas"] == 100 and len(roster) == esperado
+            and retiro_externo and inscripcion_externa and despues * 2 == antes)
+
+
+_ARRANQUE = r"""
+import json, os, sys, time
+inicio = time.perf_counter()
+{importar}
+t_import = time.perf_counter() - inicio
+pesados = [m for m in ("sqlite3", "http.server", "numpy", "cProfile") if m in sys.modules]
+t_crear = t_consulta = None
+if {db!r}:
+    inicio = time.perf_counter()
+    app = InterfazCLI({db!r})
+    t_crear = time.perf_counter() - inicio
+    creada = os.path.exists({db!r})
+    inicio = time.perf_counter()
+    app.db.autenticar_usuario("profesor1", "pass123")
+    t_consulta = time.perf_counter() - inicio
+    pesados.append("archivo" if creada else "")
+print(json.dumps([t_import, t_crear, t_consulta, pesados]))
+"""
+
+
+def benchmark_arranque(repeticiones: int = 7, limite_ms: float = 100.0) -> bool:
+    #costo de arranque en interpretes nuevos: importar solo las reglas, el
+    #modulo de compatibilidad, y crear InterfazCLI + primera consulta sobre
+    #una base nueva y una existente. Falla si una capa liviana arrastra
+    #SQLite, HTTP, NumPy o cProfile, si crear InterfazCLI toca el archivo, o si
+    #importar las reglas supera limite_ms
+    import json
+    import subprocess
+
+    def medir(importar: str, db: str = "") -> List:
+        codigo = _ARRANQUE.format(importar=importar, db=db)
+        salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True,
+                                check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return json.loads(salida.stdout)
+
+    casos = {
+        "from calificaciones import ReglasLogicas":
+            ("from calificaciones import ReglasLogicas", ["sqlite3", "http.server", "numpy",
+                                                          "cProfile"]),
+        "import sistema_calificaciones_proyecto (ReglasLogicas)":
+            ("import sistema_calificaciones_proyecto as sc; sc.ReglasLogicas",
+             ["sqlite3", "http.server", "numpy", "cProfile"]),
+        "from calificaciones import Nota, Apelacion":
+            ("from calificaciones import Nota, Apelacion", ["sqlite3", "http.server", "numpy"]),
+        "from calificaciones import ServicioCalificaciones":
+            ("from calificaciones import ServicioCalificaciones", ["http.server", "numpy"]),
+    }
+    correcto = True
+    print(f"Arranque (mediana de {repeticiones} intérpretes nuevos):")
+    for nombre, (importar, prohibidos) in casos.items():
+        resultados = [medir(importar) for _ in range(repeticiones)]
+        t_import = statistics.median(r[0] for r in resultados)
+        cargados = sorted(set(m for r in resultados for m in r[3] if m in prohibidos))
+        correcto &= not cargados
+        print(f"  {nombre:<55} {t_import * 1000:7.2f} ms"
+              + (f"  (carga {', '.join(cargados)})" if cargados else ""))
+        if "ReglasLogicas" in nombre and t_import * 1000 > limite_ms:
+            correcto = False
+
+    with tempfile.TemporaryDirectory() as directorio:
+        importar = "from calificaciones.cli import InterfazCLI"
+        nuevas, existentes = [], []
+        for i in range(repeticiones):
+            db_name = os.path.join(directorio, f"arranque{i}.db")
+            nuevas.append(medir(importar, db_name))
+            existentes.append(medir(importar, db_name))
+    for nombre, resultados in (("base nueva", nuevas), ("base existente", existentes)):
+        t_import = statistics.median(r[0] for r in resultados)
+        t_crear = statistics.median(r[1] for r in resultados)
+        t_consulta = statistics.median(r[2] for r in resultados)
+        toca_archivo = "archivo" in resultados[0][3]
+        http = any("http.server" in r[3] for r in resultados)
+        print(f"  InterfazCLI, {nombre:<15} importar {t_import * 1000:6.2f} ms, "
+              f"crear {t_crear * 1000:6.3f} ms, primera consulta {t_consulta * 1000:6.2f} ms"
+              + ("  (crear toca el archivo)" if toca_archivo and nombre == "base nueva" else "")
+              + ("  (carga http.server)" if http else ""))
+        correcto &= not http and not (toca_archivo and nombre == "base nueva")
+    return correcto
+
+
+def benchmark_autenticacion(duracion: float = 3.0, atacantes: int = 8,
+                            legitimos: int = 4) -> bool:
+    #rafaga de intentos fallidos (contra un usuario y rociando usuarios desde
+    #un mismo origen) mientras usuarios legitimos inician sesion: consultas que
+    #llegan a BaseDatos y latencia legitima, sin limite y con limite. Luego
+    #rendimiento y vencimiento de los almacenes de sesiones
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "autenticacion.db")
+        datos = crear_datos_sinteticos(db_name, estudiantes=1000, asignaturas=5,
+                                       asignaturas_por_estudiante=1, cortes=1)
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+        consultas = [0]
+        original = db.autenticar_usuario
+
+        def contar(username: str, password: str):
+            consultas[0] += 1
+            return original(username, password)
+        db.autenticar_usuario = contar
+
+        def rafaga(autenticacion: sc.ServicioAutenticacion) -> Dict:
+            procesador = sc.ProcesadorComandos(db, autenticacion=autenticacion)
+            detener = threading.Event()
+            latencias: List[float] = []
+            rechazos = [0]
+            fallidos_legitimos = [0]
+            candado = threading.Lock()
+
+            def atacante(i: int):
+                rnd = random.Random(i)
+                while not detener.is_set():
+                    usuario = "est_sint0" if i % 2 else f"est_sint{rnd.randint(0, 999)}"
+                    r = procesador.ejecutar({"op": "autenticar", "username": usuario,
+                                             "password": "incorrecta"}, origen="10.0.0.66")
+                    if "reintentar_en" in r:
+                        with candado:
+                            rechazos[0] += 1
+
+            def legitimo(i: int):
+                rnd = random.Random(100 + i)
+                propias = []
+                while not detener.is_set():
+                    usuario = f"est_sint{rnd.randint(1, 999)}"
+                    inicio = time.perf_counter()
+                    r = procesador.ejecutar({"op": "autenticar", "username": usuario,
+                                             "password": "pass123"}, origen=f"10.1.0.{i}")
+                    propias.append(time.perf_counter() - inicio)
+                    if not (r["ok"] and r["resultado"]):
+                        with candado:
+                            fallidos_legitimos[0] += 1
+                    time.sleep(0.002)
+                with candado:
+                    latencias.extend(propias)
+
+            consultas[0] = 0
+            hilos = ([threading.Thread(target=atacante, args=(i,)) for i in range(atacantes)] +
+                     [threading.Thread(target=legitimo, args=(i,)) for i in range(legitimos)])
+            for hilo in hilos:
+                hilo.start()
+            time.sleep(duracion)
+            detener.set()
+            for hilo in hilos:
+                hilo.join()
+            return {"consultas": consultas[0], "rechazos": rechazos[0],
+                    "legitimos": len(latencias), "fallidos": fallidos_legitimos[0],
+                    "p50": _percentil(latencias, 0.5), "p99": _percentil(latencias, 0.99)}
+
+        sin_limite = sc.LimitadorIntentos(capacidad=float("inf"))
+        libre = rafaga(sc.ServicioAutenticacion(db, por_usuario=sin_limite,
+                                                por_origen=sc.LimitadorIntentos(float("inf"))))
+        limitado = rafaga(sc.ServicioAutenticacion(db))
+
+        #las escrituras exigen una sesion valida y solo actuan sobre lo propio
+        procesador = sc.ProcesadorComandos(db)
+        marcar = {"op": "marcar_notificaciones_leidas", "usuario_id": datos["estudiantes"][0]}
+        token = _token(procesador, "est_sint0")
+        escrituras = {
+            "sin token": procesador.ejecutar(marcar).get("no_autenticado"),
+            "token inválido": procesador.ejecutar({**marcar, "token": "x"}).get("no_autenticado"),
+            "ajena": procesador.ejecutar({**marcar, "usuario_id": datos["estudiantes"][1],
+                                          "token": token}).get("prohibido"),
+            "propia": procesador.ejecutar({**marcar, "token": token})["ok"],
+        }
+        #notas y apelaciones: solo el profesor de la nota, nunca un estudiante
+        nota = db.obtener_notas_estudiante(datos["estudiantes"][0])[0]
+        indice = datos["profesores"].index(nota.profesor_id)
+        propio = _token(procesador, f"prof_sint{indice}")
+        ajeno = _token(procesador, f"prof_sint{(indice + 1) % len(datos['profesores'])}")
+        modificar = {"op": "modificar_nota", "nota_id": nota.id, "nueva_nota": 4.0,
+                     "justificacion": "Corrección tras revisar el procedimiento"}
+        apelacion_id = db.crear_apelacion(sc.Apelacion(
+            None, nota.id, nota.estudiante_id, "Solicito revisión de la nota del corte",
+            sc.EstadoApelacion.PENDIENTE, datetime.now(), None, None))
+        responder = {"op": "responder_apelacion", "apelacion_id": apelacion_id,
+                     "estado": "aprobada", "respuesta": "Se corrigió la nota tras revisarla"}
+        escrituras.update({
+            "nota como estudiante": procesador.ejecutar({
+                "op": "registrar_nota", "estudiante_id": nota.estudiante_id,
+                "asignatura_id": nota.asignatura_id, "corte": 1, "actividad": "Quiz",
+                "nota": 5.0, "porcentaje": 1.0, "justificacion": "Nota puesta por el estudiante",
+                "token": token}).get("prohibido"),
+            "nota ajena": procesador.ejecutar({**modificar, "token": ajeno}).get("prohibido"),
+            "en nombre de otro": procesador.ejecutar({
+                **modificar, "profesor_id": nota.profesor_id, "token": ajeno}).get("prohibido"),
+            "apelación ajena": procesador.ejecutar({**responder, "token": ajeno}).get("prohibido"),
+            "apelación propia": procesador.ejecutar({**responder, "token": propio})["ok"],
+            "nota propia": procesador.ejecutar({**modificar, "token": propio})["ok"],
+        })
+        #las lecturas tambien: cada estudiante lo suyo, cada profesor sus asignaturas
+        leer = {"op": "notas_estudiante", "estudiante_id": nota.estudiante_id}
+        otro = datos["estudiantes"][1]
+        visibles = procesador.ejecutar({**leer, "token": propio})
+        avisos = {"op": "notificaciones", "usuario_id": nota.estudiante_id}
+        lecturas = {
+            "sin token": procesador.ejecutar(leer).get("no_autenticado"),
+            "de otro estudiante": procesador.ejecutar({
+                **leer, "estudiante_id": otro, "token": token}).get("prohibido"),
+            "propias": procesador.ejecutar({**leer, "token": token})["ok"],
+            "del profesor": procesador.ejecutar({
+                **leer, "asignatura_id": nota.asignatura_id, "token": propio})["ok"],
+            "de otro profesor": procesador.ejecutar({
+                **leer, "asignatura_id": nota.asignatura_id, "token": ajeno}).get("prohibido"),
+            "solo sus asignaturas": visibles["ok"] and nota.asignatura_id in {
+                n["asignatura_id"] for n in visibles["resultado"]} <= {
+                fila[0] for fila in db.obtener_asignaturas_profesor(nota.profesor_id)},
+            "avisos ajenos": procesador.ejecutar({**avisos, "token": propio}).get("prohibido"),
+            "avisos propios": procesador.ejecutar({**avisos, "token": token})["ok"],
+            "métricas sin token": procesador.ejecutar({"op": "memoria"}).get("no_autenticado"),
+            "métricas como estudiante": procesador.ejecutar({
+                "op": "memoria", "token": token}).get("prohibido"),
+        }
+        db.cerrar()
+
+        #almacenes de sesiones con un reloj simulado
+        ahora = [1_000_000.0]
+        usuario = sc.Usuario(datos["estudiantes"][0], "est_sint0", "pass123", "estudiante",
+                             "Estudiante Sintético 0")
+        almacenes = {
+            "memoria": sc.AlmacenSesionesMemoria(ttl=600, reloj=lambda: ahora[0]),
+            "SQLite": sc.AlmacenSesionesSQLite(os.path.join(directorio, "sesiones.db"),
+                                               ttl=600, reloj=lambda: ahora[0]),
+        }
+        resultados_sesiones = {}
+        for nombre, almacen in almacenes.items():
+            inicio = time.perf_counter()
+            tokens = [almacen.crear(usuario) for _ in range(5000)]
+            t_crear = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            validas = sum(almacen.obtener(token) is not None for token in tokens * 4)
+            t_obtener = time.perf_counter() - inicio
+            sin_clave = almacen.obtener(tokens[0]).password == ""
+            ahora[0] += 400
+            renovada = almacen.obtener(tokens[1]) is not None
+            ahora[0] += 400
+            #solo tokens[1] se renovo; las demas vencieron (memoria ya descarto
+            #tokens[2] al consultarla, por eso puede purgar una menos)
+            sigue = almacen.obtener(tokens[1]) is not None
+            vencida = almacen.obtener(tokens[2]) is None
+            purgadas = almacen.purgar()
+            resultados_sesiones[nombre] = (t_crear, t_obtener, validas, purgadas, len(almacen),
+                                           sin_clave and renovada and sigue and vencida)
+        almacenes["SQLite"].cerrar_conexion()
+
+    print(f"Ráfaga de autenticación ({atacantes} atacantes, {legitimos} usuarios legítimos, "
+          f"{duracion:.0f} s):")
+    print(f"  {'':12} {'consultas a BaseDatos':>22} {'rechazados':>11} {'legítimos':>10} "
+          f"{'p50 ms':>8} {'p99 ms':>8}")
+    for nombre, r in (("sin límite", libre), ("con límite", limitado)):
+        print(f"  {nombre:12} {r['consultas']:>22} {r['rechazos']:>11} {r['legitimos']:>10} "
+              f"{r['p50'] * 1000:8.2f} {r['p99'] * 1000:8.2f}")
+    print("Sesiones (5000 creadas, 20000 consultas):")
+    for nombre, (t_crear, t_obtener, validas, purgadas, restantes, ok) in \
+            resultados_sesiones.items():
+        print(f"  {nombre:8} crear {5000 / t_crear:9.0f}/s  obtener {20000 / t_obtener:9.0f}/s  "
+              f"purgadas {purgadas} (quedan {restantes})  vencimiento "
+              f"{'correcto' if ok else 'INCORRECTO'}")
+    print("Escrituras: " + ", ".join(f"{caso} {'correcto' if ok else 'INCORRECTO'}"
+                                     for caso, ok in escrituras.items()))
+    print("Lecturas: " + ", ".join(f"{caso} {'correcto' if ok else 'INCORRECTO'}"
+                                   for caso, ok in lecturas.items()))
+    #con limite, los atacantes solo gastan las fichas iniciales y las que se rellenan
+    return (limitado["fallidos"] == 0 and libre["fallidos"] == 0 and all(escrituras.values())
+            and all(lecturas.values())
+            and limitado["consultas"] - limitado["legitimos"] < 200
+            and all(r[2] == 20000 and r[3] >= 4998 and r[4] == 1 and r[5]
+                    for r in resultados_sesiones.values()))
+
+
+def _historial_sintetico(db_name: str, desde: int, hasta: int, por_dia: int = 500,
+                         semilla: int = 3):
+    #modificaciones desde..hasta a ritmo constante a partir del 1 de marzo de
+    #2025, sobre notas al azar e insertadas en desorden; ~1% son saltos grandes
+    #y 0.2% van acompañadas de una apelacion
+    rnd = random.Random(semilla + desde)
+    conn = sqlite3.connect(db_name)
+    notas = conn.execute("SELECT id, nota, profesor_id, estudiante_id FROM notas").fetchall()
+    inicio = datetime(2025, 3, 1)
+    paso = 86400 / por_dia
+    historial, apelaciones = [], []
+    for i in range(desde, hasta):
+        nota_id, valor, profesor, estudiante = rnd.choice(notas)
+        fecha = (inicio + timedelta(seconds=i * paso + rnd.uniform(0, paso))).isoformat()
+        cambio = rnd.choice([-3.0, 3.0]) if rnd.random() < 0.01 else rnd.uniform(-0.5, 0.5)
+        historial.append((nota_id, valor, round(min(5.0, max(0.0, valor + cambio)), 1), fecha,
+                          profesor, "ajuste sintético"))
+        if rnd.random() < 0.002:
+            apelaciones.append((nota_id, estudiante, "apelación sintética", "pendiente", fecha))
+    rnd.shuffle(historial)
+    conn.executemany('''
+        INSERT INTO historial_modificaciones
+        (nota_id, nota_anterior, nota_nueva, fecha_modificacion, profesor_id, justificacion)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', historial)
+    conn.executemany('''
+        INSERT INTO apelaciones (nota_id, estudiante_id, descripcion, estado, fecha_creacion)
+        VALUES (?, ?, ?, ?, ?)
+    ''', apelaciones)
+    conn.commit()
+    conn.close()
+
+
+def _hallazgos_referencia(db_name: str, analizador) -> Dict[str, set]:
+    #las mismas reglas que AnalizadorHistorial calculadas con todo el historial
+    #en memoria: ids de modificacion (salto, edicion_tardia), notas
+    #(ediciones_repetidas) e ids de apelacion (rafaga_tras_apelacion)
+    conn = sqlite3.connect(db_name)
+    segundos = lambda fecha: (datetime.fromisoformat(fecha) - datetime(1970, 1, 1)).total_seconds()
+    modificaciones = [(segundos(f), h, nota, asig, ant, nueva, segundos(registro))
+                      for f, h, nota, asig, ant, nueva, registro in conn.execute('''
+        SELECT h.fecha_modificacion, h.id, h.nota_id, n.asignatura_id, h.nota_anterior,
+               h.nota_nueva, n.fecha_registro
+        FROM historial_modificaciones h JOIN notas n ON n.id = h.nota_id
+    ''')]
+    apelaciones = [(segundos(f), a, nota, asig) for f, a, nota, asig in conn.execute(
+        "SELECT a.fecha_creacion, a.id, a.nota_id, n.asignatura_id "
+        "FROM apelaciones a JOIN notas n ON n.id = a.nota_id")]
+    conn.close()
+
+    referencia = {tipo: set() for tipo in analizador.TIPOS}
+    por_nota: Dict[int, List[float]] = {}
+    por_asignatura: Dict[int, List[Tuple[float, int]]] = {}
+    for t, h, nota, asig, ant, nueva, registro in modificaciones:
+        if abs(nueva - ant) >= analizador.salto_minimo:
+            referencia["salto"].add(h)
+        if t - registro >= analizador.dias_tardia * 86400:
+            referencia["edicion_tardia"].add(h)
+        por_nota.setdefault(nota, []).append(t)
+        por_asignatura.setdefault(asig, []).append((t, nota))
+    k = analizador.ediciones_maximas
+    for nota, tiempos in por_nota.items():
+        tiempos.sort()
+        if any(tiempos[i + k - 1] - tiempos[i] < analizador.dias_ventana * 86400
+               for i in range(len(tiempos) - k + 1)):
+            referencia["ediciones_repetidas"].add(nota)
+    for t, a, nota, asig in apelaciones:
+        otras = sum(1 for tm, nm in por_asignatura.get(asig, ())
+                    if t <= tm < t + analizador.horas_apelacion * 3600 and nm != nota)
+        if otras >= analizador.ediciones_rafaga:
+            referencia["rafaga_tras_apelacion"].add(a)
+    return referencia
+
+
+def benchmark_auditoria(filas: int = 400_000) -> bool:
+    #analisis del historial con filas/4 y luego filas modificaciones al mismo
+    #ritmo diario: el tiempo debe crecer con las filas y la memoria maxima de
+    #Python no (depende de lo que cabe en las ventanas). El primer analisis se
+    #contrasta con un calculo ingenuo con todo el historial en memoria
+    import tracemalloc
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "auditoria.db")
+        crear_datos_sinteticos(db_name, estudiantes=3000, asignaturas=200, profesores=40,
+                               asignaturas_por_estudiante=4, cortes=1)
+        db = sc.BaseDatos(db_name)
+        resultados = []
+        diferencias = 0
+        for parte, (desde, hasta) in enumerate(((0, filas // 4), (filas // 4, filas))):
+            _historial_sintetico(db_name, desde, hasta)
+            analizador = sc.AnalizadorHistorial(db)
+            resumen = analizador.ejecutar()
+            #tracemalloc hace mas lenta cada asignacion: la memoria se mide aparte
+            tracemalloc.start()
+            analizador.ejecutar()
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            resultados.append((resumen, pico))
+            if parte == 0:
+                referencia = _hallazgos_referencia(db_name, analizador)
+                hallazgos = analizador.obtener_hallazgos(limite=10 ** 9)
+                columna = {"salto": "historial_id", "edicion_tardia": "historial_id",
+                           "ediciones_repetidas": "nota_id",
+                           "rafaga_tras_apelacion": "apelacion_id"}
+                for tipo, esperados in referencia.items():
+                    obtenidos = {h[columna[tipo]] for h in hallazgos if h["tipo"] == tipo}
+                    diferencias += len(obtenidos ^ esperados)
+                print(f"Contraste con el cálculo en memoria ({resumen['modificaciones']} "
+                      f"modificaciones): {diferencias} diferencias")
+
+    print(f"{'modificaciones':>15} {'apelaciones':>12} {'hallazgos':>10} {'segundos':>9} "
+          f"{'filas/s':>9} {'memoria máx.':>13}")
+    for resumen, pico in resultados:
+        print(f"{resumen['modificaciones']:>15} {resumen['apelaciones']:>12} "
+              f"{resumen['hallazgos']:>10} {resumen['segundos']:>9.2f} "
+              f"{resumen['modificaciones'] / resumen['segundos']:>9.0f} "
+              f"{pico / 1024:>10.0f} KB")
+    print("  por tipo: " + ", ".join(f"{tipo} {n}"
+                                     for tipo, n in resultados[-1][0]["por_tipo"].items()))
+    (pequeno, pico_pequeno), (grande, pico_grande) = resultados
+    return (diferencias == 0 and grande["modificaciones"] > 3 * pequeno["modificaciones"]
+            and pico_grande < 2 * pico_pequeno)
+
+
+def _serie_referencia(db_name: str, asignatura_id: int, dias: List[str]) -> Dict[str, List]:
+    #notas de la asignatura al cierre de cada dia, reconstruidas desde las notas
+    #y el historial: el valor original y luego cada modificacion hasta ese dia
+    conn = sqlite3.connect(db_name)
+    notas = conn.execute("SELECT id, fecha_registro, nota FROM notas WHERE asignatura_id = ?",
+                         (asignatura_id,)).fetchall()
+    cambios: Dict[int, List[Tuple]] = {}
+    for nota_id, fecha, anterior, nueva in conn.execute('''
+        SELECT h.nota_id, h.fecha_modificacion, h.nota_anterior, h.nota_nueva
+        FROM historial_modificaciones h JOIN notas n ON n.id = h.nota_id
+        WHERE n.asignatura_id = ? ORDER BY h.id
+    ''', (asignatura_id,)):
+        cambios.setdefault(nota_id, []).append((fecha[:10], anterior, nueva))
+    conn.close()
+    valores: Dict[str, List] = {}
+    for dia in dias:
+        valores[dia] = []
+        for nota_id, registro, actual in notas:
+            if registro[:10] > dia:
+                continue
+            historial = cambios.get(nota_id, [])
+            valor = historial[0][1] if historial else actual
+            for fecha, _, nueva in historial:
+                if fecha <= dia:
+                    valor = nueva
+            valores[dia].append(valor)
+    return valores
+
+
+def benchmark_series(estudiantes: int = 3000, consultas: int = 50) -> bool:
+    #series diarias y semanales por asignatura: construccion completa,
+    #actualizacion incremental tras registrar y modificar notas, y consultas de
+    #todo el periodo contra reconstruirlo desde las notas crudas
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "series.db")
+        datos = crear_datos_sinteticos(db_name, estudiantes=estudiantes, asignaturas=60,
+                                       cortes=2)
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+        servicio = sc.ServicioCalificaciones(db)
+
+        inicio = time.perf_counter()
+        completo = servicio.actualizar_series()
+        t_completo = time.perf_counter() - inicio
+
+        rnd = random.Random(11)
+        nuevas = []
+        for est, asig, _ in rnd.sample(datos["inscripciones"], 500):
+            nuevas.append(db.registrar_nota(sc.Nota(
+                None, est, asig, 3, "Actividad 3.1", round(rnd.uniform(0.0, 5.0), 1), 30.0,
+                datetime(2025, 4, 20) + timedelta(days=rnd.randint(0, 20)), 1,
+                "Registro de la actividad del tercer corte")))
+        for nota_id in rnd.sample(nuevas, 100):
+            db.modificar_nota(nota_id, round(rnd.uniform(0.0, 5.0), 1),
+                              "Corrección tras revisar la actividad con el estudiante", 1)
+        inicio = time.perf_counter()
+        incremental = servicio.actualizar_series()
+        t_incremental = time.perf_counter() - inicio
+        sin_cambios = servicio.actualizar_series()
+
+        asignaturas = rnd.sample(datos["asignaturas"], 5)
+        inicio = time.perf_counter()
+        for k in range(consultas):
+            servicio.serie_asignatura(asignaturas[k % len(asignaturas)])
+        t_consulta = (time.perf_counter() - inicio) / consultas
+
+        #la serie incremental debe coincidir con la reconstruida y con las notas
+        diferencias = 0
+        series = {asig: servicio.serie_asignatura(asig) for asig in asignaturas}
+        servicio.actualizar_series(completo=True)
+        campos = ("cantidad", "promedio", "mediana", "p25", "p75", "aprobados")
+        for asig, serie in series.items():
+            diferencias += serie != servicio.serie_asignatura(asig)
+            muestra = rnd.sample(serie, min(8, len(serie)))
+            inicio = time.perf_counter()
+            referencia = _serie_referencia(db_name, asig, [p["fecha"] for p in muestra])
+            t_referencia = (time.perf_counter() - inicio) / len(muestra)
+            for punto in muestra:
+                valores = referencia[punto["fecha"]]
+                if not valores:
+                    diferencias += punto["cantidad"] != 0
+                    continue
+                p25, mediana, p75 = statistics.quantiles(valores, n=4, method="inclusive")
+                esperado = {"cantidad": len(valores),
+                            "promedio": round(statistics.fmean(valores), 2),
+                            "mediana": round(mediana, 2), "p25": round(p25, 2),
+                            "p75": round(p75, 2),
+                            "aprobados": round(100 * sum(v >= 3.0 for v in valores)
+                                               / len(valores), 1)}
+                diferencias += any(abs(punto[c] - esperado[c]) > 0.011 for c in campos)
+        semanal = servicio.serie_asignatura(asignaturas[0], paso="semana")
+        diarias = servicio.serie_asignatura(asignaturas[0])
+        diferencias += semanal[-1]["cantidad"] != diarias[-1]["cantidad"]
+
+        #una nota fuera de [0, 5] se rechaza al escribirla; si ya estaba en la
+        #base (escrita antes de validar), la serie la cuenta en el tramo extremo
+        est, asig, _ = next(i for i in datos["inscripciones"] if i[1] == asignaturas[0])
+        fuera = sc.Nota(None, est, asig, 3, "Fuera de rango", 7.5, 0.0,
+                        datetime(2025, 5, 30), 1, "Nota registrada fuera del rango válido")
+        try:
+            db.registrar_nota(fuera)
+            rechazada = False
+        except ValueError:
+            rechazada = True
+        conn = db._conexion()
+        conn.execute("INSERT INTO notas (estudiante_id, asignatura_id, corte, actividad, nota, "
+                     "porcentaje, fecha_registro, profesor_id, justificacion) "
+                     "VALUES (?, ?, 3, 'Heredada', 7.5, 0.0, '2025-05-30T00:00:00', 1, ?)",
+                     (est, asig, fuera.justificacion))
+        conn.commit()
+        servicio.actualizar_series()
+        try:
+            ultimo = servicio.serie_asignatura(asig)[-1]
+            heredada = ultimo["cantidad"] == diarias[-1]["cantidad"] + 1
+        except IndexError:
+            heredada = False
+        print(f"  nota fuera de rango: {'rechazada' if rechazada else 'ACEPTADA'} al registrar, "
+              f"{'contada' if heredada else 'ERROR'} en la serie si ya existía")
+
+        filas_serie = conn.execute("SELECT COUNT(*) FROM series_notas").fetchone()[0]
+        total_notas = conn.execute("SELECT COUNT(*) FROM notas").fetchone()[0]
+        db.cerrar()
+
+    print(f"Series de {total_notas} notas en {filas_serie} filas pre-agregadas:")
+    print(f"  construcción completa ({completo['notas']} notas, "
+          f"{completo['modificaciones']} modificaciones): {t_completo * 1000:8.1f} ms")
+    print(f"  incremental ({incremental['notas']} notas, "
+          f"{incremental['modificaciones']} modificaciones):    {t_incremental * 1000:8.1f} ms")
+    print(f"  serie diaria de una asignatura ({len(diarias)} días): "
+          f"{t_consulta * 1000:6.2f} ms (reconstruida desde las notas: "
+          f"{t_referencia * len(diarias) * 1000:.0f} ms)")
+    print(f"  diferencias con las notas y con la reconstrucción completa: {diferencias}")
+    return (diferencias == 0 and rechazada and heredada and incremental["notas"] == 500
+            and incremental["modificaciones"] == 100
+            and sin_cambios["notas"] == sin_cambios["modificaciones"] == 0)
+
+
+#atributos de conexiones y cursores que las capas de interfaz no deben usar
+_ACCESO_DIRECTO = {"obtener_conexion", "obtener_conexion_escritura", "_conexion",
+                   "_conexion_escritura", "execute", "executemany", "executescript", "cursor"}
+_METODOS_REGISTRO = {"ejecutar", "ejecutar_varios", "consultar", "consultar_uno", "sql"}
+
+
+def verificar_sentencias() -> bool:
+    #las capas de interfaz solo usan metodos de BaseDatos y servicios, y las
+    #sentencias usadas por nombre existen en el registro (y viceversa)
+    import ast
+    import calificaciones
+    from calificaciones.sentencias import SENTENCIAS
+
+    paquete = os.path.dirname(calificaciones.__file__)
+    violaciones = []
+    for modulo in ("cli", "api", "servicio", "auditoria", "perfil", "notificaciones"):
+        archivo = os.path.join(paquete, f"{modulo}.py")
+        with open(archivo, encoding="utf-8") as entrada:
+            arbol = ast.parse(entrada.read(), archivo)
+        for nodo in ast.walk(arbol):
+            if isinstance(nodo, ast.Attribute) and nodo.attr in _ACCESO_DIRECTO:
+                violaciones.append(f"{modulo}.py:{nodo.lineno} .{nodo.attr}")
+
+    usadas = set()
+    for modulo in ("almacenamiento", "autenticacion"):
+        archivo = os.path.join(paquete, f"{modulo}.py")
+        with open(archivo, encoding="utf-8") as entrada:
+            arbol = ast.parse(entrada.read(), archivo)
+        for nodo in ast.walk(arbol):
+            if (isinstance(nodo, ast.Call) and isinstance(nodo.func, ast.Attribute)
+                    and nodo.func.attr in _METODOS_REGISTRO):
+                for argumento in nodo.args[:2]:
+                    if isinstance(argumento, ast.Constant) and isinstance(argumento.value, str):
+                        usadas.add(argumento.value)
+            elif isinstance(nodo, ast.Constant) and nodo.value in SENTENCIAS:
+                usadas.add(nodo.value)
+    desconocidas = sorted(nombre for nombre in usadas
+                          if "." in nombre and " " not in nombre and nombre not in SENTENCIAS)
+    sin_uso = sorted(set(SENTENCIAS) - usadas)
+
+    for violacion in violaciones:
+        print(f"✗ acceso directo a SQLite en la interfaz: {violacion}")
+    for nombre in desconocidas:
+        print(f"✗ sentencia no registrada: {nombre}")
+    for nombre in sin_uso:
+        print(f"✗ sentencia registrada sin uso: {nombre}")
+    if violaciones or desconocidas or sin_uso:
+        return False
+    print(f"✓ {len(SENTENCIAS)} sentencias registradas y usadas; cli, api, servicio, "
+          f"auditoria, perfil y notificaciones sin acceso directo a conexiones")
+    return True
+
+
+def _consultas_variadas(db, servicio, datos: Dict):
+    #una pasada por las consultas de lectura con todas las combinaciones de
+    #filtros, como las que llegan a la API: cada combinacion es un texto SQL distinto
+    asig = datos["asignaturas"][0]
+    est = datos["estudiantes"][0]
+    opciones = [(None, "salto"), (None, asig), (None, 1), (None, 1000),
+                (None, "2025-01-01"), (None, "2025-12-31")]
+    for tipo in opciones[0]:
+        for asignatura in opciones[1]:
+            for profesor in opciones[2]:
+                for nota in opciones[3]:
+                    for desde in opciones[4]:
+                        for hasta in opciones[5]:
+                            db.obtener_hallazgos_auditoria(tipo, asignatura, profesor, nota,
+                                                           desde, hasta, 20)
+    for asignatura in (None, asig):
+        for profesor in (None, 1):
+            for nivel in (None, "alto"):
+                db.obtener_alertas(asignatura, profesor, nivel, 20)
+            for desde in (None, "2025-02-01"):
+                for hasta in (None, "2025-06-30"):
+                    for consulta in ("parcial", "revision calculo"):
+                        db.buscar_texto(consulta, asignatura, profesor, desde, hasta)
+                        db.buscar_texto_like(consulta, asignatura, profesor, desde, hasta)
+    for marca in (None, {0: 0}):
+        for periodo in (None, "2025-1"):
+            db.obtener_estado_inscripciones(marca, periodo)
+    db.obtener_ranking_asignatura(asig, 20)
+    db.obtener_ranking_asignatura(asig, 20, estudiante_id=est)
+    db.obtener_mejores_promedios(20)
+    db.obtener_mejores_promedios(20, periodo="2025-1")
+    db.obtener_promedios_por_periodo()
+    db.obtener_promedios_por_periodo(est)
+    db.autenticar_usuario("profesor1", "pass123")
+    db.obtener_notas_estudiante(est)
+    db.obtener_notas_estudiante(est, asig)
+    db.obtener_nota(1)
+    db.obtener_apelaciones_estudiante(est)
+    db.obtener_apelaciones_profesor(1)
+    db.contar_apelaciones_por_estado(1)
+    db.contar_modificaciones_profesor(1, "2025-01-01")
+    db.obtener_historial_modificaciones(1)
+    db.obtener_asignaturas_estudiante(est)
+    db.obtener_asignaturas_profesor(1)
+    db.obtener_expediente(est)
+    db.obtener_version_notas(est, asig)
+    db.obtener_marca_procesamiento("alertas")
+    servicio.serie_asignatura(asig, "2025-03-01", "2025-04-01")
+    db.auditar_porcentajes()
+
+
+#sentencias de la carga variada cuyo costo es la ejecucion y no la preparacion
+_SENTENCIAS_PESADAS = {"busqueda.like", "busqueda.fts", "inscripciones.estado",
+                       "notas.porcentajes_distintos_de_100", "ranking.institucion",
+                       "inscripciones.promedios_por_periodo", "ranking.asignatura"}
+
+
+def benchmark_sentencias(repeticiones: int = 30, consultas: int = 20000) -> bool:
+    #registro de sentencias: verificacion estatica, metricas de una carga
+    #variada, cache de sentencias preparadas del tamaño por defecto de sqlite3
+    #(128) contra TAMANO_CACHE_SENTENCIAS, y costo de medir cada ejecucion.
+    #La comparacion de caches suma, con las metricas del propio registro, el
+    #tiempo de las sentencias livianas, donde pesa la preparacion
+    from calificaciones.sentencias import TAMANO_CACHE_SENTENCIAS
+
+    if not verificar_sentencias():
+        return False
+
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "sentencias.db")
+        datos = crear_datos_sinteticos(db_name, estudiantes=200, asignaturas=20)
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+        servicio = sc.ServicioCalificaciones(db)
+        servicio.actualizar_series()
+
+        #textos SQL distintos que produce la carga (una entrada de cache cada uno)
+        textos = set()
+        sql_original = db.sentencias.sql
+
+        def sql_contado(nombre: str, **partes: str) -> str:
+            texto = sql_original(nombre, **partes)
+            textos.add(texto)
+            return texto
+
+        db.sentencias.sql = sql_contado
+        _consultas_variadas(db, servicio, datos)
+        del db.sentencias.sql
+
+        livianas = {}
+        for tamano in (128, TAMANO_CACHE_SENTENCIAS):
+            #misma conexion que _conectar salvo el tamaño de la cache
+            db.cerrar()
+            conn = sqlite3.connect(db_name, timeout=30, cached_statements=tamano)
+            db._local.conn = conn
+            _consultas_variadas(db, servicio, datos)
+            db.sentencias.metricas(reiniciar=True)
+            for _ in range(repeticiones):
+                _consultas_variadas(db, servicio, datos)
+            metricas = db.sentencias.metricas()
+            livianas[tamano] = sum(m["total_ms"] for m in metricas
+                                   if m["sentencia"] not in _SENTENCIAS_PESADAS) / repeticiones
+
+        #costo del registro sobre la consulta mas corta
+        conn = db._conexion()
+        sql = db.sentencias.sql("notas.obtener")
+        inicio = time.perf_counter()
+        for i in range(consultas):
+            conn.execute(sql, (i % 50 + 1,)).fetchone()
+        t_directa = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        for i in range(consultas):
+            db.sentencias.consultar_uno(conn, "notas.obtener", (i % 50 + 1,))
+        t_registro = time.perf_counter() - inicio
+        db.cerrar()
+
+    llamadas = sum(m["llamadas"] for m in metricas) // repeticiones
+    print(f"Carga variada: {llamadas} consultas por pasada, {len(metricas)} sentencias "
+          f"con nombre, {len(textos)} textos SQL distintos:")
+    for tamano, ms in livianas.items():
+        print(f"  sentencias livianas con cache de {tamano:4d}: {ms:7.2f} ms por pasada")
+    print("  más costosas:")
+    for m in metricas[:5]:
+        print(f"    {m['sentencia']:38s} {m['llamadas']:6d} llamadas "
+              f"{m['promedio_ms']:8.3f} ms prom. {m['maximo_ms']:8.3f} ms máx.")
+    print(f"  notas.obtener x{consultas}: directa {t_directa * 1e6 / consultas:.1f} µs, "
+          f"con registro {t_registro * 1e6 / consultas:.1f} µs")
+    return (len(textos) > 128 and livianas[TAMANO_CACHE_SENTENCIAS] < livianas[128]
+            and all(m["errores"] == 0 for m in metricas))
+
+
+class _DestinoInestable(sc.DestinoNotificaciones):
+    #falla las primeras `fallos` entregas; registra los ids recibidos
+    def __init__(self, fallos: int = 0):
+        self.fallos = fallos
+        self.llamadas = 0
+        self.recibidos: List[int] = []
+
+    def entregar(self, lote: List[Dict]):
+        self.llamadas += 1
+        if self.llamadas <= self.fallos:
+            raise ConnectionError("destino no disponible")
+        self.recibidos += [aviso["id"] for aviso in lote]
+
+
+def _vaciar_bandeja(despachador, limite: float = 10.0) -> int:
+    #pasadas hasta que no quede nada pendiente; devuelve las pasadas hechas
+    pasadas = 0
+    fin = time.monotonic() + limite
+    while despachador.db.resumen_bandeja().get("pendiente") and time.monotonic() < fin:
+        despachador.despachar()
+        pasadas += 1
+        time.sleep(despachador.espera_base)
+    return pasadas
+
+
+def benchmark_notificaciones(filas: int = 400) -> bool:
+    #bandeja de avisos de apelaciones: se llena en la transaccion de la
+    #apelacion, se vacia por lotes con reintentos y la cuenta de no leidos
+    #se lee desde una marca. filas = estudiantes del dataset sintetico
+    import json
+    import shutil
+
+    errores = []
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "avisos.db")
+        crear_datos_sinteticos(db_name, estudiantes=filas, asignaturas=30, cortes=2)
+        shutil.copyfile(db_name, os.path.join(directorio, "copia.db"))
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True)
+
+        #la bandeja tiene un aviso por apelacion (las sinteticas tambien pasan por el trigger)
+        conn = sqlite3.connect(db_name)
+        apelaciones = conn.execute("SELECT COUNT(*) FROM apelaciones").fetchone()[0]
+        if db.resumen_bandeja().get("pendiente") != apelaciones:
+            errores.append(f"bandeja {db.resumen_bandeja()} con {apelaciones} apelaciones")
+        #una apelacion revertida no deja aviso
+        nota_id, estudiante_id, profesor_id = conn.execute(
+            "SELECT id, estudiante_id, profesor_id FROM notas ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        conn.execute("INSERT INTO apelaciones (nota_id, estudiante_id, descripcion, estado, "
+                     "fecha_creacion) VALUES (?, ?, 'revertida', 'pendiente', '2025-05-01')",
+                     (nota_id, estudiante_id))
+        conn.rollback()
+        conn.close()
+        if db.resumen_bandeja().get("pendiente") != apelaciones:
+            errores.append("una apelación revertida dejó aviso")
+
+        #entrega por lotes contra uno por uno, con el mismo destino de archivo
+        tiempos = {}
+        for lote, nombre in ((1, "copia.db"), (100, "avisos.db")):
+            base = db if nombre == "avisos.db" else sc.BaseDatos(
+                os.path.join(directorio, nombre), reutilizar_conexion=True)
+            archivo = os.path.join(directorio, f"avisos_{lote}.jsonl")
+            despachador = sc.DespachadorNotificaciones(base, [sc.DestinoArchivo(archivo)],
+                                                       lote=lote)
+            inicio = time.perf_counter()
+            resumen = despachador.despachar()
+            tiempos[lote] = time.perf_counter() - inicio
+            with open(archivo, encoding="utf-8") as entrada:
+                entregados = [json.loads(linea)["id"] for linea in entrada]
+            if resumen["entregadas"] != apelaciones or len(set(entregados)) != apelaciones:
+                errores.append(f"lote {lote}: {resumen} y {len(entregados)} en el archivo")
+            if base is not db:
+                base.cerrar()
+
+        #un destino que falla: reintento con espera exponencial, sin perder avisos
+        ids_nuevos = [db.crear_apelacion(sc.Apelacion(
+            None, nota_id, estudiante_id, f"Solicito revisión de la nota, caso {k}",
+            sc.EstadoApelacion.PENDIENTE, datetime.now(), None, None)) for k in range(30)]
+        for apelacion_id in ids_nuevos[:10]:
+            db.responder_apelacion(apelacion_id, "Se revisó la actividad con el estudiante",
+                                   sc.EstadoApelacion.RECHAZADA)
+        inestable = _DestinoInestable(fallos=3)
+        correo = os.path.join(directorio, "buzon")
+        despachador = sc.DespachadorNotificaciones(
+            db, [inestable, sc.DestinoCorreoLocal(correo)], lote=16, espera_base=0.02)
+        pasadas = _vaciar_bandeja(despachador)
+        if len(set(inestable.recibidos)) != 40 or len(os.listdir(correo)) != 40:
+            errores.append(f"reintentos: {len(set(inestable.recibidos))} recibidos, "
+                           f"{len(os.listdir(correo))} mensajes")
+
+        #sin destino disponible el aviso queda 'fallida' tras max_intentos
+        db.crear_apelacion(sc.Apelacion(None, nota_id, estudiante_id,
+                                        "Solicito revisión de la nota, sin destino",
+                                        sc.EstadoApelacion.PENDIENTE, datetime.now(), None, None))
+        caido = sc.DespachadorNotificaciones(db, [_DestinoInestable(fallos=10 ** 6)],
+                                             espera_base=0.01, max_intentos=3)
+        _vaciar_bandeja(caido)
+        if db.resumen_bandeja().get("fallida") != 1 or caido.reprogramadas != 3:
+            errores.append(f"max_intentos: {db.resumen_bandeja()}, "
+                           f"{caido.reprogramadas} reprogramadas")
+
+        #no leidos: cuenta desde la marca contra contar todas las apelaciones
+        sin_leer = db.notificaciones_sin_leer(profesor_id)
+        conn = sqlite3.connect(db_name)
+        esperado = conn.execute("SELECT COUNT(*) FROM bandeja_notificaciones "
+                                "WHERE destinatario_id = ?", (profesor_id,)).fetchone()[0]
+        conn.close()
+        if sin_leer != esperado:
+            errores.append(f"sin leer {sin_leer}, esperado {esperado}")
+        repeticiones = 2000
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            db.notificaciones_sin_leer(profesor_id)
+        t_sin_leer = (time.perf_counter() - inicio) / repeticiones
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            db.contar_apelaciones_por_estado(profesor_id)
+        t_apelaciones = (time.perf_counter() - inicio) / repeticiones
+        db.marcar_notificaciones_leidas(profesor_id)
+        leidas = db.notificaciones_sin_leer(profesor_id)
+        nueva = db.crear_apelacion(sc.Apelacion(None, nota_id, estudiante_id,
+                                                "Solicito revisión de la nota, una más",
+                                                sc.EstadoApelacion.PENDIENTE, datetime.now(),
+                                                None, None))
+        avisos = db.obtener_notificaciones(profesor_id)
+        if (leidas != 0 or db.notificaciones_sin_leer(profesor_id) != 1
+                or [a["apelacion_id"] for a in avisos] != [nueva]):
+            errores.append(f"marca de lectura: {leidas} tras marcar, avisos {avisos}")
+
+        #en segundo plano: despertar entrega sin esperar el intervalo
+        archivo = os.path.join(directorio, "fondo.jsonl")
+        fondo = sc.DespachadorNotificaciones(db, [sc.DestinoArchivo(archivo)],
+                                             intervalo=30.0).iniciar()
+        procesador = sc.ProcesadorComandos(db, despachador=fondo)
+        profesor = db.obtener_conexion().execute(
+            "SELECT username FROM usuarios WHERE id = ?", (profesor_id,)).fetchone()[0]
+        respuesta = procesador.ejecutar({
+            "op": "responder_apelacion", "apelacion_id": nueva, "estado": "aprobada",
+            "respuesta": "Se corrigió la nota tras revisar el procedimiento",
+            "token": _token(procesador, profesor)})
+        inicio = time.perf_counter()
+        entregado = False
+        while not entregado and time.perf_counter() - inicio < 5.0:
+            time.sleep(0.005)
+            entregado = os.path.exists(archivo) and os.path.getsize(archivo) > 0
+        t_fondo = time.perf_counter() - inicio
+        fondo.detener()
+        if not respuesta["ok"] or not entregado:
+            errores.append(f"entrega en segundo plano: {respuesta}")
+        alumno = db.obtener_conexion().execute(
+            "SELECT username FROM usuarios WHERE id = ?", (estudiante_id,)).fetchone()[0]
+        estudiante = procesador.ejecutar({"op": "notificaciones_sin_leer",
+                                          "usuario_id": estudiante_id,
+                                          "token": _token(procesador, alumno)})
+        if estudiante["resultado"]["sin_leer"] != 11:
+            errores.append(f"sin leer del estudiante: {estudiante}")
+        db.cerrar()
+
+        #con fragmentos: ids, marcas y lotes por archivo
+        db_fragmentos = os.path.join(directorio, "fragmentada.db")
+        fragmentada = sc.BaseDatosFragmentada(db_fragmentos, fragmentos=2)
+        for asignatura in (1, 2):
+            registrada = fragmentada.registrar_nota(sc.Nota(
+                None, 3, asignatura, 1, "Parcial 1", 2.5, 30.0, datetime.now(),
+                1 if asignatura == 1 else 2, "Registro del primer parcial del corte"))
+            fragmentada.crear_apelacion(sc.Apelacion(
+                None, registrada, 3, "Solicito revisión del primer parcial",
+                sc.EstadoApelacion.PENDIENTE, datetime.now(), None, None))
+        destino = _DestinoInestable()
+        sc.DespachadorNotificaciones(fragmentada, [destino]).despachar()
+        fragmentos_avisos = {fragmentada.fragmento_de(id_registro=i) for i in destino.recibidos}
+        antes = (fragmentada.notificaciones_sin_leer(1), fragmentada.notificaciones_sin_leer(2))
+        fragmentada.marcar_notificaciones_leidas(2)
+        despues = (fragmentada.notificaciones_sin_leer(1), fragmentada.notificaciones_sin_leer(2))
+        if (fragmentos_avisos != {0, 1} or antes != (1, 1) or despues != (1, 0)
+                or fragmentada.resumen_bandeja() != {"entregada": 2}):
+            errores.append(f"fragmentos: {destino.recibidos} {antes} {despues}")
+
+    print(f"Bandeja de avisos de {apelaciones} apelaciones:")
+    print(f"  entrega uno por uno:   {tiempos[1] * 1000:8.1f} ms "
+          f"({apelaciones / tiempos[1]:8.0f} avisos/s)")
+    print(f"  entrega en lotes de 100: {tiempos[100] * 1000:6.1f} ms "
+          f"({apelaciones / tiempos[100]:8.0f} avisos/s)")
+    print(f"  destino con 3 fallas: 40 avisos entregados en {pasadas} pasadas, "
+          f"{len(inestable.recibidos) - 40} repetidos")
+    print(f"  no leídos de un profesor: {t_sin_leer * 1e6:6.1f} µs "
+          f"(contar sus apelaciones por estado: {t_apelaciones * 1e6:.1f} µs)")
+    print(f"  aviso en segundo plano tras responder: {t_fondo * 1000:.1f} ms")
+    for error in errores:
+        print(f"✗ {error}")
+    return not errores
+
+
+_MEMORIA = r"""
+import json, time
+from calificaciones import (ServicioCalificaciones, abrir_base_datos, configurar_presupuesto,
+                            exportar_cambios, rss_maximo)
+configurar_presupuesto({megas})
+db = abrir_base_datos({db!r}, reutilizar_conexion=True)
+servicio = ServicioCalificaciones(db)
+db.contar_apelaciones_por_estado({profesor})
+antes = rss_maximo()
+inicio = time.perf_counter()
+cantidad = {operacion}
+print(json.dumps([rss_maximo() - antes, time.perf_counter() - inicio, cantidad]))
+"""
+
+
+def benchmark_memoria(filas: int = 5000, limite_mb: float = 16.0,
+                      holgura_mb: float = 4.0) -> bool:
+    #pico de memoria residente de las operaciones mas pesadas, cada una en un
+    #interprete nuevo con el presupuesto --memoria limite_mb sobre el dataset
+    #sintetico (filas = estudiantes, dos profesores y porcentajes alterados
+    #para que la auditoria tenga hallazgos). Falla si una operacion supera el
+    #presupuesto mas holgura_mb de memoria de trabajo fuera de las caches
+    #(cache de paginas de SQLite, el lote en curso), si las caches en un
+    #mismo presupuesto pasan de su limite o si se pierden sesiones vigentes
+    #mientras las caches se desplazan
+    import json
+    import subprocess
+
+    if sc.rss_maximo() is None:
+        print("Este sistema no informa el pico de memoria residente (resource)")
+        return True
+    errores = []
+    with tempfile.TemporaryDirectory() as directorio:
+        db_name = os.path.join(directorio, "memoria.db")
+        datos = crear_datos_sinteticos(db_name, estudiantes=filas, asignaturas=40, profesores=2)
+        #el registro de cambios se activa con un respaldo completo; la
+        #alteracion de porcentajes es lo que exporta el incremental
+        sc.BaseDatos(db_name).respaldar(os.path.join(directorio, "base.db"),
+                                        registrar_cambios=True)
+        conn = sc.BaseDatos(db_name).obtener_conexion()
+        conn.execute("UPDATE notas SET porcentaje = porcentaje + 5 WHERE id % 3 = 0")
+        conn.commit()
+        conn.close()
+        profesor = datos["profesores"][0]
+
+        def medir(operacion: str) -> List:
+            codigo = _MEMORIA.format(megas=limite_mb, db=db_name, profesor=profesor,
+                                     operacion=operacion)
+            salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True,
+                                    text=True, check=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)))
+            return json.loads(salida.stdout)
+
+        #(nombre, recorrido acotado, la misma operacion armando la lista)
+        casos = [
+            ("apelaciones de un profesor",
+             f"sum(1 for _ in db.iterar_apelaciones_profesor({profesor}))",
+             f"len(db.obtener_apelaciones_profesor({profesor}))"),
+            ("auditoría de porcentajes",
+             "sum(1 for _ in db.iterar_auditoria_porcentajes())",
+             "len(db.auditar_porcentajes())"),
+            ("promedios acumulados",
+             "sum(1 for _ in servicio.iterar_promedios_acumulados())",
+             "len(servicio.calcular_promedios_acumulados())"),
+            ("promedio final de cada inscripción",
+             "sum(1 for e, a, _ in db.obtener_conexion().execute("
+             "'SELECT estudiante_id, asignatura_id, periodo FROM inscripciones')"
+             " if servicio.calcular_promedio_final(e, a) >= 0)", None),
+            ("respaldo incremental",
+             f"exportar_cambios({db_name!r}, {os.path.join(directorio, 'cambios.jsonl')!r})"
+             "['cambios']", None),
+        ]
+        limite = int((limite_mb + holgura_mb) * (1 << 20))
+        print(f"Pico de memoria residente con presupuesto de {limite_mb:g} MB "
+              f"+ {holgura_mb:g} MB de trabajo "
+              f"({filas} estudiantes, {datos['notas']} notas):")
+        for nombre, recorrido, lista in casos:
+            pico, segundos, cantidad = medir(recorrido)
+            linea = (f"  {nombre:<36} {pico / (1 << 20):7.1f} MB {segundos * 1000:8.0f} ms"
+                     f"  ({cantidad} filas)")
+            if lista is not None:
+                pico_lista, segundos_lista, cantidad_lista = medir(lista)
+                linea += (f"; con lista {pico_lista / (1 << 20):.1f} MB "
+                          f"{segundos_lista * 1000:.0f} ms")
+                if cantidad_lista != cantidad:
+                    errores.append(f"{nombre}: {cantidad} por recorrido, {cantidad_lista} en lista")
+            print(linea)
+            if pico > limite:
+                errores.append(f"{nombre}: {pico / (1 << 20):.1f} MB supera el presupuesto")
+            if not cantidad:
+                errores.append(f"{nombre}: sin filas")
+
+        #caches en un mismo presupuesto chico: el LRU desplaza entre ellas, los
+        #resultados no cambian y las sesiones creadas entretanto siguen vigentes
+        presupuesto = sc.PresupuestoMemoria(1 << 20)
+        db = sc.BaseDatos(db_name, reutilizar_conexion=True, presupuesto=presupuesto)
+        servicio = sc.ServicioCalificaciones(db)
+        sesiones = sc.AlmacenSesionesMemoria()
+        inscripciones = [(e, a) for e, a, _ in datos["inscripciones"][:3000]]
+        usuario = db.autenticar_usuario("profesor1", "pass123")
+        tokens = []
+        maximo = 0
+        for k, (estudiante_id, asignatura_id) in enumerate(inscripciones):
+            servicio.calcular_promedio_final(estudiante_id, asignatura_id)
+            db.obtener_estudiantes_asignatura(asignatura_id)
+            if k % 3 == 0:
+                tokens.append(sesiones.crear(usuario))
+            maximo = max(maximo, presupuesto.usado)
+        estadisticas = presupuesto.estadisticas()
+        sin_cache = sc.ServicioCalificaciones(db, sc.PresupuestoMemoria(0))
+        distintos = sum(servicio.calcular_promedio_final(e, a)
+                        != sin_cache.calcular_promedio_final(e, a) for e, a in inscripciones[:500])
+        vigentes = sum(sesiones.obtener(token) is not None for token in tokens)
+        db.cerrar()
+        descartadas = {nombre: datos_cache["descartadas"]
+                       for nombre, datos_cache in estadisticas["caches"].items()}
+        aciertos = {nombre: datos_cache["aciertos"]
+                    for nombre, datos_cache in estadisticas["caches"].items()}
+        print(f"Caches compartiendo {presupuesto.limite >> 10} KiB: máximo usado "
+              f"{maximo >> 10} KiB, aciertos {aciertos}, descartadas {descartadas}, "
+              f"{vigentes}/{len(tokens)} sesiones vigentes")
+        if maximo > presupuesto.limite:
+            errores.append(f"caches: {maximo} bytes sobre {presupuesto.limite}")
+        if not all(descartadas.get(nombre) for nombre in ("promedios", "rosters")):
+            errores.append(f"caches: el LRU no desplazó entre caches {descartadas}")
+        if vigentes != len(tokens):
+            errores.append(f"sesiones: {len(tokens) - vigentes} vigentes perdidas")
+        if distintos:
+            errores.append(f"caches: {distintos} promedios distintos de los calculados sin cache")
+    for error in errores:
+        print(f"✗ {error}")
+    return not errores
+
+
+BENCHMARKS = {
+    "validadores": benchmark_validadores,
+    "servidor": benchmark_servidor,
+    "escrituras": benchmark_escrituras,
+    "concurrencia_notas": benchmark_concurrencia_notas,
+    "busqueda": benchmark_busqueda,
+    "promedios_acumulados": benchmark_promedios_acumulados,
+    "ranking": benchmark_ranking,
+    "alertas": benchmark_alertas,
+    "fragmentos": benchmark_fragmentos,
+    "respaldo": benchmark_respaldo,
+    "perfil": benchmark_perfil,
+    "inscripciones": benchmark_inscripciones,
+    "arranque": benchmark_arranque,
+    "autenticacion": benchmark_autenticacion,
+    "auditoria": benchmark_auditoria,
+    "series": benchmark_series,
+    "sentencias": benchmark_sentencias,
+    "notificaciones": benchmark_notificaciones,
+    "memoria": benchmark_memoria,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks del sistema de calificaciones")
+    parser.add_argument("nombre", choices=sorted(BENCHMARKS))
+    parser.add_argument("--filas", type=int)
+    parser.add_argument("--duracion", type=float)
+    parser.add_argument("--concurrencia", type=int)
+    parser.add_argument("--trabajadores", type=int)
+    parser.add_argument("--url", help="servidor externo para el benchmark HTTP")
+    args = parser.parse_args()
+    opciones = {k: v for k, v in vars(args).items() if k != "nombre" and v is not None}
+    sys.exit(0 if BENCHMARKS[args.nombre](**opciones) else 1)
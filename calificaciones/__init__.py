@@ -0,0 +1,51 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#capas: reglas -> modelos -> almacenamiento -> servicio, autenticacion,
+#auditoria, notificaciones -> api, cli; almacenamiento y autenticacion ejecutan su SQL por
+#nombre desde sentencias y acotan sus caches con memoria, y perfil es
+#independiente. Los nombres publicos se importan desde su capa la primera vez
+#que se piden, asi `from calificaciones import ReglasLogicas` no carga SQLite,
+#HTTP ni NumPy
+
+import importlib
+from typing import Any, List
+
+_CAPAS = {
+    "reglas": ("CodigoError", "ReglasLogicas"),
+    "modelos": ("EstadoApelacion", "Usuario", "Nota", "ConflictoVersion", "Apelacion",
+                "a_json"),
+    "memoria": ("PresupuestoMemoria", "CacheAcotada", "presupuesto_compartido",
+                "configurar_presupuesto", "tamano_aproximado", "rss_maximo"),
+    "sentencias": ("RegistroSentencias",),
+    "almacenamiento": ("BaseDatos", "BaseDatosFragmentada", "CoalescedorEscrituras",
+                       "abrir_base_datos", "respaldar_archivo", "exportar_cambios",
+                       "restaurar_respaldo"),
+    "servicio": ("ServicioCalificaciones",),
+    "auditoria": ("AnalizadorHistorial",),
+    "notificaciones": ("DespachadorNotificaciones", "DestinoNotificaciones", "DestinoArchivo",
+                       "DestinoCorreoLocal", "DestinoWebhook"),
+    "autenticacion": ("ServicioAutenticacion", "LimitadorIntentos", "DemasiadosIntentos",
+                      "NoAutenticado", "SinPermiso", "AlmacenSesiones", "AlmacenSesionesMemoria", "AlmacenSesionesSQLite"),
+    "api": ("ProcesadorComandos", "ManejadorHTTP", "ServidorCalificaciones"),
+    "perfil": ("Perfilador",),
+    "cli": ("InterfazCLI", "auditar_porcentajes", "auditar_historial", "actualizar_alertas",
+            "actualizar_series", "ejecutar_respaldo", "ejecutar_batch", "ejecutar_servidor",
+            "destinos_notificaciones", "despachar_notificaciones", "main"),
+}
+_UBICACION = {nombre: capa for capa, nombres in _CAPAS.items() for nombre in nombres}
+
+__all__ = sorted(_UBICACION)
+
+
+def __getattr__(nombre: str) -> Any:
+    capa = _UBICACION.get(nombre)
+    if capa is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(f"{__name__}.{capa}"), nombre)
+    globals()[nombre] = valor
+    return valor
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
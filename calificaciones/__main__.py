@@ -0,0 +1,7 @@
+#python -m calificaciones [opciones], igual que sistema_calificaciones_proyecto.py
+
+import sys
+
+from calificaciones.cli import main
+
+sys.exit(main())
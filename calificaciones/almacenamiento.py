@@ -0,0 +1,2211 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#persistencia en SQLite: esquema, consultas, fragmentos, respaldos y
+#agrupacion de escrituras
+
+import gzip
+import heapq
+import itertools
+import json
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from calificaciones.memoria import PresupuestoMemoria, presupuesto_compartido
+from calificaciones.modelos import Apelacion, ConflictoVersion, EstadoApelacion, Nota, Usuario
+from calificaciones.reglas import ReglasLogicas
+from calificaciones.sentencias import TAMANO_CACHE_SENTENCIAS, RegistroSentencias, redondeo_sql
+
+
+def _conectar(archivo: str):
+    #timeout: espera por el bloqueo de escritura antes de "database is locked"
+    conn = sqlite3.connect(archivo, timeout=30, cached_statements=TAMANO_CACHE_SENTENCIAS)
+    #cache de paginas acotada por el presupuesto de memoria del proceso
+    conn.execute(f"PRAGMA cache_size = -{presupuesto_compartido().kib_cache_sqlite()}")
+    return conn
+
+
+class BaseDatos:
+   
+    def __init__(self, db_name: str = "calificaciones.db", reutilizar_conexion: bool = False,
+                 esquema: str = "completo", presupuesto: Optional[PresupuestoMemoria] = None):
+        self.db_name = db_name
+        #con reutilizar_conexion cada hilo conserva una conexion abierta
+        #entre llamadas en lugar de abrir y cerrar una por operacion
+        self.reutilizar_conexion = reutilizar_conexion
+        self.esquema = esquema
+        #toda consulta de esta instancia pasa por aqui, ver sentencias.py
+        self.sentencias = RegistroSentencias()
+        self._local = threading.local()
+        #asignatura_id -> (filas, ids) de obtener_estudiantes_asignatura; lo
+        #invalidan inscribir/desinscribir de esta instancia. Comparte el
+        #presupuesto de memoria (LRU) con las demas caches del proceso
+        self.presupuesto = presupuesto or presupuesto_compartido()
+        self._rosters = self.presupuesto.cache("rosters")
+        self._generacion_rosters = 0
+        self._candado_rosters = threading.Lock()
+        self._fts_disponible = False
+        self._inicializada = False
+        self._inicializando = False
+        self._candado_inicio = threading.RLock()
+
+    def inicializar(self) -> "BaseDatos":
+        #el esquema se crea en el primer uso y no al construir la instancia,
+        #asi crear InterfazCLI o un servicio no toca el archivo. Idempotente
+        if self._inicializada:
+            return self
+        with self._candado_inicio:
+            #_inicializando: inicializar_db ya pide conexiones en este hilo
+            if not (self._inicializada or self._inicializando):
+                self._inicializando = True
+                try:
+                    self.inicializar_db()
+                    self._inicializada = True
+                finally:
+                    self._inicializando = False
+        return self
+    
+    @property
+    def fts_disponible(self) -> bool:
+        #False si SQLite no trae FTS5 o el esquema no incluye las notas
+        return self.inicializar()._fts_disponible
+
+    def obtener_conexion(self):
+        self.inicializar()
+        return _conectar(self.db_name)
+
+    def _conexion(self):
+        #conexion usada por las operaciones de BaseDatos
+        if not self.reutilizar_conexion:
+            return self.obtener_conexion()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.obtener_conexion()
+            self._local.conn = conn
+        return conn
+
+    def _liberar(self, conn):
+        if not self.reutilizar_conexion:
+            conn.close()
+
+    def _iterar(self, nombre: str, parametros: Any = (), **partes: str) -> Iterator[Tuple]:
+        #recorre un resultado grande por lotes (RegistroSentencias.iterar); la
+        #conexion se libera al terminar o abandonar el recorrido
+        conn = self._conexion()
+        try:
+            yield from self.sentencias.iterar(conn, nombre, parametros, **partes)
+        finally:
+            self._liberar(conn)
+
+    def cerrar(self):
+        #cierra la conexion compartida del hilo actual, si existe
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def activar_wal(self):
+        #modo WAL: los lectores no bloquean al escritor ni viceversa
+        conn = self._conexion()
+        conn.execute("PRAGMA journal_mode=WAL")
+        self._liberar(conn)
+
+    def archivos(self, destino: Optional[str] = None) -> List[str]:
+        #archivos SQLite que forman la base, o sus nombres equivalentes
+        #con raiz en destino (para respaldos)
+        return [destino or self.db_name]
+
+    def respaldar(self, destino: str, paginas: int = 256, pausa: float = 0.0,
+                  comprimir: bool = False, registrar_cambios: bool = False) -> List[Dict]:
+        #respaldo completo en linea de cada archivo, ver respaldar_archivo
+        self.inicializar()
+        return [respaldar_archivo(origen, copia, paginas, pausa, comprimir, registrar_cambios)
+                for origen, copia in zip(self.archivos(), self.archivos(destino))]
+
+    def respaldar_cambios(self, destino: str, comprimir: bool = False) -> List[Dict]:
+        #respaldo incremental de cada archivo, ver exportar_cambios
+        self.inicializar()
+        return [exportar_cambios(origen, copia, comprimir)
+                for origen, copia in zip(self.archivos(), self.archivos(destino))]
+
+    def fragmento_de(self, asignatura_id: Optional[int] = None,
+                     id_registro: Optional[int] = None) -> int:
+        #archivo que guarda las notas de la asignatura o el registro (nota o
+        #apelacion) indicado; sin fragmentos todo esta en el mismo archivo
+        return 0
+
+    def obtener_conexion_escritura(self, fragmento: int = 0):
+        #conexion nueva para escribir notas, apelaciones e historial
+        return self.obtener_conexion()
+
+    def _conexion_escritura(self, fragmento: int = 0):
+        return self._conexion()
+
+    def _esquemas_notas(self) -> List[Tuple[int, str]]:
+        #(fragmento, esquema) de las tablas de notas vistas desde _conexion()
+        return [(0, "main")]
+
+    @contextmanager
+    def transaccion_lectura(self):
+        #agrupa varias lecturas en una sola transaccion de la conexion compartida
+        #para no tomar y soltar el bloqueo de lectura en cada consulta
+        if not self.reutilizar_conexion:
+            yield
+            return
+        conn = self._conexion()
+        conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            conn.commit()
+    
+    #subir al cambiar tablas, indices o triggers, para que las bases existentes
+    #se actualicen al abrirlas
+    VERSION_ESQUEMA = 7
+    #desde esta version el registro de cambios es opcional: solo se conserva
+    #en las bases que lo activaron (antes se instalaba siempre)
+    VERSION_REGISTRO_OPCIONAL = 6
+
+    def inicializar_db(self):
+       #crea tablas si no existen. El esquema "completo" tiene todo en un archivo;
+       #"catalogo" (usuarios, asignaturas, inscripciones, alertas) y "fragmento"
+       #(notas y lo derivado de ellas) permiten repartirlo, ver BaseDatosFragmentada
+        conn = self._conexion()
+        cursor = conn.cursor()
+
+        #una base ya creada con este esquema se abre sin reescribir tablas ni
+        #triggers: es la mayor parte del costo de la primera consulta
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] == self.VERSION_ESQUEMA:
+            if self.esquema != "catalogo":
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN "
+                    f"({', '.join('?' * len(self.INDICES_TEXTO))})", tuple(self.INDICES_TEXTO)
+                )
+                self._fts_disponible = cursor.fetchone()[0] == len(self.INDICES_TEXTO)
+            self._liberar(conn)
+            return
+
+        if self.esquema in ("completo", "catalogo"):
+            self._crear_tablas_catalogo(cursor)
+        if self.esquema in ("completo", "fragmento"):
+            self._crear_tablas_notas(cursor)
+        else:
+            self._fts_disponible = False
+
+        conn.commit()
+        self._liberar(conn)
+
+        if self.esquema != "fragmento":
+            self._insertar_datos_prueba()
+
+        conn = self._conexion()
+        conn.execute(f"PRAGMA user_version = {self.VERSION_ESQUEMA}")
+        self._liberar(conn)
+
+    def _crear_tablas_catalogo(self, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS usuarios (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                password TEXT NOT NULL,
+                rol TEXT NOT NULL,
+                nombre_completo TEXT NOT NULL
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS asignaturas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                codigo TEXT UNIQUE NOT NULL,
+                nombre TEXT NOT NULL,
+                creditos INTEGER NOT NULL,
+                profesor_id INTEGER,
+                FOREIGN KEY (profesor_id) REFERENCES usuarios(id)
+            )
+        ''')
+    
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS inscripciones (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                estudiante_id INTEGER NOT NULL,
+                asignatura_id INTEGER NOT NULL,
+                periodo TEXT NOT NULL,
+                FOREIGN KEY (estudiante_id) REFERENCES usuarios(id),
+                FOREIGN KEY (asignatura_id) REFERENCES asignaturas(id)
+            )
+        ''')
+
+        #estudiantes de una asignatura sin recorrer todas las inscripciones
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_inscripciones_asignatura_estudiante
+            ON inscripciones (asignatura_id, estudiante_id)
+        ''')
+
+        #una inscripcion por estudiante, asignatura y periodo; las bases creadas
+        #antes de la restriccion conservan la primera de cada duplicado
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_inscripciones_unica'"
+        )
+        if cursor.fetchone() is None:
+            cursor.execute('''
+                DELETE FROM inscripciones WHERE id NOT IN (
+                    SELECT MIN(id) FROM inscripciones
+                    GROUP BY estudiante_id, asignatura_id, periodo
+                )
+            ''')
+            cursor.execute('''
+                CREATE UNIQUE INDEX idx_inscripciones_unica
+                ON inscripciones (estudiante_id, asignatura_id, periodo)
+            ''')
+
+        #contador de cambios del roster de cada asignatura: la cache de rosters
+        #lo compara en cada uso, asi ve las inscripciones hechas por otras
+        #instancias o procesos. Sin fila, la version es 0
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS versiones_inscripciones (
+                asignatura_id INTEGER PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+        ''')
+        contar = '''
+            INSERT INTO versiones_inscripciones (asignatura_id, version)
+            VALUES ({f}.asignatura_id, 1)
+            ON CONFLICT (asignatura_id) DO UPDATE SET version = version + 1;
+        '''
+        for nombre, evento, filas in (("insert", "INSERT", ("new",)),
+                                      ("update", "UPDATE", ("old", "new")),
+                                      ("delete", "DELETE", ("old",))):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_versiones_inscripciones_{nombre}")
+            cuerpo = "".join(contar.format(f=fila) for fila in filas)
+            cursor.execute(f'''
+                CREATE TRIGGER trg_versiones_inscripciones_{nombre}
+                AFTER {evento} ON inscripciones
+                BEGIN {cuerpo} END
+            ''')
+
+        #ultima secuencia de versiones_notas procesada por cada proceso incremental
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS marcas_procesamiento (
+                proceso TEXT PRIMARY KEY,
+                secuencia INTEGER NOT NULL
+            )
+        ''')
+
+        #estudiantes en riesgo: una fila por inscripcion mientras siga en riesgo
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alertas (
+                estudiante_id INTEGER NOT NULL,
+                asignatura_id INTEGER NOT NULL,
+                periodo TEXT NOT NULL,
+                nivel TEXT NOT NULL,
+                promedio_actual REAL NOT NULL,
+                porcentaje_completado REAL NOT NULL,
+                nota_necesaria REAL,
+                fecha_deteccion TEXT NOT NULL,
+                fecha_actualizacion TEXT NOT NULL,
+                PRIMARY KEY (estudiante_id, asignatura_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_alertas_asignatura_nivel
+            ON alertas (asignatura_id, nivel)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_alertas_nivel
+            ON alertas (nivel, nota_necesaria)
+        ''')
+
+        #distribucion de notas por asignatura y dia en casillas de 0.1, como
+        #cambios: la de un dia es la suma de sus filas y las anteriores. Ver
+        #actualizar_series_notas
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS series_notas (
+                asignatura_id INTEGER NOT NULL,
+                dia TEXT NOT NULL,
+                casilla INTEGER NOT NULL,
+                cantidad INTEGER NOT NULL,
+                suma REAL NOT NULL,
+                PRIMARY KEY (asignatura_id, dia, casilla)
+            ) WITHOUT ROWID
+        ''')
+
+        #resultado del ultimo analisis de historial_modificaciones (ver
+        #auditar_historial); valor depende del tipo de hallazgo
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hallazgos_auditoria (
+                id INTEGER PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                nota_id INTEGER NOT NULL,
+                historial_id INTEGER,
+                apelacion_id INTEGER,
+                estudiante_id INTEGER NOT NULL,
+                asignatura_id INTEGER NOT NULL,
+                profesor_id INTEGER NOT NULL,
+                fecha TEXT NOT NULL,
+                valor REAL NOT NULL,
+                detalle TEXT NOT NULL
+            )
+        ''')
+        for nombre, columnas in (("tipo", "tipo, fecha"),
+                                 ("asignatura", "asignatura_id, tipo, fecha"),
+                                 ("profesor", "profesor_id, tipo, fecha"),
+                                 ("nota", "nota_id")):
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_hallazgos_auditoria_{nombre} "
+                           f"ON hallazgos_auditoria ({columnas})")
+
+        self._crear_registro_cambios(cursor, self.TABLAS_CATALOGO)
+
+    def _crear_tablas_notas(self, cursor):
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS notas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                estudiante_id INTEGER NOT NULL,
+                asignatura_id INTEGER NOT NULL,
+                corte INTEGER NOT NULL,
+                actividad TEXT NOT NULL,
+                nota REAL NOT NULL,
+                porcentaje REAL NOT NULL,
+                fecha_registro TEXT NOT NULL,
+                profesor_id INTEGER NOT NULL,
+                justificacion TEXT NOT NULL,
+                FOREIGN KEY (estudiante_id) REFERENCES usuarios(id),
+                FOREIGN KEY (asignatura_id) REFERENCES asignaturas(id),
+                FOREIGN KEY (profesor_id) REFERENCES usuarios(id)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS apelaciones (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nota_id INTEGER NOT NULL,
+                estudiante_id INTEGER NOT NULL,
+                descripcion TEXT NOT NULL,
+                estado TEXT NOT NULL,
+                fecha_creacion TEXT NOT NULL,
+                respuesta_profesor TEXT,
+                fecha_respuesta TEXT,
+                FOREIGN KEY (nota_id) REFERENCES notas(id),
+                FOREIGN KEY (estudiante_id) REFERENCES usuarios(id)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS historial_modificaciones (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nota_id INTEGER NOT NULL,
+                nota_anterior REAL NOT NULL,
+                nota_nueva REAL NOT NULL,
+                fecha_modificacion TEXT NOT NULL,
+                profesor_id INTEGER NOT NULL,
+                justificacion TEXT NOT NULL,
+                FOREIGN KEY (nota_id) REFERENCES notas(id),
+                FOREIGN KEY (profesor_id) REFERENCES usuarios(id)
+            )
+        ''')
+
+        #recorrido en orden de fecha de auditar_historial y reportes por periodo
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_historial_fecha
+            ON historial_modificaciones (fecha_modificacion)
+        ''')
+        #historial de una nota (y su valor original, ver actualizar_series_notas)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_historial_nota
+            ON historial_modificaciones (nota_id)
+        ''')
+
+        #version de fila para modificar_nota (comparar e intercambiar)
+        cursor.execute("PRAGMA table_info(notas)")
+        if "version" not in [columna[1] for columna in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE notas ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_notas_estudiante_asignatura_corte
+            ON notas (estudiante_id, asignatura_id, corte)
+        ''')
+
+        #totales por corte (porcentaje y suma ponderada) y promedio final por
+        #asignatura, materializados y mantenidos por triggers
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name IN ('totales_corte', 'promedios_asignatura')"
+        )
+        existentes = {fila[0] for fila in cursor.fetchall()}
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS totales_corte (
+                estudiante_id INTEGER NOT NULL,
+                asignatura_id INTEGER NOT NULL,
+                corte INTEGER NOT NULL,
+                porcentaje_total REAL NOT NULL DEFAULT 0,
+                suma_ponderada REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (estudiante_id, asignatura_id, corte)
+            )
+        ''')
+        cursor.execute("PRAGMA table_info(totales_corte)")
+        if "suma_ponderada" not in [columna[1] for columna in cursor.fetchall()]:
+            cursor.execute(
+                "ALTER TABLE totales_corte ADD COLUMN suma_ponderada REAL NOT NULL DEFAULT 0"
+            )
+            existentes.discard("totales_corte")
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS promedios_asignatura (
+                estudiante_id INTEGER NOT NULL,
+                asignatura_id INTEGER NOT NULL,
+                promedio_final REAL NOT NULL,
+                PRIMARY KEY (estudiante_id, asignatura_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_promedios_asignatura_promedio
+            ON promedios_asignatura (asignatura_id, promedio_final)
+        ''')
+
+        #misma aritmetica que ServicioCalificaciones: notas sumadas en orden de
+        #fecha_registro y cada corte redondeado (como round de Python) antes de
+        #su peso. Sin funciones de Python: cualquier conexion puede escribir notas
+        peso_corte = "CASE corte " + " ".join(
+            f"WHEN {corte} THEN {peso}" for corte, peso in ReglasLogicas.PESOS_CORTE.items()
+        ) + " ELSE 0 END"
+        ponderado = f"{redondeo_sql('suma_ponderada')} * {peso_corte}"
+        promedio = redondeo_sql("SUM(ponderado)")
+
+        if "totales_corte" not in existentes:
+            cursor.execute("DELETE FROM totales_corte")
+            cursor.execute('''
+                INSERT INTO totales_corte (estudiante_id, asignatura_id, corte,
+                                           porcentaje_total, suma_ponderada)
+                SELECT estudiante_id, asignatura_id, corte, SUM(porcentaje),
+                       SUM(nota * (porcentaje / 100.0))
+                FROM (SELECT * FROM notas
+                      ORDER BY estudiante_id, asignatura_id, corte, fecha_registro)
+                GROUP BY estudiante_id, asignatura_id, corte
+            ''')
+            existentes.discard("promedios_asignatura")
+        if "promedios_asignatura" not in existentes:
+            cursor.execute("DELETE FROM promedios_asignatura")
+            cursor.execute(f'''
+                INSERT INTO promedios_asignatura (estudiante_id, asignatura_id, promedio_final)
+                SELECT estudiante_id, asignatura_id, {promedio}
+                FROM (SELECT estudiante_id, asignatura_id, {ponderado} AS ponderado
+                      FROM totales_corte)
+                GROUP BY estudiante_id, asignatura_id
+            ''')
+
+        #los triggers se recrean siempre para que una base creada por una
+        #version anterior quede con su definicion actual
+        recalcular_corte = '''
+            INSERT INTO totales_corte (estudiante_id, asignatura_id, corte,
+                                       porcentaje_total, suma_ponderada)
+            SELECT {f}.estudiante_id, {f}.asignatura_id, {f}.corte,
+                   COALESCE(SUM(porcentaje), 0), COALESCE(SUM(nota * (porcentaje / 100.0)), 0)
+            FROM (SELECT nota, porcentaje FROM notas
+                  WHERE estudiante_id = {f}.estudiante_id AND asignatura_id = {f}.asignatura_id
+                        AND corte = {f}.corte
+                  ORDER BY fecha_registro)
+            WHERE 1
+            ON CONFLICT (estudiante_id, asignatura_id, corte) DO UPDATE SET
+                porcentaje_total = excluded.porcentaje_total,
+                suma_ponderada = excluded.suma_ponderada;
+        '''
+        for nombre, evento, filas in (
+                ("insert", "INSERT", ("new",)),
+                ("update", "UPDATE OF estudiante_id, asignatura_id, corte, nota, porcentaje",
+                 ("old", "new")),
+                ("delete", "DELETE", ("old",))):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_totales_corte_{nombre}")
+            cuerpo = "".join(recalcular_corte.format(f=fila) for fila in filas)
+            cursor.execute(f'''
+                CREATE TRIGGER trg_totales_corte_{nombre}
+                AFTER {evento} ON notas
+                BEGIN {cuerpo} END
+            ''')
+
+        for evento in ("INSERT", "UPDATE"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_promedios_asignatura_{evento.lower()}")
+            cursor.execute(f'''
+                CREATE TRIGGER trg_promedios_asignatura_{evento.lower()}
+                AFTER {evento} ON totales_corte
+                BEGIN
+                    INSERT INTO promedios_asignatura (estudiante_id, asignatura_id, promedio_final)
+                    SELECT new.estudiante_id, new.asignatura_id, {promedio}
+                    FROM (SELECT {ponderado} AS ponderado FROM totales_corte
+                          WHERE estudiante_id = new.estudiante_id
+                                AND asignatura_id = new.asignatura_id)
+                    WHERE 1
+                    ON CONFLICT (estudiante_id, asignatura_id)
+                    DO UPDATE SET promedio_final = excluded.promedio_final;
+                END
+            ''')
+
+        #version por (estudiante, asignatura) para ETags; cualquier cambio en
+        #sus notas la incrementa en la misma transaccion. secuencia es global y
+        #creciente: los procesos incrementales leen solo lo posterior a su marca
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS versiones_notas (
+                estudiante_id INTEGER NOT NULL,
+                asignatura_id INTEGER NOT NULL,
+                version INTEGER NOT NULL,
+                secuencia INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (estudiante_id, asignatura_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute("PRAGMA table_info(versiones_notas)")
+        if "secuencia" not in [columna[1] for columna in cursor.fetchall()]:
+            cursor.execute(
+                "ALTER TABLE versiones_notas ADD COLUMN secuencia INTEGER NOT NULL DEFAULT 0"
+            )
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_versiones_notas_secuencia
+            ON versiones_notas (secuencia)
+        ''')
+
+        for evento, filas in (("INSERT", ("new",)),
+                              ("UPDATE", ("old", "new")),
+                              ("DELETE", ("old",))):
+            incrementos = "".join(f'''
+                INSERT INTO versiones_notas (estudiante_id, asignatura_id, version, secuencia)
+                VALUES ({fila}.estudiante_id, {fila}.asignatura_id, 1,
+                        (SELECT COALESCE(MAX(secuencia), 0) + 1 FROM versiones_notas))
+                ON CONFLICT (estudiante_id, asignatura_id) DO UPDATE SET
+                    version = version + 1, secuencia = excluded.secuencia;
+            ''' for fila in filas)
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_versiones_notas_{evento.lower()}")
+            cursor.execute(f'''
+                CREATE TRIGGER trg_versiones_notas_{evento.lower()}
+                AFTER {evento} ON notas
+                BEGIN {incrementos}
+                END
+            ''')
+
+        #bandeja de salida de avisos de apelaciones: los triggers la llenan en
+        #la misma transaccion que crea o responde la apelacion, y
+        #DespachadorNotificaciones la vacia por lotes. El id sirve ademas de
+        #cursor de lectura por destinatario (ver notificaciones_sin_leer)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bandeja_notificaciones (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                evento TEXT NOT NULL,
+                apelacion_id INTEGER NOT NULL,
+                nota_id INTEGER NOT NULL,
+                destinatario_id INTEGER NOT NULL,
+                datos TEXT NOT NULL,
+                fecha TEXT NOT NULL,
+                estado TEXT NOT NULL DEFAULT 'pendiente',
+                intentos INTEGER NOT NULL DEFAULT 0,
+                proximo_intento REAL NOT NULL DEFAULT 0,
+                ultimo_error TEXT,
+                fecha_entrega TEXT
+            )
+        ''')
+        #solo las pendientes, en el orden en que el despachador las toma
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_bandeja_pendientes
+            ON bandeja_notificaciones (proximo_intento, id) WHERE estado = 'pendiente'
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_bandeja_destinatario
+            ON bandeja_notificaciones (destinatario_id, id)
+        ''')
+        datos_apelacion = '''json_object(
+            'apelacion_id', new.id, 'nota_id', new.nota_id,
+            'estudiante_id', new.estudiante_id, 'profesor_id', n.profesor_id,
+            'asignatura_id', n.asignatura_id, 'actividad', n.actividad, 'nota', n.nota,
+            'estado', new.estado, 'descripcion', new.descripcion,
+            'respuesta', new.respuesta_profesor)'''
+        #la respuesta avisa solo si cambia algo: reaplicar un incremental con
+        #los mismos valores no repite el aviso
+        for nombre, evento, condicion, destinatario, fecha in (
+                ("creada", "INSERT", "", "n.profesor_id", "new.fecha_creacion"),
+                ("respondida", "UPDATE OF estado, respuesta_profesor",
+                 "WHEN old.estado IS NOT new.estado "
+                 "OR old.respuesta_profesor IS NOT new.respuesta_profesor",
+                 "new.estudiante_id", "COALESCE(new.fecha_respuesta, datetime('now'))")):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_bandeja_apelacion_{nombre}")
+            cursor.execute(f'''
+                CREATE TRIGGER trg_bandeja_apelacion_{nombre}
+                AFTER {evento} ON apelaciones {condicion}
+                BEGIN
+                    INSERT INTO bandeja_notificaciones
+                        (evento, apelacion_id, nota_id, destinatario_id, datos, fecha)
+                    SELECT 'apelacion_{nombre}', new.id, new.nota_id, {destinatario},
+                           {datos_apelacion}, {fecha}
+                    FROM notas n WHERE n.id = new.nota_id;
+                END
+            ''')
+
+        self._crear_indice_texto(cursor)
+        self._crear_registro_cambios(cursor, self.TABLAS_NOTAS)
+
+    #tablas base de cada esquema; el resto se deriva de ellas con triggers
+    TABLAS_CATALOGO = ("usuarios", "asignaturas", "inscripciones")
+    TABLAS_NOTAS = ("notas", "apelaciones", "historial_modificaciones")
+
+    def _crear_registro_cambios(self, cursor, tablas: Tuple[str, ...]):
+        #registro de cambios para respaldos incrementales. Sus triggers solo
+        #existen en las bases que los activaron con un respaldo completo
+        #(respaldar_archivo con registrar_cambios); al actualizar el esquema se
+        #recrean si ya estaban. Los de versiones anteriores, instalados siempre, se quitan
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS registro_cambios (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                tabla TEXT NOT NULL,
+                operacion TEXT NOT NULL,
+                fila_id INTEGER NOT NULL,
+                datos TEXT
+            )
+        ''')
+        cursor.execute("PRAGMA user_version")
+        activo = (cursor.fetchone()[0] >= self.VERSION_REGISTRO_OPCIONAL
+                  and _registro_cambios_activo(cursor))
+        for tabla in tablas:
+            for evento in ("insert", "update", "delete"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS trg_cambios_{tabla}_{evento}")
+        if activo:
+            _instalar_registro_cambios(cursor, tablas)
+
+    #tablas FTS5 de contenido externo: cada una indexa las columnas de texto
+    #de su tabla con rowid = id de la fila, y los triggers la mantienen al dia
+    INDICES_TEXTO = {
+        "fts_notas": ("notas", ("justificacion",)),
+        "fts_apelaciones": ("apelaciones", ("descripcion", "respuesta_profesor")),
+        "fts_historial": ("historial_modificaciones", ("justificacion",)),
+    }
+
+    def _crear_indice_texto(self, cursor):
+        #si SQLite no trae FTS5, la busqueda usa LIKE
+        self._fts_disponible = True
+        for indice, (tabla, columnas) in self.INDICES_TEXTO.items():
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (indice,)
+            )
+            existia = cursor.fetchone() is not None
+            try:
+                cursor.execute(f'''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS {indice} USING fts5(
+                        {", ".join(columnas)}, content='{tabla}', content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2'
+                    )
+                ''')
+            except sqlite3.OperationalError:
+                self._fts_disponible = False
+                return
+            if not existia:
+                cursor.execute(f"INSERT INTO {indice}({indice}) VALUES ('rebuild')")
+
+            lista = ", ".join(columnas)
+            nuevos = ", ".join(f"new.{c}" for c in columnas)
+            viejos = ", ".join(f"old.{c}" for c in columnas)
+            insertar = f"INSERT INTO {indice} (rowid, {lista}) VALUES (new.id, {nuevos});"
+            borrar = (f"INSERT INTO {indice} ({indice}, rowid, {lista}) "
+                      f"VALUES ('delete', old.id, {viejos});")
+            for nombre, evento, cuerpo in (("insert", "INSERT", insertar),
+                                           ("delete", "DELETE", borrar),
+                                           ("update", f"UPDATE OF {lista}", borrar + insertar)):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{indice}_{nombre}
+                    AFTER {evento} ON {tabla}
+                    BEGIN {cuerpo} END
+                ''')
+
+    def _insertar_datos_prueba(self):
+    
+        conn = self._conexion()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT COUNT(*) FROM usuarios")
+        if cursor.fetchone()[0] == 0:
+            #usuarios de prueba
+            usuarios = [
+                ("profesor1", "pass123", "profesor", "Dr. Juan Pérez"),
+                ("profesor2", "pass123", "profesor", "Dra. María García"),
+                ("estudiante1", "pass123", "estudiante", "Carlos Rodríguez"),
+                ("estudiante2", "pass123", "estudiante", "Ana Martínez"),
+            ]
+            cursor.executemany(
+                "INSERT INTO usuarios (username, password, rol, nombre_completo) VALUES (?, ?, ?, ?)",
+                usuarios
+            )
+            
+            #materias/asignaturas de prueba
+            asignaturas = [
+                ("MAT101", "Cálculo Diferencial", 4, 1),
+                ("FIS101", "Física Mecánica", 4, 2),
+                ("PROG101", "Programación I", 3, 1),
+            ]
+            cursor.executemany(
+                "INSERT INTO asignaturas (codigo, nombre, creditos, profesor_id) VALUES (?, ?, ?, ?)",
+                asignaturas
+            )
+            
+            # inscribir estudiantes
+            inscripciones = [
+                (3, 1, "2025-1"),
+                (3, 2, "2025-1"),
+                (4, 1, "2025-1"),
+                (4, 3, "2025-1"),
+            ]
+            cursor.executemany(
+                "INSERT INTO inscripciones (estudiante_id, asignatura_id, periodo) VALUES (?, ?, ?)",
+                inscripciones
+            )
+            
+            conn.commit()
+        
+        self._liberar(conn)
+
+    def autenticar_usuario(self, username: str, password: str) -> Optional[Usuario]:
+        conn = self._conexion()
+        resultado = self.sentencias.consultar_uno(conn, "usuarios.autenticar",
+                                                  (username, password))
+        self._liberar(conn)
+        
+        if resultado:
+            return Usuario(*resultado)
+        return None
+    
+    def registrar_nota(self, nota: Nota) -> int:
+        #registra una nueva nota
+        #el total del corte se lee y se escribe dentro de la misma transaccion
+        conn = self._conexion_escritura(self.fragmento_de(asignatura_id=nota.asignatura_id))
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            nota_id = self._insertar_nota(cursor, nota)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._liberar(conn)
+        return nota_id
+
+    def _insertar_nota(self, cursor, nota: Nota) -> int:
+        #valida el total del corte e inserta; la transaccion la maneja quien llama
+        self._exigir_nota_valida(nota.nota)
+        fila = self.sentencias.consultar_uno(cursor, "totales_corte.obtener",
+                                             (nota.estudiante_id, nota.asignatura_id, nota.corte))
+        total_actual = fila[0] if fila else 0.0
+
+        if not ReglasLogicas.porcentaje_acumulado_valido(total_actual, nota.porcentaje):
+            raise ValueError(
+                f"El corte {nota.corte} ya suma {total_actual:.2f}%; "
+                f"agregar {nota.porcentaje:.2f}% supera el 100%"
+            )
+
+        self.sentencias.ejecutar(cursor, "notas.insertar", (
+            nota.estudiante_id, nota.asignatura_id, nota.corte, nota.actividad,
+            nota.nota, nota.porcentaje, nota.fecha_registro.isoformat(),
+            nota.profesor_id, nota.justificacion))
+        return cursor.lastrowid
+    
+    @staticmethod
+    def _exigir_nota_valida(valor: float):
+        #cualquier camino de escritura (CLI, API, coalescedor) pasa por aqui
+        if not ReglasLogicas.validar_nota(valor):
+            raise ValueError(f"La nota debe estar entre {ReglasLogicas.NOTA_MINIMA} "
+                             f"y {ReglasLogicas.NOTA_MAXIMA}; se recibió {valor}")
+
+    def modificar_nota(self, nota_id: int, nueva_nota: float, justificacion: str, profesor_id: int,
+                       version_esperada: Optional[int] = None) -> int:
+       #modifica una nota existente y registra el cambio en el historial
+       #lectura, actualizacion e historial van en una sola transaccion IMMEDIATE;
+       #con version_esperada se rechaza el cambio si otra sesion ya la modifico
+        conn = self._conexion_escritura(self.fragmento_de(id_registro=nota_id))
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            version = self._actualizar_nota(cursor, nota_id, nueva_nota, justificacion,
+                                            profesor_id, version_esperada)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._liberar(conn)
+        return version
+
+    def _actualizar_nota(self, cursor, nota_id: int, nueva_nota: float,
+                         justificacion: str, profesor_id: int,
+                         version_esperada: Optional[int] = None) -> int:
+        self._exigir_nota_valida(nueva_nota)
+        #obtener nota anterior
+        fila = self.sentencias.consultar_uno(cursor, "notas.valor_version", (nota_id,))
+        if not fila:
+            raise ValueError("Nota no encontrada")
+        nota_anterior, version = fila
+        if version_esperada is not None and version_esperada != version:
+            raise ConflictoVersion(nota_id, version_esperada, version)
+        
+        #actualizar nota solo si nadie la cambio desde la lectura
+        self.sentencias.ejecutar(cursor, "notas.actualizar",
+                                 (nueva_nota, justificacion, nota_id, version))
+        if cursor.rowcount != 1:
+            raise ConflictoVersion(nota_id, version, version + 1)
+        
+        #registrar en historial
+        self.sentencias.ejecutar(cursor, "historial.insertar", (
+            nota_id, nota_anterior, nueva_nota, datetime.now().isoformat(),
+            profesor_id, justificacion))
+        return version + 1
+    
+    def obtener_nota(self, nota_id: int) -> Optional[Nota]:
+        #una nota por su id
+        conn = self._conexion()
+        row = self.sentencias.consultar_uno(conn, "notas.obtener", (nota_id,))
+        self._liberar(conn)
+
+        if not row:
+            return None
+        return Nota(
+            id=row[0], estudiante_id=row[1], asignatura_id=row[2],
+            corte=row[3], actividad=row[4], nota=row[5], porcentaje=row[6],
+            fecha_registro=datetime.fromisoformat(row[7]),
+            profesor_id=row[8], justificacion=row[9], version=row[10]
+        )
+
+    def obtener_notas_estudiante(self, estudiante_id: int, asignatura_id: Optional[int] = None) -> List[Nota]:
+        #notas del estudiante
+        conn = self._conexion()
+        if asignatura_id:
+            filas = self.sentencias.consultar(conn, "notas.por_estudiante_asignatura",
+                                              (estudiante_id, asignatura_id))
+        else:
+            filas = self.sentencias.consultar(conn, "notas.por_estudiante", (estudiante_id,))
+        
+        notas = []
+        for row in filas:
+            nota = Nota(
+                id=row[0], estudiante_id=row[1], asignatura_id=row[2],
+                corte=row[3], actividad=row[4], nota=row[5], porcentaje=row[6],
+                fecha_registro=datetime.fromisoformat(row[7]),
+                profesor_id=row[8], justificacion=row[9], version=row[10]
+            )
+            notas.append(nota)
+        
+        self._liberar(conn)
+        return notas
+    
+
+    def crear_apelacion(self, apelacion: Apelacion) -> int:
+        #crear apelacion, en el mismo archivo que su nota
+        conn = self._conexion_escritura(self.fragmento_de(id_registro=apelacion.nota_id))
+        cursor = self.sentencias.ejecutar(conn, "apelaciones.insertar", (
+            apelacion.nota_id, apelacion.estudiante_id, apelacion.descripcion,
+            apelacion.estado.value, apelacion.fecha_creacion.isoformat()))
+        apelacion_id = cursor.lastrowid
+        conn.commit()
+        self._liberar(conn)
+        return apelacion_id
+    
+    def responder_apelacion(self, apelacion_id: int, respuesta: str, 
+                           estado: EstadoApelacion):
+        #responder apelacion
+        conn = self._conexion_escritura(self.fragmento_de(id_registro=apelacion_id))
+        self.sentencias.ejecutar(conn, "apelaciones.responder",
+                                 (respuesta, estado.value, datetime.now().isoformat(),
+                                  apelacion_id))
+        conn.commit()
+        self._liberar(conn)
+    
+    def propietarios_apelacion(self, apelacion_id: int) -> Optional[Tuple[int, int]]:
+        #(estudiante que apela, profesor de la nota); None si no existe
+        conn = self._conexion()
+        fila = self.sentencias.consultar_uno(conn, "apelaciones.propietarios", (apelacion_id,))
+        self._liberar(conn)
+        return fila
+
+    def obtener_apelaciones_estudiante(self, estudiante_id: int) -> List[Apelacion]:
+        #obtener las apelaciones de un estudiante
+        conn = self._conexion()
+        apelaciones = []
+        for row in self.sentencias.consultar(conn, "apelaciones.por_estudiante",
+                                             (estudiante_id,)):
+            apelacion = Apelacion(
+                id=row[0], nota_id=row[1], estudiante_id=row[2],
+                descripcion=row[3], estado=EstadoApelacion(row[4]),
+                fecha_creacion=datetime.fromisoformat(row[5]),
+                respuesta_profesor=row[6],
+                fecha_respuesta=datetime.fromisoformat(row[7]) if row[7] else None
+            )
+            apelaciones.append(apelacion)
+        
+        self._liberar(conn)
+        return apelaciones
+    
+    def obtener_apelaciones_profesor(self, profesor_id: int) -> List[Tuple]:
+        #apelaciones pendientes para el profesor
+        conn = self._conexion()
+        resultados = self.sentencias.consultar(conn, "apelaciones.por_profesor", (profesor_id,))
+        self._liberar(conn)
+        return resultados
+
+    def iterar_apelaciones_profesor(self, profesor_id: int) -> Iterator[Tuple]:
+        #las mismas filas sin armar la lista, para listados largos
+        return self._iterar("apelaciones.por_profesor", (profesor_id,))
+
+    def contar_apelaciones_por_estado(self, profesor_id: int) -> List[Tuple[str, int]]:
+        #(estado, cantidad) de las apelaciones a notas del profesor
+        conn = self._conexion()
+        resultados = self.sentencias.consultar(conn, "apelaciones.contar_por_estado",
+                                               (profesor_id,))
+        self._liberar(conn)
+        return resultados
+
+    #avisos de apelaciones (bandeja_notificaciones). Lo leido por cada usuario
+    #es una marca por fragmento en marcas_procesamiento: contar lo no leido
+    #recorre solo el indice (destinatario_id, id) desde esa marca
+    @staticmethod
+    def _proceso_leidas(usuario_id: int) -> str:
+        return f"notificaciones_leidas:{usuario_id}"
+
+    def notificaciones_sin_leer(self, usuario_id: int) -> int:
+        marca = self.obtener_marca_procesamiento(self._proceso_leidas(usuario_id)) or {}
+        partes = " UNION ALL ".join(
+            self.sentencias.sql("notificaciones.sin_leer", esquema=esquema)
+            for _, esquema in self._esquemas_notas()
+        )
+        parametros = []
+        for fragmento, _ in self._esquemas_notas():
+            parametros += [usuario_id, marca.get(fragmento, 0)]
+        conn = self._conexion()
+        cantidad = self.sentencias.consultar_uno(conn, "notificaciones.contar", parametros,
+                                                 partes=partes)[0]
+        self._liberar(conn)
+        return cantidad
+
+    def obtener_notificaciones(self, usuario_id: int, solo_sin_leer: bool = True,
+                               limite: int = 50) -> List[Dict]:
+        #avisos del usuario, los mas recientes primero
+        marca = self.obtener_marca_procesamiento(self._proceso_leidas(usuario_id)) or {}
+        partes = " UNION ALL ".join(
+            self.sentencias.sql("notificaciones.de_usuario", esquema=esquema)
+            for _, esquema in self._esquemas_notas()
+        )
+        parametros = []
+        for fragmento, _ in self._esquemas_notas():
+            parametros += [usuario_id, marca.get(fragmento, 0) if solo_sin_leer else 0]
+        conn = self._conexion()
+        filas = self.sentencias.consultar(conn, "notificaciones.listar", (*parametros, limite),
+                                          partes=partes)
+        self._liberar(conn)
+        return [{
+            "id": id_aviso, "evento": evento, "apelacion_id": apelacion_id,
+            "nota_id": nota_id, "fecha": fecha, "datos": json.loads(datos),
+            "leida": id_aviso <= marca.get(self.fragmento_de(id_registro=id_aviso), 0),
+        } for id_aviso, evento, apelacion_id, nota_id, datos, fecha in filas]
+
+    def marcar_notificaciones_leidas(self, usuario_id: int,
+                                     ids: Optional[List[int]] = None) -> Dict[int, int]:
+        #mueve la marca de lectura hasta los avisos indicados (sin ids, hasta el
+        #ultimo de cada fragmento); nunca la retrocede. Devuelve la marca nueva
+        hasta: Dict[int, int] = {}
+        conn = self._conexion()
+        try:
+            if ids is None:
+                for fragmento, esquema in self._esquemas_notas():
+                    hasta[fragmento] = self.sentencias.consultar_uno(
+                        conn, "notificaciones.ultima", (usuario_id,), esquema=esquema)[0]
+            else:
+                for id_aviso in ids:
+                    fragmento = self.fragmento_de(id_registro=id_aviso)
+                    hasta[fragmento] = max(hasta.get(fragmento, 0), id_aviso)
+            proceso = self._proceso_leidas(usuario_id)
+            self.sentencias.ejecutar_varios(
+                conn, "marcas.avanzar",
+                [(self._nombre_marca(proceso, fragmento), id_aviso)
+                 for fragmento, id_aviso in hasta.items() if id_aviso])
+            conn.commit()
+        finally:
+            self._liberar(conn)
+        return self.obtener_marca_procesamiento(proceso) or {}
+
+    def tomar_notificaciones_pendientes(self, lote: int = 100, reserva: float = 60.0,
+                                        ahora: Optional[float] = None) -> List[Dict]:
+        #hasta lote avisos pendientes cuyo intento ya toca, apartados por reserva
+        #segundos: si el despachador cae antes de confirmarlos, vuelven a salir
+        ahora = time.time() if ahora is None else ahora
+        tomadas: List[Dict] = []
+        for fragmento, _ in self._esquemas_notas():
+            if len(tomadas) >= lote:
+                break
+            conn = self._conexion_escritura(fragmento)
+            cursor = conn.cursor()
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                filas = self.sentencias.consultar(cursor, "notificaciones.pendientes",
+                                                  (ahora, lote - len(tomadas)))
+                if filas:
+                    self.sentencias.ejecutar(cursor, "notificaciones.reservar",
+                                             (ahora + reserva,
+                                              json.dumps([fila[0] for fila in filas])))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._liberar(conn)
+            tomadas += [{
+                "id": id_aviso, "evento": evento, "apelacion_id": apelacion_id,
+                "nota_id": nota_id, "destinatario_id": destinatario_id,
+                "datos": json.loads(datos), "fecha": fecha, "intentos": intentos,
+            } for id_aviso, evento, apelacion_id, nota_id, destinatario_id, datos, fecha, intentos
+                in filas]
+        return tomadas
+
+    def confirmar_notificaciones(self, ids: List[int]):
+        fecha = datetime.now().isoformat()
+        for fragmento, ids_fragmento in self._agrupar_por_fragmento(ids).items():
+            conn = self._conexion_escritura(fragmento)
+            self.sentencias.ejecutar(conn, "notificaciones.confirmar",
+                                     (fecha, json.dumps(ids_fragmento)))
+            conn.commit()
+            self._liberar(conn)
+
+    def reprogramar_notificaciones(self, ids: List[int], error: str, espera_base: float,
+                                   espera_maxima: float, max_intentos: int,
+                                   ahora: Optional[float] = None):
+        #nuevo intento tras una espera exponencial; al agotar max_intentos el
+        #aviso queda 'fallida' y ya no se toma
+        ahora = time.time() if ahora is None else ahora
+        for fragmento, ids_fragmento in self._agrupar_por_fragmento(ids).items():
+            conn = self._conexion_escritura(fragmento)
+            self.sentencias.ejecutar(conn, "notificaciones.reprogramar",
+                                     (error, ahora, espera_base, espera_maxima, max_intentos,
+                                      json.dumps(ids_fragmento)))
+            conn.commit()
+            self._liberar(conn)
+
+    def resumen_bandeja(self) -> Dict[str, int]:
+        #{estado: cantidad} sumando todos los fragmentos
+        resumen: Dict[str, int] = {}
+        for fragmento, _ in self._esquemas_notas():
+            conn = self._conexion_escritura(fragmento)
+            for estado, cantidad in self.sentencias.consultar(conn, "notificaciones.por_estado"):
+                resumen[estado] = resumen.get(estado, 0) + cantidad
+            self._liberar(conn)
+        return resumen
+
+    def _agrupar_por_fragmento(self, ids: Iterable[int]) -> Dict[int, List[int]]:
+        grupos: Dict[int, List[int]] = {}
+        for id_registro in ids:
+            grupos.setdefault(self.fragmento_de(id_registro=id_registro), []).append(id_registro)
+        return grupos
+    
+    def obtener_asignaturas_profesor(self, profesor_id: int) -> List[Tuple]:
+        #asignaturas del profesor
+        conn = self._conexion()
+        resultados = self.sentencias.consultar(conn, "asignaturas.por_profesor", (profesor_id,))
+        self._liberar(conn)
+        return resultados
+    
+    def profesor_de_asignatura(self, asignatura_id: int) -> Optional[int]:
+        #None si la asignatura no existe
+        conn = self._conexion()
+        fila = self.sentencias.consultar_uno(conn, "asignaturas.profesor", (asignatura_id,))
+        self._liberar(conn)
+        return fila[0] if fila else None
+
+    def obtener_estudiantes_asignatura(self, asignatura_id: int) -> List[Tuple]:
+        #estudiantes inscritos en la asignatura (en cualquier periodo), en cache
+        return list(self._roster(asignatura_id)[0])
+
+    def esta_inscrito(self, estudiante_id: int, asignatura_id: int) -> bool:
+        return estudiante_id in self._roster(asignatura_id)[1]
+
+    def _roster(self, asignatura_id: int) -> Tuple[List[Tuple], frozenset]:
+        #cada entrada guarda la version de versiones_inscripciones con que se
+        #leyo; si otra instancia o proceso inscribio, la version ya no coincide.
+        #La version se lee antes que el roster: un cambio entre ambas lecturas
+        #deja una version vieja y el roster se vuelve a leer en el siguiente uso
+        conn = self._conexion()
+        try:
+            fila = self.sentencias.consultar_uno(conn, "inscripciones.version",
+                                                 (asignatura_id,))
+            version = fila[0] if fila else 0
+            with self._candado_rosters:
+                guardado = self._rosters.get(asignatura_id)
+                generacion = self._generacion_rosters
+            if guardado is not None and guardado[0] == version:
+                return guardado[1]
+            filas = self.sentencias.consultar(conn, "inscripciones.roster", (asignatura_id,))
+        finally:
+            self._liberar(conn)
+        roster = (filas, frozenset(fila[0] for fila in filas))
+        with self._candado_rosters:
+            #si hubo una invalidacion durante la consulta el resultado puede
+            #estar desactualizado, y no se guarda
+            if generacion == self._generacion_rosters:
+                self._rosters[asignatura_id] = (version, roster)
+        return roster
+
+    def invalidar_rosters(self, asignaturas: Optional[List[int]] = None):
+        #sin asignaturas vacia toda la cache. Los cambios de otros procesos
+        #se detectan solos (versiones_inscripciones)
+        with self._candado_rosters:
+            self._generacion_rosters += 1
+            if asignaturas is None:
+                self._rosters.clear()
+            else:
+                for asignatura_id in asignaturas:
+                    self._rosters.pop(asignatura_id, None)
+
+    def inscribir(self, inscripciones: List[Tuple[int, int, str]]) -> Dict:
+        #inscripciones: (estudiante_id, asignatura_id, periodo), todas en una
+        #transaccion; las que ya existen se conservan tal cual
+        inscripciones = self._validar_inscripciones(inscripciones, verificar_ids=True)
+        return self._modificar_inscripciones("inscripciones.insertar", inscripciones,
+                                             "inscritas", "existentes")
+
+    def desinscribir(self, inscripciones: List[Tuple[int, int, str]]) -> Dict:
+        #retira inscripciones en una transaccion; las notas registradas se
+        #conservan, las alertas del periodo retirado no
+        inscripciones = self._validar_inscripciones(inscripciones, verificar_ids=False)
+        return self._modificar_inscripciones("inscripciones.eliminar", inscripciones,
+                                             "retiradas", "inexistentes",
+                                             "alertas.eliminar_inscripcion")
+
+    def _validar_inscripciones(self, inscripciones: List[Tuple[int, int, str]],
+                               verificar_ids: bool) -> List[Tuple[int, int, str]]:
+        validas = []
+        for inscripcion in inscripciones:
+            try:
+                estudiante_id, asignatura_id, periodo = inscripcion
+            except (TypeError, ValueError):
+                raise ValueError(f"Inscripción inválida: {inscripcion!r}")
+            if (not isinstance(estudiante_id, int) or not isinstance(asignatura_id, int)
+                    or not isinstance(periodo, str) or not periodo.strip()):
+                raise ValueError(f"Inscripción inválida: {inscripcion!r}")
+            validas.append((estudiante_id, asignatura_id, periodo.strip()))
+        validas = list(dict.fromkeys(validas))
+        if not verificar_ids or not validas:
+            return validas
+
+        conn = self._conexion()
+        try:
+            estudiantes = sorted(fila[0] for fila in self.sentencias.consultar(
+                conn, "inscripciones.no_estudiantes",
+                (json.dumps([est for est, _, _ in validas]),)))
+            asignaturas = sorted(fila[0] for fila in self.sentencias.consultar(
+                conn, "inscripciones.asignaturas_inexistentes",
+                (json.dumps([asig for _, asig, _ in validas]),)))
+        finally:
+            self._liberar(conn)
+        if estudiantes:
+            raise ValueError(f"No son estudiantes: {estudiantes[:10]}")
+        if asignaturas:
+            raise ValueError(f"Asignaturas inexistentes: {asignaturas[:10]}")
+        return validas
+
+    def _modificar_inscripciones(self, sentencia: str, inscripciones: List[Tuple[int, int, str]],
+                                 afectadas: str, sin_efecto: str,
+                                 complemento: Optional[str] = None) -> Dict:
+        #BEGIN diferido como en guardar_alertas: con fragmentos adjuntos
+        #IMMEDIATE bloquearia tambien a los escritores de notas
+        conn = self._conexion()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            self.sentencias.ejecutar_varios(cursor, sentencia, inscripciones)
+            #rowcount no cuenta las filas escritas por triggers
+            cambios = max(cursor.rowcount, 0)
+            if complemento:
+                self.sentencias.ejecutar_varios(cursor, complemento, inscripciones)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._liberar(conn)
+        self.invalidar_rosters(sorted({asig for _, asig, _ in inscripciones}))
+        return {afectadas: cambios, sin_efecto: len(inscripciones) - cambios}
+    
+    def obtener_asignaturas_estudiante(self, estudiante_id: int) -> List[Tuple]:
+        #asignaturas inscritas del estudiante
+        conn = self._conexion()
+        resultados = self.sentencias.consultar(conn, "asignaturas.por_estudiante",
+                                               (estudiante_id,))
+        self._liberar(conn)
+        return resultados
+    
+    def obtener_historial_modificaciones(self, nota_id: int) -> List[Tuple]:
+        #historial de modificaciones de una nota
+        conn = self._conexion()
+        resultados = self.sentencias.consultar(conn, "historial.por_nota", (nota_id,))
+        self._liberar(conn)
+        return resultados
+
+    def contar_modificaciones_profesor(self, profesor_id: int, desde: str) -> int:
+        #modificaciones hechas por el profesor desde la fecha ISO indicada
+        conn = self._conexion()
+        fila = self.sentencias.consultar_uno(conn, "historial.contar_profesor_desde",
+                                             (profesor_id, desde))
+        self._liberar(conn)
+        return fila[0]
+
+    def obtener_version_notas(self, estudiante_id: int, asignatura_id: int) -> int:
+        #busqueda por llave primaria; 0 si el par nunca ha tenido notas
+        conn = self._conexion()
+        fila = self.sentencias.consultar_uno(conn, "versiones_notas.obtener",
+                                             (estudiante_id, asignatura_id))
+        self._liberar(conn)
+        return fila[0] if fila else 0
+
+    def iterar_promedios_por_periodo(self) -> Iterator[Tuple]:
+        #toda la institucion, ordenada por estudiante, sin armar la lista
+        return self._iterar("inscripciones.promedios_por_periodo", filtro="")
+
+    def obtener_promedios_por_periodo(self, estudiante_id: Optional[int] = None) -> List[Tuple]:
+        #(estudiante_id, periodo, suma de promedio x creditos, creditos) en una
+        #sola consulta agregada sobre los promedios materializados; sin
+        #estudiante_id devuelve toda la institucion
+        filtro = "WHERE i.estudiante_id = ?" if estudiante_id is not None else ""
+        conn = self._conexion()
+        resultados = self.sentencias.consultar(
+            conn, "inscripciones.promedios_por_periodo",
+            (estudiante_id,) if estudiante_id is not None else (), filtro=filtro)
+        self._liberar(conn)
+        return resultados
+
+    def obtener_expediente(self, estudiante_id: int) -> List[Tuple]:
+        #(periodo, asignatura_id, codigo, nombre, creditos, promedio_final)
+        conn = self._conexion()
+        resultados = self.sentencias.consultar(conn, "inscripciones.expediente",
+                                               (estudiante_id,))
+        self._liberar(conn)
+        return resultados
+
+    def obtener_ranking_asignatura(self, asignatura_id: int, limite: int = 50,
+                                   desplazamiento: int = 0, grupos: int = 4,
+                                   estudiante_id: Optional[int] = None) -> List[Tuple]:
+        #(posicion, estudiante_id, nombre, promedio_final, percent_rank, grupo, total)
+        #las funciones de ventana se evaluan sobre todo el curso y luego se pagina;
+        #con estudiante_id solo se devuelve su fila
+        filtro = "WHERE r.estudiante_id = ?" if estudiante_id is not None else ""
+        parametros = [asignatura_id, asignatura_id, grupos]
+        if estudiante_id is not None:
+            parametros.append(estudiante_id)
+        conn = self._conexion()
+        resultados = self.sentencias.consultar(conn, "ranking.asignatura",
+                                               (*parametros, limite, desplazamiento),
+                                               filtro=filtro)
+        self._liberar(conn)
+        return resultados
+
+    def obtener_mejores_promedios(self, limite: int = 10, desplazamiento: int = 0,
+                                  periodo: Optional[str] = None) -> List[Tuple]:
+        #(posicion, estudiante_id, nombre, promedio ponderado por creditos, creditos)
+        #de toda la institucion o de un periodo
+        filtro = "WHERE periodo = ?" if periodo is not None else ""
+        conn = self._conexion()
+        resultados = self.sentencias.consultar(
+            conn, "ranking.institucion",
+            (*((periodo,) if periodo is not None else ()), limite, desplazamiento),
+            filtro=filtro)
+        self._liberar(conn)
+        return resultados
+
+    @staticmethod
+    def _nombre_marca(proceso: str, fragmento: int) -> str:
+        return proceso if fragmento == 0 else f"{proceso}#{fragmento}"
+
+    def obtener_marca_procesamiento(self, proceso: str) -> Optional[Dict[int, int]]:
+        #{fragmento: secuencia}; cada archivo de notas numera sus cambios por
+        #separado. None si el proceso nunca se ha ejecutado
+        nombres = {self._nombre_marca(proceso, fragmento): fragmento
+                   for fragmento, _ in self._esquemas_notas()}
+        conn = self._conexion()
+        marca = {nombres[nombre]: secuencia for nombre, secuencia in self.sentencias.consultar(
+            conn, "marcas.obtener", list(nombres), marcadores=", ".join("?" * len(nombres)))}
+        self._liberar(conn)
+        if not marca:
+            return None
+        return {fragmento: marca.get(fragmento, 0) for fragmento in nombres.values()}
+
+    def obtener_estado_inscripciones(self, desde: Optional[Dict[int, int]] = None,
+                                     periodo: Optional[str] = None
+                                     ) -> Tuple[Dict[int, int], List[Tuple]]:
+        #(secuencias leidas, [(estudiante_id, asignatura_id, periodo, promedio_final,
+        #porcentaje registrado en los tres cortes)]); con desde solo las
+        #inscripciones cuyas notas cambiaron despues de esa marca
+        condiciones, parametros = [], []
+        origen = "inscripciones i"
+        conn = self._conexion()
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        try:
+            hasta = {}
+            for fragmento, esquema in self._esquemas_notas():
+                hasta[fragmento] = self.sentencias.consultar_uno(
+                    cursor, "versiones_notas.ultima_secuencia", esquema=esquema)[0]
+            if desde is not None:
+                cambios = " UNION ALL ".join(
+                    self.sentencias.sql("versiones_notas.cambios", esquema=esquema)
+                    for _, esquema in self._esquemas_notas()
+                )
+                origen = f'''({cambios}) v
+                    JOIN inscripciones i ON i.estudiante_id = v.estudiante_id
+                                        AND i.asignatura_id = v.asignatura_id'''
+                for fragmento, _ in self._esquemas_notas():
+                    parametros += [desde.get(fragmento, 0), hasta[fragmento]]
+            if periodo is not None:
+                condiciones.append("i.periodo = ?")
+                parametros.append(periodo)
+            filtro = "WHERE " + " AND ".join(condiciones) if condiciones else ""
+            resultados = self.sentencias.consultar(cursor, "inscripciones.estado", parametros,
+                                                   origen=origen, filtro=filtro)
+        finally:
+            conn.commit()
+            self._liberar(conn)
+        return hasta, resultados
+
+    def guardar_alertas(self, proceso: str, secuencias: Dict[int, int], alertas: List[Tuple],
+                        resueltas: List[Tuple[int, int]], reemplazar: bool = False,
+                        periodo: Optional[str] = None):
+        #alertas: (estudiante_id, asignatura_id, periodo, nivel, promedio_actual,
+        #porcentaje_completado, nota_necesaria, fecha); en una sola transaccion
+        #junto con la marca, para que una falla no deje la marca adelantada.
+        #reemplazar borra antes todas las alertas (del periodo, si se indica).
+        #BEGIN diferido: la primera sentencia ya escribe, y con fragmentos
+        #adjuntos IMMEDIATE bloquearia tambien a sus escritores
+        conn = self._conexion()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            if reemplazar:
+                if periodo is not None:
+                    self.sentencias.ejecutar(cursor, "alertas.eliminar_periodo", (periodo,))
+                else:
+                    self.sentencias.ejecutar(cursor, "alertas.eliminar_todas")
+            else:
+                self.sentencias.ejecutar_varios(cursor, "alertas.eliminar_resuelta", resueltas)
+            self.sentencias.ejecutar_varios(cursor, "alertas.guardar", alertas)
+            self.sentencias.ejecutar_varios(
+                cursor, "marcas.avanzar",
+                [(self._nombre_marca(proceso, fragmento), secuencia)
+                 for fragmento, secuencia in secuencias.items()])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._liberar(conn)
+
+    def obtener_alertas(self, asignatura_id: Optional[int] = None,
+                        profesor_id: Optional[int] = None, nivel: Optional[str] = None,
+                        limite: int = 100, desplazamiento: int = 0) -> List[Tuple]:
+        #(estudiante_id, nombre, asignatura_id, codigo, periodo, nivel, promedio_actual,
+        #porcentaje_completado, nota_necesaria, fecha_deteccion); inalcanzables primero
+        condiciones, parametros = [], []
+        for columna, valor in (("al.asignatura_id", asignatura_id),
+                               ("a.profesor_id", profesor_id), ("al.nivel", nivel)):
+            if valor is not None:
+                condiciones.append(f"{columna} = ?")
+                parametros.append(valor)
+        filtro = "WHERE " + " AND ".join(condiciones) if condiciones else ""
+        conn = self._conexion()
+        resultados = self.sentencias.consultar(conn, "alertas.listar",
+                                               (*parametros, limite, desplazamiento),
+                                               filtro=filtro)
+        self._liberar(conn)
+        return resultados
+
+    def actualizar_series_notas(self, completo: bool = False) -> Dict:
+        #lleva a series_notas las notas registradas y modificadas desde la
+        #ultima marca: +1 en el dia de fecha_registro con el valor original de
+        #la nota (nota_anterior de su primera modificacion) y, por cada
+        #modificacion, -1 con nota_anterior y +1 con nota_nueva en su dia.
+        #completo=True o la primera vez reconstruye la tabla
+        previas = {proceso: self.obtener_marca_procesamiento(proceso)
+                   for proceso in ("series_notas", "series_historial")}
+        desde = {proceso: None if completo else marca for proceso, marca in previas.items()}
+        hasta: Dict[str, Dict[int, int]] = {"series_notas": {}, "series_historial": {}}
+        resumen = {"completo": desde["series_notas"] is None, "notas": 0, "modificaciones": 0}
+        conn = self._conexion()
+        cursor = conn.cursor()
+        try:
+            #ultimos ids en una sola instantanea; lo confirmado despues queda para
+            #la siguiente actualizacion
+            cursor.execute("BEGIN")
+            for fragmento, esquema in self._esquemas_notas():
+                for proceso, sentencia in (("series_notas", "notas.ultimo_id"),
+                                           ("series_historial", "historial.ultimo_id")):
+                    hasta[proceso][fragmento] = self.sentencias.consultar_uno(
+                        cursor, sentencia, esquema=esquema)[0]
+            conn.commit()
+
+            #BEGIN diferido como en guardar_alertas. La primera escritura avanza las
+            #marcas solo si siguen como se leyeron: dos actualizaciones simultaneas
+            #no pueden contar dos veces los mismos cambios
+            cursor.execute("BEGIN")
+            for proceso, marcas in hasta.items():
+                for fragmento, secuencia in marcas.items():
+                    previa = (previas[proceso] or {}).get(fragmento, 0)
+                    self.sentencias.ejecutar(
+                        cursor, "marcas.reclamar",
+                        (self._nombre_marca(proceso, fragmento), secuencia, previa))
+                    if cursor.rowcount != 1:
+                        conn.rollback()
+                        resumen["omitida"] = True
+                        return resumen
+            if resumen["completo"]:
+                self.sentencias.ejecutar(cursor, "series.vaciar")
+            for fragmento, esquema in self._esquemas_notas():
+                rangos = [((desde[proceso] or {}).get(fragmento, 0), hasta[proceso][fragmento])
+                          for proceso in ("series_notas", "series_historial")]
+                resumen["notas"] += self.sentencias.consultar_uno(
+                    cursor, "notas.contar_rango", rangos[0], esquema=esquema)[0]
+                resumen["modificaciones"] += self.sentencias.consultar_uno(
+                    cursor, "historial.contar_rango", rangos[1], esquema=esquema)[0]
+                self.sentencias.ejecutar(cursor, "series.acumular", (*rangos[0], *rangos[1]),
+                                         esquema=esquema)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._liberar(conn)
+        return resumen
+
+    def obtener_serie_notas(self, asignatura_id: int, desde: Optional[str] = None,
+                            hasta: Optional[str] = None
+                            ) -> Tuple[Dict[int, Tuple[int, float]], List[Tuple]]:
+        #({casilla: (cantidad, suma)} acumulado antes de desde, [(dia, casilla,
+        #cantidad, suma)] de desde a hasta en orden de dia); solo lee series_notas
+        conn = self._conexion()
+        inicial = {}
+        if desde:
+            inicial = {casilla: (cantidad, suma) for casilla, cantidad, suma
+                       in self.sentencias.consultar(conn, "series.inicial",
+                                                    (asignatura_id, desde))}
+        cambios = self.sentencias.consultar(conn, "series.cambios",
+                                            (asignatura_id, desde or "", hasta or "9999-12-31"))
+        self._liberar(conn)
+        return inicial, cambios
+
+    def auditar_historial(self, detectar: Callable[[Iterator[Tuple]], Iterable[Tuple]],
+                          lote: int = 1000) -> int:
+        #recorre una sola vez modificaciones y apelaciones de todos los
+        #fragmentos, mezcladas en orden de fecha, y reemplaza hallazgos_auditoria
+        #con las filas (tipo, nota_id, historial_id, apelacion_id, estudiante_id,
+        #asignatura_id, profesor_id, fecha, valor, detalle) que produce detectar.
+        #Cada evento es (fecha, clase, id, nota_id, asignatura_id, profesor_id,
+        #estudiante_id, nota_anterior, nota_nueva, fecha_registro), con clase 0
+        #para apelaciones (sin notas ni fecha_registro) y 1 para modificaciones.
+        #La lectura es una instantanea y los hallazgos se acumulan en una tabla
+        #temporal: el bloqueo de escritura solo se toma al final, para el reemplazo
+        conn = self.obtener_conexion()
+        insertados = 0
+        try:
+            self.sentencias.ejecutar(conn, "auditoria.crear_temporal")
+            conn.execute("BEGIN")
+            flujos = []
+            for _, esquema in self._esquemas_notas():
+                for sentencia in ("auditoria.flujo_historial", "auditoria.flujo_apelaciones"):
+                    flujos.append(self.sentencias.ejecutar(conn, sentencia, esquema=esquema))
+            hallazgos = iter(detectar(heapq.merge(*flujos)))
+            while True:
+                bloque = list(itertools.islice(hallazgos, lote))
+                if not bloque:
+                    break
+                self.sentencias.ejecutar_varios(conn, "auditoria.insertar_temporal", bloque)
+                insertados += len(bloque)
+            conn.commit()
+
+            #BEGIN diferido como en guardar_alertas
+            conn.execute("BEGIN")
+            self.sentencias.ejecutar(conn, "auditoria.vaciar")
+            self.sentencias.ejecutar(conn, "auditoria.publicar")
+            conn.commit()
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return insertados
+
+    def obtener_hallazgos_auditoria(self, tipo: Optional[str] = None,
+                                    asignatura_id: Optional[int] = None,
+                                    profesor_id: Optional[int] = None,
+                                    nota_id: Optional[int] = None,
+                                    desde: Optional[str] = None, hasta: Optional[str] = None,
+                                    limite: int = 100, desplazamiento: int = 0) -> List[Tuple]:
+        #(id, tipo, nota_id, historial_id, apelacion_id, estudiante_id, asignatura_id,
+        #profesor_id, fecha, valor, detalle) del ultimo analisis, mas recientes primero
+        condiciones, parametros = [], []
+        for columna, valor in (("tipo", tipo), ("asignatura_id", asignatura_id),
+                               ("profesor_id", profesor_id), ("nota_id", nota_id)):
+            if valor is not None:
+                condiciones.append(f"{columna} = ?")
+                parametros.append(valor)
+        if desde:
+            condiciones.append("fecha >= ?")
+            parametros.append(desde)
+        if hasta:
+            #fecha sola incluye todo ese dia, como en buscar_texto
+            condiciones.append("fecha <= ?")
+            parametros.append(hasta if "T" in hasta else hasta + "T23:59:59.999999")
+        filtro = "WHERE " + " AND ".join(condiciones) if condiciones else ""
+        conn = self._conexion()
+        resultados = self.sentencias.consultar(conn, "auditoria.hallazgos",
+                                               (*parametros, limite, desplazamiento),
+                                               filtro=filtro)
+        self._liberar(conn)
+        return resultados
+
+    def auditar_porcentajes(self) -> List[Dict]:
+        #cortes de toda la institucion cuyo porcentaje total no es 100%
+        return list(self.iterar_auditoria_porcentajes())
+
+    def iterar_auditoria_porcentajes(self) -> Iterator[Dict]:
+        #un solo recorrido agrupado sobre notas, usando el indice por corte;
+        #cada hallazgo se entrega al leerlo
+        for estudiante_id, asignatura_id, corte, total, actividades in self._iterar(
+                "notas.porcentajes_distintos_de_100", (ReglasLogicas.TOLERANCIA_PORCENTAJE,)):
+            yield {
+                "estudiante_id": estudiante_id,
+                "asignatura_id": asignatura_id,
+                "corte": corte,
+                "porcentaje_total": round(total, 2),
+                "actividades": actividades,
+                "estado": "excedido" if total > 100.0 else "incompleto"
+            }
+
+    def buscar_texto(self, consulta: str, asignatura_id: Optional[int] = None,
+                     profesor_id: Optional[int] = None, desde: Optional[str] = None,
+                     hasta: Optional[str] = None, limite: int = 20,
+                     desplazamiento: int = 0) -> List[Dict]:
+        #busqueda por relevancia (bm25) en justificaciones, apelaciones,
+        #respuestas de profesores e historial, con filtros y paginacion
+        if not self.fts_disponible:
+            return self.buscar_texto_like(consulta, asignatura_id, profesor_id, desde, hasta,
+                                          limite, desplazamiento)
+        expresion = self._expresion_fts(consulta)
+        if not expresion:
+            return []
+
+        filtros, parametros = self._filtros_busqueda(asignatura_id, profesor_id, desde, hasta)
+        conn = self._conexion()
+        resultados = [self._fila_busqueda(fila) for fila in self.sentencias.consultar(
+            conn, "busqueda.fts",
+            {**parametros, "consulta": expresion, "limite": limite,
+             "desplazamiento": desplazamiento},
+            filtro=filtros)]
+        self._liberar(conn)
+        return resultados
+
+    def buscar_texto_like(self, consulta: str, asignatura_id: Optional[int] = None,
+                          profesor_id: Optional[int] = None, desde: Optional[str] = None,
+                          hasta: Optional[str] = None, limite: int = 20,
+                          desplazamiento: int = 0) -> List[Dict]:
+        #misma busqueda con LIKE: recorre las tablas completas y no ordena por relevancia
+        palabras = consulta.split()
+        if not palabras:
+            return []
+        filtros, parametros = self._filtros_busqueda(asignatura_id, profesor_id, desde, hasta)
+        for i, palabra in enumerate(palabras):
+            parametros[f"p{i}"] = f"%{palabra}%"
+
+        def condicion(*columnas: str) -> str:
+            return " AND ".join(
+                "(" + " OR ".join(f"{c} LIKE :p{i}" for c in columnas) + ")"
+                for i in range(len(palabras))
+            )
+
+        conn = self._conexion()
+        resultados = [self._fila_busqueda(fila) for fila in self.sentencias.consultar(
+            conn, "busqueda.like",
+            {**parametros, "limite": limite, "desplazamiento": desplazamiento},
+            en_notas=condicion("n.justificacion"),
+            en_apelaciones=condicion("a.descripcion", "a.respuesta_profesor"),
+            en_historial=condicion("h.justificacion"), filtro=filtros)]
+        self._liberar(conn)
+        return resultados
+
+    @staticmethod
+    def _expresion_fts(consulta: str) -> str:
+        #cada palabra como frase entre comillas para que el texto del usuario
+        #nunca se interprete como sintaxis FTS5; "palabra*" busca por prefijo
+        terminos = []
+        for palabra in consulta.split():
+            prefijo = palabra.endswith("*") and len(palabra) > 1
+            palabra = palabra.rstrip("*").replace('"', '""')
+            if palabra:
+                terminos.append(f'"{palabra}"' + ("*" if prefijo else ""))
+        return " ".join(terminos)
+
+    @staticmethod
+    def _filtros_busqueda(asignatura_id: Optional[int], profesor_id: Optional[int],
+                          desde: Optional[str], hasta: Optional[str]) -> Tuple[str, Dict]:
+        condiciones, parametros = [], {}
+        if asignatura_id is not None:
+            condiciones.append("asignatura_id = :asignatura_id")
+            parametros["asignatura_id"] = asignatura_id
+        if profesor_id is not None:
+            condiciones.append("profesor_id = :profesor_id")
+            parametros["profesor_id"] = profesor_id
+        if desde:
+            condiciones.append("fecha >= :desde")
+            parametros["desde"] = desde
+        if hasta:
+            #fecha sola incluye todo ese dia
+            condiciones.append("fecha <= :hasta")
+            parametros["hasta"] = hasta if "T" in hasta else hasta + "T23:59:59.999999"
+        filtros = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+        return filtros, parametros
+
+    @staticmethod
+    def _fila_busqueda(fila: Tuple) -> Dict:
+        origen, id_, nota_id, asignatura_id, profesor_id, fecha, fragmento, rango = fila
+        return {"origen": origen, "id": id_, "nota_id": nota_id,
+                "asignatura_id": asignatura_id, "profesor_id": profesor_id,
+                "fecha": fecha, "fragmento": fragmento, "rango": rango}
+
+
+class BaseDatosFragmentada(BaseDatos):
+    #notas repartidas por asignatura en varios archivos (fragmentos), cada uno
+    #con su propio bloqueo de escritura: profesores de asignaturas en fragmentos
+    #distintos escriben en paralelo. db_name es el catalogo (usuarios,
+    #asignaturas, inscripciones, alertas y la asignacion asignatura -> fragmento).
+    #Las lecturas adjuntan los fragmentos al catalogo (ATTACH) y consultan vistas
+    #temporales con los nombres de las tablas, asi que las consultas de BaseDatos
+    #no cambian; la busqueda usa LIKE porque FTS5 no se puede unir entre archivos.
+    #Los ids de notas, apelaciones e historial del fragmento k empiezan en
+    #k * IDS_POR_FRAGMENTO, de modo que el id indica el fragmento
+
+    IDS_POR_FRAGMENTO = 10 ** 12
+    #limite de bases adjuntas de SQLite (SQLITE_MAX_ATTACHED)
+    MAX_FRAGMENTOS = 10
+    TABLAS_FRAGMENTADAS = ("notas", "apelaciones", "historial_modificaciones",
+                           "totales_corte", "promedios_asignatura", "versiones_notas")
+
+    def __init__(self, db_name: str = "calificaciones.db", fragmentos: int = 4,
+                 reutilizar_conexion: bool = False,
+                 presupuesto: Optional[PresupuestoMemoria] = None):
+        if not 1 <= fragmentos <= self.MAX_FRAGMENTOS:
+            raise ValueError(f"Se admiten entre 1 y {self.MAX_FRAGMENTOS} fragmentos")
+        self.archivos_fragmentos = [_nombre_fragmento(db_name, k) for k in range(fragmentos)]
+        self._asignaciones: Dict[int, int] = {}
+        super().__init__(db_name, reutilizar_conexion, esquema="catalogo",
+                         presupuesto=presupuesto)
+
+    def inicializar_db(self):
+        for k, archivo in enumerate(self.archivos_fragmentos):
+            BaseDatos(archivo, esquema="fragmento").inicializar()
+            conn = _conectar(archivo)
+            for tabla in ("notas", "apelaciones", "historial_modificaciones",
+                          "bandeja_notificaciones"):
+                self.sentencias.ejecutar(conn, "fragmentos.primer_id",
+                                         (tabla, k * self.IDS_POR_FRAGMENTO, tabla))
+            conn.commit()
+            conn.close()
+
+        super().inicializar_db()
+
+        conn = self._conexion()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS fragmentos_asignatura (
+                asignatura_id INTEGER PRIMARY KEY,
+                fragmento INTEGER NOT NULL
+            )
+        ''')
+        conn.commit()
+        try:
+            self._verificar_reparto(conn)
+        finally:
+            self._liberar(conn)
+
+    def _verificar_reparto(self, conn):
+        #las vistas temporales ocultan las tablas de main y solo unen los
+        #fragmentos 0..N-1: una base de un solo archivo abierta con fragmentos,
+        #o un catalogo abierto con menos fragmentos de los que usa, perderia
+        #notas de vista sin avisar. No hay migracion: se rechaza la apertura
+        existentes = {fila[0] for fila in conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE type = 'table'")}
+        locales = [tabla for tabla in self.TABLAS_FRAGMENTADAS
+                   if tabla in existentes and self.sentencias.consultar_uno(
+                       conn, "fragmentos.filas_locales", tabla=tabla)[0]]
+        if locales:
+            raise ValueError(
+                f"{self.db_name} es una base de un solo archivo con datos en "
+                f"{', '.join(locales)}; ábrala sin fragmentos")
+        maximo = self.sentencias.consultar_uno(conn, "fragmentos.maximo")[0]
+        if maximo is not None and maximo >= len(self.archivos_fragmentos):
+            raise ValueError(
+                f"{self.db_name} tiene asignaturas en el fragmento {maximo}; "
+                f"ábrala con al menos {maximo + 1} fragmentos")
+
+    def obtener_conexion(self):
+        #catalogo con los fragmentos adjuntos; solo para leer las tablas de notas
+        self.inicializar()
+        conn = _conectar(self.db_name)
+        kib = self.presupuesto.kib_cache_sqlite()
+        for k, archivo in enumerate(self.archivos_fragmentos):
+            conn.execute("ATTACH DATABASE ? AS ?", (archivo, f"f{k}"))
+            conn.execute(f"PRAGMA f{k}.cache_size = -{kib}")
+        for tabla in self.TABLAS_FRAGMENTADAS:
+            union = " UNION ALL ".join(f"SELECT * FROM f{k}.{tabla}"
+                                       for k in range(len(self.archivos_fragmentos)))
+            conn.execute(f"CREATE TEMP VIEW IF NOT EXISTS {tabla} AS {union}")
+        return conn
+
+    def obtener_conexion_escritura(self, fragmento: int = 0):
+        self.inicializar()
+        return _conectar(self.archivos_fragmentos[fragmento])
+
+    def archivos(self, destino: Optional[str] = None) -> List[str]:
+        return [destino or self.db_name] + [
+            _nombre_fragmento(destino, k) if destino else archivo
+            for k, archivo in enumerate(self.archivos_fragmentos)
+        ]
+
+    def activar_wal(self):
+        super().activar_wal()
+        for k in range(len(self.archivos_fragmentos)):
+            conn = self.obtener_conexion_escritura(k)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.close()
+
+    def _conexion_escritura(self, fragmento: int = 0):
+        if not self.reutilizar_conexion:
+            return self.obtener_conexion_escritura(fragmento)
+        conexiones = getattr(self._local, "escritura", None)
+        if conexiones is None:
+            conexiones = self._local.escritura = {}
+        if fragmento not in conexiones:
+            conexiones[fragmento] = self.obtener_conexion_escritura(fragmento)
+        return conexiones[fragmento]
+
+    def cerrar(self):
+        super().cerrar()
+        for conn in getattr(self._local, "escritura", {}).values():
+            conn.close()
+        self._local.escritura = {}
+
+    def _esquemas_notas(self) -> List[Tuple[int, str]]:
+        return [(k, f"f{k}") for k in range(len(self.archivos_fragmentos))]
+
+    def fragmento_de(self, asignatura_id: Optional[int] = None,
+                     id_registro: Optional[int] = None) -> int:
+        if id_registro is not None:
+            fragmento = id_registro // self.IDS_POR_FRAGMENTO
+            if not 0 <= fragmento < len(self.archivos_fragmentos):
+                raise ValueError("Registro no encontrado")
+            return fragmento
+        fragmento = self._asignaciones.get(asignatura_id)
+        if fragmento is None:
+            fragmento = self.asignar_fragmento(asignatura_id)
+        return fragmento
+
+    def asignar_fragmento(self, asignatura_id: int, fragmento: Optional[int] = None) -> int:
+        #fija el fragmento de una asignatura (p. ej. el de su facultad); sin
+        #fragmento se usa asignatura_id modulo la cantidad de fragmentos. Una
+        #asignatura ya asignada conserva su fragmento
+        if fragmento is None:
+            fragmento = asignatura_id % len(self.archivos_fragmentos)
+        elif not 0 <= fragmento < len(self.archivos_fragmentos):
+            raise ValueError("Fragmento inexistente")
+        conn = self._conexion()
+        cursor = conn.cursor()
+        try:
+            self.sentencias.ejecutar(cursor, "fragmentos.asignar", (asignatura_id, fragmento))
+            conn.commit()
+            asignado = self.sentencias.consultar_uno(cursor, "fragmentos.de_asignatura",
+                                                     (asignatura_id,))[0]
+        finally:
+            self._liberar(conn)
+        self._asignaciones[asignatura_id] = asignado
+        return asignado
+
+
+def _nombre_fragmento(db_name: str, fragmento: int) -> str:
+    raiz, extension = os.path.splitext(db_name)
+    return f"{raiz}.f{fragmento}{extension or '.db'}"
+
+
+def _registro_cambios_activo(conn) -> bool:
+    return conn.execute(
+        "SELECT EXISTS (SELECT 1 FROM sqlite_master "
+        "WHERE type = 'trigger' AND name LIKE 'trg\\_cambios\\_%' ESCAPE '\\')"
+    ).fetchone()[0] == 1
+
+
+def _instalar_registro_cambios(conn, tablas: Optional[Iterable[str]] = None):
+    #triggers del registro de cambios: cada escritura en una tabla base deja la
+    #fila completa (JSON) hasta el siguiente respaldo incremental. Sin tablas,
+    #las tablas base que tenga el archivo
+    if tablas is None:
+        existentes = {fila[0] for fila in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        tablas = [tabla for tabla in BaseDatos.TABLAS_CATALOGO + BaseDatos.TABLAS_NOTAS
+                  if tabla in existentes]
+    for tabla in tablas:
+        columnas = [columna[1] for columna in conn.execute(f"PRAGMA table_info({tabla})")]
+        for evento in ("INSERT", "UPDATE", "DELETE"):
+            if evento == "DELETE":
+                fila, datos = "old", "NULL"
+            else:
+                fila = "new"
+                datos = "json_object(" + ", ".join(f"'{c}', new.{c}" for c in columnas) + ")"
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_cambios_{tabla}_{evento.lower()}")
+            conn.execute(f'''
+                CREATE TRIGGER trg_cambios_{tabla}_{evento.lower()}
+                AFTER {evento} ON {tabla}
+                BEGIN
+                    INSERT INTO registro_cambios (tabla, operacion, fila_id, datos)
+                    VALUES ('{tabla}', '{evento}', {fila}.id, {datos});
+                END
+            ''')
+
+
+def _ultimo_cambio(conn) -> int:
+    #ultimo id asignado en registro_cambios, aunque ya se haya podado
+    fila = conn.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'registro_cambios'"
+    ).fetchone()
+    return fila[0] if fila else 0
+
+
+def _publicar(temporal: str, destino: str, comprimir: bool) -> str:
+    #mueve el archivo terminado a su destino, comprimido con gzip si se pide
+    if not comprimir:
+        os.replace(temporal, destino)
+        return destino
+    if not destino.endswith(".gz"):
+        destino += ".gz"
+    with open(temporal, "rb") as entrada, gzip.open(destino + ".parcial", "wb") as salida:
+        shutil.copyfileobj(entrada, salida, 1 << 20)
+    os.replace(destino + ".parcial", destino)
+    os.remove(temporal)
+    return destino
+
+
+def respaldar_archivo(origen: str, destino: str, paginas: int = 256, pausa: float = 0.0,
+                      comprimir: bool = False, registrar_cambios: bool = False) -> Dict:
+    #respaldo en linea con la API de backup de SQLite, de a `paginas` paginas y
+    #con `pausa` segundos entre pasos para ceder el disco a los escritores.
+    #En WAL la copia corre dentro de una transaccion de lectura: es una
+    #instantanea consistente que no bloquea a los escritores ni se reinicia
+    #cuando confirman. Con el journal por defecto cada paso toma el bloqueo
+    #compartido solo mientras copia, y el respaldo se reinicia si alguien
+    #escribe entre pasos. Se verifica la integridad antes de publicar la copia.
+    #Con registrar_cambios el respaldo es la base de una cadena de incrementales
+    #(exportar_cambios): activa el registro de cambios si hace falta y lo poda
+    #hasta la instantanea. Sin el, no toca el registro ni corta esa cadena
+    fuente = _conectar(origen)
+    if registrar_cambios and not _registro_cambios_activo(fuente):
+        with fuente:
+            _instalar_registro_cambios(fuente)
+    temporal = destino + ".parcial"
+    if os.path.exists(temporal):
+        os.remove(temporal)
+    copia = sqlite3.connect(temporal)
+    pasos = [0]
+
+    def progreso(estado, restantes, total):
+        pasos[0] += 1
+        if pausa and restantes:
+            time.sleep(pausa)
+
+    inicio = time.perf_counter()
+    try:
+        wal = fuente.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if wal:
+            fuente.execute("BEGIN")
+        hasta = _ultimo_cambio(fuente)
+        fuente.backup(copia, pages=paginas, progress=progreso)
+        if wal:
+            fuente.commit()
+        integridad = copia.execute("PRAGMA integrity_check").fetchone()[0]
+        total_paginas = copia.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        copia.close()
+    if integridad != "ok":
+        os.remove(temporal)
+        fuente.close()
+        raise sqlite3.DatabaseError(f"Respaldo de {origen} corrupto: {integridad}")
+    destino = _publicar(temporal, destino, comprimir)
+
+    if registrar_cambios:
+        fuente.execute("DELETE FROM registro_cambios WHERE id <= ?", (hasta,))
+        fuente.commit()
+    fuente.close()
+    return {"origen": origen, "destino": destino, "paginas": total_paginas,
+            "pasos": pasos[0], "segundos": round(time.perf_counter() - inicio, 3),
+            "cambios_hasta": hasta}
+
+
+def exportar_cambios(origen: str, destino: str, comprimir: bool = False) -> Dict:
+    #respaldo incremental: las filas del registro de cambios desde el ultimo
+    #respaldo, en JSON lines. La primera linea indica el rango de ids, que
+    #restaurar_respaldo usa para encadenar los incrementales. Requiere un
+    #respaldo completo previo con registrar_cambios
+    fuente = _conectar(origen)
+    try:
+        if not _registro_cambios_activo(fuente):
+            raise ValueError(f"{origen} no registra cambios: haga antes un respaldo "
+                             f"completo con registrar_cambios (--registrar-cambios)")
+        fuente.execute("BEGIN")
+        hasta = _ultimo_cambio(fuente)
+        desde = fuente.execute("SELECT MIN(id) FROM registro_cambios WHERE id <= ?",
+                               (hasta,)).fetchone()[0]
+        fuente.commit()
+        if desde is None:
+            return {"origen": origen, "destino": None, "cambios": 0, "cambios_hasta": hasta}
+
+        #por paginas de ids: las filas hasta `hasta` ya no cambian, asi la
+        #memoria no depende de la cantidad de cambios y no se retiene el
+        #bloqueo de lectura mientras se escribe el archivo
+        cambios = 0
+        ultimo = desde - 1
+        temporal = destino + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as salida:
+            salida.write(json.dumps({"origen": os.path.basename(origen), "desde": desde,
+                                     "hasta": hasta, "fecha": datetime.now().isoformat()}) + "\n")
+            while True:
+                filas = fuente.execute(
+                    "SELECT id, tabla, operacion, fila_id, datos FROM registro_cambios "
+                    "WHERE id > ? AND id <= ? ORDER BY id LIMIT 1000", (ultimo, hasta)
+                ).fetchall()
+                if not filas:
+                    break
+                for cambio_id, tabla, operacion, fila_id, datos in filas:
+                    salida.write(json.dumps({"id": cambio_id, "tabla": tabla,
+                                             "operacion": operacion, "fila_id": fila_id,
+                                             "datos": json.loads(datos) if datos else None},
+                                            ensure_ascii=False) + "\n")
+                cambios += len(filas)
+                ultimo = filas[-1][0]
+        destino = _publicar(temporal, destino, comprimir)
+
+        fuente.execute("DELETE FROM registro_cambios WHERE id <= ?", (hasta,))
+        fuente.commit()
+    finally:
+        fuente.close()
+    return {"origen": origen, "destino": destino, "cambios": cambios,
+            "desde": desde, "cambios_hasta": hasta}
+
+
+def restaurar_respaldo(respaldo: str, incrementales: List[str], destino: str) -> Dict:
+    #copia el respaldo completo (comprimido o no) en destino y aplica en orden
+    #los incrementales posteriores; falla si falta alguno en la cadena. El
+    #resultado se escribe en destino con la API de backup, no reemplazando el
+    #archivo: un -wal/-shm de destino quedaria con marcos de la base anterior
+    def abrir(archivo: str):
+        return (gzip.open(archivo, "rt", encoding="utf-8") if archivo.endswith(".gz")
+                else open(archivo, encoding="utf-8"))
+
+    temporal = destino + ".parcial"
+    if respaldo.endswith(".gz"):
+        with gzip.open(respaldo, "rb") as entrada, open(temporal, "wb") as salida:
+            shutil.copyfileobj(entrada, salida, 1 << 20)
+    else:
+        shutil.copyfile(respaldo, temporal)
+
+    conn = _conectar(temporal)
+    tablas = set(BaseDatos.TABLAS_CATALOGO + BaseDatos.TABLAS_NOTAS)
+    aplicado = _ultimo_cambio(conn)
+    cambios = 0
+    try:
+        cadena = []
+        for archivo in incrementales:
+            with abrir(archivo) as entrada:
+                cadena.append((json.loads(entrada.readline()), archivo))
+        for encabezado, archivo in sorted(cadena, key=lambda c: c[0]["desde"]):
+            if encabezado["hasta"] <= aplicado:
+                continue
+            if encabezado["desde"] > aplicado + 1:
+                raise ValueError(f"Falta el incremental con los cambios {aplicado + 1} a "
+                                 f"{encabezado['desde'] - 1} antes de {archivo}")
+            with abrir(archivo) as entrada:
+                entrada.readline()
+                for linea in entrada:
+                    cambio = json.loads(linea)
+                    if cambio["id"] <= aplicado:
+                        continue
+                    if cambio["tabla"] not in tablas:
+                        raise ValueError(f"Tabla desconocida en {archivo}: {cambio['tabla']}")
+                    if cambio["operacion"] == "DELETE":
+                        conn.execute(f"DELETE FROM {cambio['tabla']} WHERE id = ?",
+                                     (cambio["fila_id"],))
+                    else:
+                        columnas = list(cambio["datos"])
+                        conn.execute(f'''
+                            INSERT INTO {cambio['tabla']} ({", ".join(columnas)})
+                            VALUES ({", ".join("?" * len(columnas))})
+                            ON CONFLICT (id) DO UPDATE SET
+                            {", ".join(f"{c} = excluded.{c}" for c in columnas if c != "id")}
+                        ''', [cambio["datos"][c] for c in columnas])
+                    cambios += 1
+            aplicado = encabezado["hasta"]
+        #lo reaplicado ya esta en la copia; el registro sigue desde el ultimo id
+        conn.execute("DELETE FROM registro_cambios")
+        conn.execute("DELETE FROM sqlite_sequence WHERE name = 'registro_cambios'")
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('registro_cambios', ?)",
+                     (aplicado,))
+        conn.commit()
+        integridad = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    finally:
+        conn.close()
+    if integridad != "ok":
+        os.remove(temporal)
+        raise sqlite3.DatabaseError(f"Restauración corrupta: {integridad}")
+    fuente = sqlite3.connect(temporal)
+    copia = _conectar(destino)
+    try:
+        fuente.backup(copia)
+    finally:
+        copia.close()
+        fuente.close()
+    os.remove(temporal)
+    return {"destino": destino, "cambios_aplicados": cambios, "cambios_hasta": aplicado}
+
+
+def abrir_base_datos(db_name: str = "calificaciones.db", reutilizar_conexion: bool = False,
+                     fragmentos: int = 0,
+                     presupuesto: Optional[PresupuestoMemoria] = None) -> BaseDatos:
+    #fragmentos=0: un solo archivo
+    if fragmentos:
+        return BaseDatosFragmentada(db_name, fragmentos, reutilizar_conexion, presupuesto)
+    return BaseDatos(db_name, reutilizar_conexion, presupuesto=presupuesto)
+
+
+class CoalescedorEscrituras:
+    #escritura agrupada (group commit): las llamadas concurrentes a
+    #registrar_nota/modificar_nota se encolan y un solo hilo escritor las
+    #confirma juntas, hasta max_lote escrituras o max_espera segundos.
+    #Cada escritura corre en su propio SAVEPOINT, asi que cada llamador
+    #recibe su lastrowid o su error sin afectar al resto del lote.
+    #Con max_espera=0 el lote es lo que se encolo mientras se confirmaba el anterior
+
+    def __init__(self, db: BaseDatos, max_lote: int = 64, max_espera: float = 0.0):
+        self.db = db
+        self.max_lote = max_lote
+        self.max_espera = max_espera
+        self.lotes = 0
+        self.escrituras = 0
+        self._cola: "queue.Queue" = queue.Queue()
+        #tras cerrar no se encola nada: el hilo ya no lo atenderia
+        self._cerrado = False
+        self._candado_cierre = threading.Lock()
+        self._hilo = threading.Thread(target=self._ciclo, name="coalescedor", daemon=True)
+        self._hilo.start()
+
+    def registrar_nota(self, nota: Nota) -> int:
+        return self.enviar_registro(nota).result()
+
+    def modificar_nota(self, nota_id: int, nueva_nota: float, justificacion: str,
+                       profesor_id: int, version_esperada: Optional[int] = None) -> int:
+        return self.enviar_modificacion(nota_id, nueva_nota, justificacion,
+                                        profesor_id, version_esperada).result()
+
+    def enviar_registro(self, nota: Nota) -> Future:
+        return self._enviar(self.db._insertar_nota, (nota,),
+                            self.db.fragmento_de(asignatura_id=nota.asignatura_id))
+
+    def enviar_modificacion(self, nota_id: int, nueva_nota: float, justificacion: str,
+                            profesor_id: int, version_esperada: Optional[int] = None) -> Future:
+        return self._enviar(self.db._actualizar_nota,
+                            (nota_id, nueva_nota, justificacion, profesor_id, version_esperada),
+                            self.db.fragmento_de(id_registro=nota_id))
+
+    def cerrar(self):
+        #confirma lo pendiente y detiene el hilo escritor; las escrituras
+        #posteriores fallan como en una conexion cerrada
+        with self._candado_cierre:
+            if self._cerrado:
+                return
+            self._cerrado = True
+            self._cola.put(None)
+        self._hilo.join()
+
+    def _enviar(self, operacion, argumentos: Tuple, fragmento: int = 0) -> Future:
+        futuro: Future = Future()
+        with self._candado_cierre:
+            if self._cerrado:
+                futuro.set_exception(
+                    sqlite3.ProgrammingError("El coalescedor de escrituras está cerrado"))
+            else:
+                self._cola.put((operacion, argumentos, futuro, fragmento))
+        return futuro
+
+    def _ciclo(self):
+        #una conexion por fragmento; cada lote se confirma por fragmento
+        conexiones: Dict[int, Any] = {}
+        activo = True
+        while activo:
+            primero = self._cola.get()
+            if primero is None:
+                break
+            lote = [primero]
+            limite = time.monotonic() + self.max_espera
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                try:
+                    siguiente = self._cola.get(timeout=restante) if restante > 0 \
+                        else self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    activo = False
+                    break
+                lote.append(siguiente)
+            por_fragmento: Dict[int, List[Tuple]] = {}
+            for escritura in lote:
+                por_fragmento.setdefault(escritura[3], []).append(escritura)
+            for fragmento, escrituras in por_fragmento.items():
+                if fragmento not in conexiones:
+                    #sin conexion fallan solo las escrituras de este fragmento;
+                    #el hilo sigue y el proximo lote vuelve a intentar abrirla
+                    try:
+                        conexiones[fragmento] = self.db.obtener_conexion_escritura(fragmento)
+                    except Exception as e:
+                        for _, _, futuro, _ in escrituras:
+                            futuro.set_exception(e)
+                        continue
+                self._confirmar(conexiones[fragmento], escrituras)
+        for conn in conexiones.values():
+            conn.close()
+
+    def _confirmar(self, conn, lote: List[Tuple]):
+        cursor = conn.cursor()
+        resultados = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for operacion, argumentos, futuro, _ in lote:
+                cursor.execute("SAVEPOINT escritura")
+                try:
+                    resultados.append((futuro, operacion(cursor, *argumentos), None))
+                    cursor.execute("RELEASE escritura")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO escritura")
+                    cursor.execute("RELEASE escritura")
+                    resultados.append((futuro, None, e))
+            conn.commit()
+        except Exception as e:
+            #si falla la transaccion completa, ninguna escritura del lote quedo
+            if conn.in_transaction:
+                conn.rollback()
+            for _, _, futuro, _ in lote:
+                futuro.set_exception(e)
+            return
+
+        self.lotes += 1
+        self.escrituras += len(lote)
+        #los resultados se entregan solo despues del commit
+        for futuro, resultado, error in resultados:
+            if error is not None:
+                futuro.set_exception(error)
+            else:
+                futuro.set_result(resultado)
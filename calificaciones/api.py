@@ -0,0 +1,932 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#modo no interactivo (JSON lines) y API HTTP JSON sobre el servicio
+
+import json
+import re
+import selectors
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from calificaciones.almacenamiento import BaseDatos, CoalescedorEscrituras, abrir_base_datos
+from calificaciones.auditoria import AnalizadorHistorial
+from calificaciones.autenticacion import (AlmacenSesiones, DemasiadosIntentos, NoAutenticado,
+                                          ServicioAutenticacion, SinPermiso)
+from calificaciones.memoria import rss_maximo
+from calificaciones.modelos import (Apelacion, ConflictoVersion, EstadoApelacion, Nota, Usuario,
+                                    a_json)
+from calificaciones.notificaciones import DespachadorNotificaciones, DestinoNotificaciones
+from calificaciones.reglas import ReglasLogicas
+from calificaciones.servicio import ServicioCalificaciones
+
+
+class ProcesadorComandos:
+    #modo no interactivo: cada solicitud es un dict {"op": ..., parametros}
+    #y cada respuesta {"ok": bool, "resultado" | "error"}, repitiendo "id" si viene
+
+    OPERACIONES_LECTURA = {
+        "autenticar", "notas_estudiante", "nota", "promedio_corte", "promedio_final",
+        "simular_nota_necesaria", "asignaturas_estudiante", "asignaturas_profesor",
+        "estudiantes_asignatura", "apelaciones_estudiante", "apelaciones_profesor",
+        "historial_modificaciones", "auditar_porcentajes", "etag_notas", "buscar",
+        "promedio_acumulado", "expediente", "ranking_asignatura", "posicion_estudiante",
+        "mejores_promedios", "alertas", "sesion", "hallazgos_auditoria", "serie_asignatura",
+        "metricas_sentencias", "notificaciones", "notificaciones_sin_leer",
+        "estado_notificaciones", "memoria",
+    }
+    #todas salvo estas requieren "token", lecturas incluidas: el usuario de esa
+    #sesion llega al manejador como `usuario`. sesion y cerrar_sesion reciben
+    #el token como parametro
+    OPERACIONES_SIN_SESION = {"autenticar", "sesion", "cerrar_sesion"}
+
+    def __init__(self, db: BaseDatos, servicio: Optional[ServicioCalificaciones] = None,
+                 escritor: Optional[CoalescedorEscrituras] = None,
+                 autenticacion: Optional[ServicioAutenticacion] = None,
+                 despachador: Optional[DespachadorNotificaciones] = None):
+        self.db = db
+        self.servicio = servicio or ServicioCalificaciones(db)
+        self.autenticacion = autenticacion or ServicioAutenticacion(db)
+        self.logica = ReglasLogicas()
+        #registrar_nota/modificar_nota pasan por el coalescedor si se indica
+        self.escritor = escritor or db
+        #se despierta tras crear o responder una apelacion, para entregar el
+        #aviso sin esperar su siguiente pasada
+        self.despachador = despachador
+
+    def ejecutar(self, solicitud: Dict, origen: str = "local") -> Dict:
+        #origen identifica al cliente (p. ej. su IP) para limitar los intentos
+        #de autenticar; lo fija quien llama, nunca la solicitud
+        respuesta: Dict[str, Any] = {}
+        if isinstance(solicitud, dict) and "id" in solicitud:
+            respuesta["id"] = solicitud["id"]
+        try:
+            if not isinstance(solicitud, dict):
+                raise ValueError("La solicitud debe ser un objeto JSON")
+            parametros = dict(solicitud)
+            parametros.pop("id", None)
+            op = parametros.pop("op", None)
+            manejador = getattr(self, f"_op_{op}", None) if isinstance(op, str) else None
+            if manejador is None:
+                raise ValueError(f"Operación desconocida: {op}")
+            if op == "autenticar":
+                parametros["origen"] = origen
+            elif op not in self.OPERACIONES_SIN_SESION:
+                parametros["usuario"] = self._usuario_de_token(parametros.pop("token", None))
+            respuesta["ok"] = True
+            respuesta["resultado"] = a_json(manejador(**parametros))
+        except ConflictoVersion as e:
+            respuesta["ok"] = False
+            respuesta["error"] = str(e)
+            respuesta["conflicto"] = True
+        except NoAutenticado as e:
+            respuesta["ok"] = False
+            respuesta["error"] = str(e)
+            respuesta["no_autenticado"] = True
+        except SinPermiso as e:
+            respuesta["ok"] = False
+            respuesta["error"] = str(e)
+            respuesta["prohibido"] = True
+        except DemasiadosIntentos as e:
+            respuesta["ok"] = False
+            respuesta["error"] = str(e)
+            respuesta["reintentar_en"] = round(e.espera, 1)
+        except (ValueError, TypeError, KeyError, sqlite3.Error) as e:
+            respuesta["ok"] = False
+            respuesta["error"] = str(e)
+        return respuesta
+
+    def procesar_lote(self, solicitudes: List[Dict], origen: str = "local") -> List[Dict]:
+        #las lecturas consecutivas comparten una transaccion de lectura;
+        #cada escritura hace su propio commit
+        respuestas = []
+        i = 0
+        while i < len(solicitudes):
+            j = i
+            while j < len(solicitudes) and self._es_lectura(solicitudes[j]):
+                j += 1
+            if j > i:
+                with self.db.transaccion_lectura():
+                    respuestas.extend(self.ejecutar(s, origen) for s in solicitudes[i:j])
+                i = j
+            else:
+                respuestas.append(self.ejecutar(solicitudes[i], origen))
+                i += 1
+        return respuestas
+
+    def procesar_flujo(self, entrada, salida, tamano_lote: int = 256) -> int:
+        #lee JSON lines de entrada en lotes y escribe una respuesta por linea
+        procesadas = 0
+        lote: List[Any] = []
+        for linea in entrada:
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                lote.append(json.loads(linea))
+            except json.JSONDecodeError as e:
+                lote.append({"__error__": f"JSON inválido: {e}"})
+            if len(lote) >= tamano_lote:
+                procesadas += self._escribir_lote(lote, salida)
+                lote = []
+        if lote:
+            procesadas += self._escribir_lote(lote, salida)
+        return procesadas
+
+    def _escribir_lote(self, lote: List[Any], salida) -> int:
+        validas = [s for s in lote if not (isinstance(s, dict) and "__error__" in s)]
+        respuestas = iter(self.procesar_lote(validas))
+        lineas = []
+        for solicitud in lote:
+            if isinstance(solicitud, dict) and "__error__" in solicitud:
+                respuesta = {"ok": False, "error": solicitud["__error__"]}
+            else:
+                respuesta = next(respuestas)
+            lineas.append(json.dumps(respuesta, ensure_ascii=False))
+        salida.write("\n".join(lineas) + "\n")
+        salida.flush()
+        return len(lote)
+
+    @classmethod
+    def operaciones(cls) -> Tuple[str, ...]:
+        return tuple(nombre for nombre in dir(cls) if nombre.startswith("_op_"))
+
+    def _es_lectura(self, solicitud: Any) -> bool:
+        return isinstance(solicitud, dict) and solicitud.get("op") in self.OPERACIONES_LECTURA
+
+    @staticmethod
+    def _exigir_rol(usuario: Usuario, rol: str):
+        if usuario.rol != rol:
+            raise SinPermiso(f"La operación requiere el rol {rol}")
+
+    def _exigir_profesor_de(self, usuario: Usuario, asignatura_id: int):
+        self._exigir_rol(usuario, "profesor")
+        if self.db.profesor_de_asignatura(asignatura_id) != usuario.id:
+            raise SinPermiso("Solo el profesor de la asignatura puede hacerlo")
+
+    def puede_ver_notas(self, solicitud: Dict) -> bool:
+        #para responder 304 sin ejecutar: el token de la solicitud ve las notas
+        #de (estudiante_id, asignatura_id). Si no, ejecutar da el 401/403
+        try:
+            usuario = self._usuario_de_token(solicitud.get("token"))
+            self._exigir_notas_de(usuario, solicitud["estudiante_id"], solicitud["asignatura_id"])
+        except (NoAutenticado, SinPermiso, KeyError, TypeError, ValueError):
+            return False
+        return True
+
+    def _usuario_de_token(self, token: Any) -> Usuario:
+        if not isinstance(token, str) or not token:
+            raise NoAutenticado()
+        usuario = self.autenticacion.usuario_de_sesion(token)
+        if usuario is None:
+            raise NoAutenticado("La sesión no existe o venció")
+        return usuario
+
+    #operaciones de lectura. Tambien requieren sesion y solo muestran lo del
+    #usuario: un estudiante, lo suyo; un profesor, lo de sus asignaturas. Los
+    #reportes de toda la institucion y las metricas quedan para profesores
+    def _op_autenticar(self, username: str, password: str, origen: str = "local"):
+        sesion = self.autenticacion.iniciar_sesion(username, password, origen)
+        if sesion is None:
+            return None
+        token, usuario = sesion
+        return {**self._usuario(usuario), "token": token,
+                "expira_en": self.autenticacion.sesiones.ttl}
+
+    def _op_sesion(self, token: str):
+        usuario = self.autenticacion.usuario_de_sesion(token)
+        return None if usuario is None else self._usuario(usuario)
+
+    def _op_cerrar_sesion(self, token: str):
+        return self.autenticacion.cerrar_sesion(token)
+
+    @staticmethod
+    def _usuario(usuario) -> Dict:
+        return {"id": usuario.id, "username": usuario.username, "rol": usuario.rol,
+                "nombre_completo": usuario.nombre_completo}
+
+    def _asignaturas_de(self, usuario: Usuario) -> set:
+        return {fila[0] for fila in self.db.obtener_asignaturas_profesor(usuario.id)}
+
+    @staticmethod
+    def _exigir_estudiante(usuario: Usuario, estudiante_id: int):
+        #datos de un estudiante que abarcan todas sus asignaturas
+        if usuario.rol != "estudiante" or int(estudiante_id) != usuario.id:
+            raise SinPermiso("Solo el estudiante puede consultar estos datos")
+
+    def _exigir_notas_de(self, usuario: Usuario, estudiante_id: int, asignatura_id: int):
+        #notas de un estudiante en una asignatura: el estudiante o su profesor
+        if usuario.rol == "estudiante":
+            self._exigir_estudiante(usuario, estudiante_id)
+        else:
+            self._exigir_profesor_de(usuario, asignatura_id)
+
+    def _nota_visible(self, usuario: Usuario, nota_id: int) -> Optional[Nota]:
+        nota = self.db.obtener_nota(nota_id)
+        if nota is not None:
+            self._exigir_notas_de(usuario, nota.estudiante_id, nota.asignatura_id)
+        return nota
+
+    def _op_notas_estudiante(self, usuario: Usuario, estudiante_id: int,
+                             asignatura_id: Optional[int] = None):
+        if usuario.rol == "estudiante" or asignatura_id is not None:
+            self._exigir_notas_de(usuario, estudiante_id, asignatura_id)
+            return self.db.obtener_notas_estudiante(estudiante_id, asignatura_id)
+        self._exigir_rol(usuario, "profesor")
+        propias = self._asignaturas_de(usuario)
+        return [nota for nota in self.db.obtener_notas_estudiante(estudiante_id)
+                if nota.asignatura_id in propias]
+
+    def _op_nota(self, usuario: Usuario, nota_id: int):
+        return self._nota_visible(usuario, nota_id)
+
+    def _op_promedio_corte(self, usuario: Usuario, estudiante_id: int, asignatura_id: int,
+                           corte: int):
+        self._exigir_notas_de(usuario, estudiante_id, asignatura_id)
+        return self.servicio.calcular_promedio_corte(estudiante_id, asignatura_id, corte)
+
+    def _op_promedio_final(self, usuario: Usuario, estudiante_id: int, asignatura_id: int):
+        self._exigir_notas_de(usuario, estudiante_id, asignatura_id)
+        return self.servicio.calcular_promedio_final(estudiante_id, asignatura_id)
+
+    def _op_promedio_acumulado(self, usuario: Usuario, estudiante_id: int):
+        self._exigir_estudiante(usuario, estudiante_id)
+        return self.servicio.calcular_promedio_acumulado(estudiante_id)
+
+    def _op_expediente(self, usuario: Usuario, estudiante_id: int):
+        self._exigir_estudiante(usuario, estudiante_id)
+        return self.servicio.obtener_expediente(estudiante_id)
+
+    def _op_ranking_asignatura(self, usuario: Usuario, asignatura_id: int, limite: int = 50,
+                               desplazamiento: int = 0):
+        self._exigir_profesor_de(usuario, asignatura_id)
+        return self.servicio.ranking_asignatura(asignatura_id, _limite(limite, 500),
+                                                _desplazamiento(desplazamiento))
+
+    def _op_posicion_estudiante(self, usuario: Usuario, estudiante_id: int, asignatura_id: int):
+        self._exigir_notas_de(usuario, estudiante_id, asignatura_id)
+        return self.servicio.posicion_estudiante(estudiante_id, asignatura_id)
+
+    def _op_mejores_promedios(self, usuario: Usuario, limite: int = 10, desplazamiento: int = 0,
+                              periodo: Optional[str] = None):
+        self._exigir_rol(usuario, "profesor")
+        return self.servicio.mejores_promedios(_limite(limite, 500),
+                                               _desplazamiento(desplazamiento), periodo)
+
+    def _op_simular_nota_necesaria(self, usuario: Usuario, estudiante_id: int,
+                                   asignatura_id: int, nota_objetivo: float):
+        self._exigir_notas_de(usuario, estudiante_id, asignatura_id)
+        if not self.logica.validar_nota(nota_objetivo):
+            raise ValueError("La nota debe estar entre 0.0 y 5.0")
+        return self.servicio.simular_nota_necesaria(estudiante_id, asignatura_id, nota_objetivo)
+
+    def _op_asignaturas_estudiante(self, usuario: Usuario, estudiante_id: int):
+        filas = self.db.obtener_asignaturas_estudiante(estudiante_id)
+        if usuario.rol == "estudiante":
+            self._exigir_estudiante(usuario, estudiante_id)
+        else:
+            self._exigir_rol(usuario, "profesor")
+            propias = self._asignaturas_de(usuario)
+            filas = [fila for fila in filas if fila[0] in propias]
+        return [dict(zip(("id", "codigo", "nombre", "creditos", "profesor"), fila))
+                for fila in filas]
+
+    def _op_asignaturas_profesor(self, usuario: Usuario, profesor_id: int):
+        self._exigir_rol(usuario, "profesor")
+        self._exigir_mismo(usuario, profesor_id)
+        return [dict(zip(("id", "codigo", "nombre", "creditos"), fila))
+                for fila in self.db.obtener_asignaturas_profesor(profesor_id)]
+
+    def _op_estudiantes_asignatura(self, usuario: Usuario, asignatura_id: int):
+        self._exigir_profesor_de(usuario, asignatura_id)
+        return [dict(zip(("id", "nombre_completo", "username"), fila))
+                for fila in self.db.obtener_estudiantes_asignatura(asignatura_id)]
+
+    def _op_apelaciones_estudiante(self, usuario: Usuario, estudiante_id: int):
+        self._exigir_estudiante(usuario, estudiante_id)
+        return self.db.obtener_apelaciones_estudiante(estudiante_id)
+
+    def _op_apelaciones_profesor(self, usuario: Usuario, profesor_id: int):
+        self._exigir_rol(usuario, "profesor")
+        self._exigir_mismo(usuario, profesor_id)
+        campos = ("id", "nota_id", "estudiante_id", "descripcion", "estado",
+                  "fecha_creacion", "estudiante", "actividad", "nota")
+        return [dict(zip(campos, fila)) for fila in self.db.obtener_apelaciones_profesor(profesor_id)]
+
+    def _op_historial_modificaciones(self, usuario: Usuario, nota_id: int):
+        if self._nota_visible(usuario, nota_id) is None:
+            return []
+        campos = ("nota_anterior", "nota_nueva", "fecha_modificacion", "profesor", "justificacion")
+        return [dict(zip(campos, fila)) for fila in self.db.obtener_historial_modificaciones(nota_id)]
+
+    def _op_buscar(self, usuario: Usuario, consulta: str, asignatura_id: Optional[int] = None,
+                   profesor_id: Optional[int] = None, desde: Optional[str] = None,
+                   hasta: Optional[str] = None, limite: int = 20, desplazamiento: int = 0):
+        #solo en lo registrado por el profesor de la sesion
+        self._exigir_rol(usuario, "profesor")
+        self._exigir_mismo(usuario, profesor_id)
+        return self.db.buscar_texto(consulta, asignatura_id, usuario.id, desde, hasta,
+                                    _limite(limite, 100), _desplazamiento(desplazamiento))
+
+    def _op_etag_notas(self, usuario: Usuario, estudiante_id: int, asignatura_id: int):
+        self._exigir_notas_de(usuario, estudiante_id, asignatura_id)
+        return self.servicio.etag_notas(estudiante_id, asignatura_id)
+
+    def _op_auditar_porcentajes(self, usuario: Usuario):
+        self._exigir_rol(usuario, "profesor")
+        propias = self._asignaturas_de(usuario)
+        return [fila for fila in self.db.iterar_auditoria_porcentajes()
+                if fila["asignatura_id"] in propias]
+
+    def _op_alertas(self, usuario: Usuario, asignatura_id: Optional[int] = None,
+                    profesor_id: Optional[int] = None, nivel: Optional[str] = None,
+                    limite: int = 100, desplazamiento: int = 0):
+        self._exigir_rol(usuario, "profesor")
+        self._exigir_mismo(usuario, profesor_id)
+        return self.servicio.obtener_alertas(asignatura_id, usuario.id, nivel,
+                                             _limite(limite, 500), _desplazamiento(desplazamiento))
+
+    def _op_actualizar_alertas(self, usuario: Usuario, umbral: Optional[float] = None,
+                               completo: bool = False, periodo: Optional[str] = None):
+        self._exigir_rol(usuario, "profesor")
+        if umbral is not None and not self.logica.validar_nota(umbral):
+            raise ValueError("El umbral debe estar entre 0.0 y 5.0")
+        return self.servicio.actualizar_alertas(umbral, bool(completo), periodo)
+
+    def _op_serie_asignatura(self, usuario: Usuario, asignatura_id: int,
+                             desde: Optional[str] = None, hasta: Optional[str] = None,
+                             paso: str = "dia"):
+        self._exigir_profesor_de(usuario, asignatura_id)
+        return self.servicio.serie_asignatura(asignatura_id, desde, hasta, paso)
+
+    def _op_actualizar_series(self, usuario: Usuario, completo: bool = False):
+        self._exigir_rol(usuario, "profesor")
+        return self.servicio.actualizar_series(bool(completo))
+
+    def _op_hallazgos_auditoria(self, usuario: Usuario, tipo: Optional[str] = None,
+                                asignatura_id: Optional[int] = None,
+                                profesor_id: Optional[int] = None, nota_id: Optional[int] = None,
+                                desde: Optional[str] = None, hasta: Optional[str] = None,
+                                limite: int = 100, desplazamiento: int = 0):
+        self._exigir_rol(usuario, "profesor")
+        self._exigir_mismo(usuario, profesor_id)
+        return AnalizadorHistorial(self.db).obtener_hallazgos(
+            tipo, asignatura_id, usuario.id, nota_id, desde, hasta,
+            _limite(limite, 500), _desplazamiento(desplazamiento)
+        )
+
+    def _op_auditar_historial(self, usuario: Usuario, **umbrales):
+        #umbrales: parametros de AnalizadorHistorial (ediciones_maximas, ...)
+        self._exigir_rol(usuario, "profesor")
+        return AnalizadorHistorial(self.db, **umbrales).ejecutar()
+
+    def _op_metricas_sentencias(self, usuario: Usuario, reiniciar: bool = False):
+        #las de la base y, si se guardan en SQLite, las de las sesiones
+        self._exigir_rol(usuario, "profesor")
+        metricas = self.db.sentencias.metricas(bool(reiniciar))
+        sesiones = getattr(self.autenticacion.sesiones, "sentencias", None)
+        if sesiones is not None:
+            metricas = sorted(metricas + sesiones.metricas(bool(reiniciar)),
+                              key=lambda m: -m["total_ms"])
+        return metricas
+
+    def _op_notificaciones(self, usuario: Usuario, usuario_id: int, solo_sin_leer: bool = True,
+                           limite: int = 50):
+        if int(usuario_id) != usuario.id:
+            raise SinPermiso("Solo puede consultar sus propias notificaciones")
+        return self.db.obtener_notificaciones(usuario_id, bool(solo_sin_leer),
+                                              _limite(limite, 500))
+
+    def _op_notificaciones_sin_leer(self, usuario: Usuario, usuario_id: int):
+        if int(usuario_id) != usuario.id:
+            raise SinPermiso("Solo puede consultar sus propias notificaciones")
+        return {"usuario_id": usuario_id,
+                "sin_leer": self.db.notificaciones_sin_leer(usuario_id)}
+
+    def _op_estado_notificaciones(self, usuario: Usuario):
+        self._exigir_rol(usuario, "profesor")
+        if self.despachador is None:
+            return {"bandeja": self.db.resumen_bandeja()}
+        return self.despachador.estado()
+
+    def _op_memoria(self, usuario: Usuario):
+        #ocupacion del presupuesto por cache y pico de memoria del proceso
+        self._exigir_rol(usuario, "profesor")
+        return {**self.db.presupuesto.estadisticas(), "rss_maximo": rss_maximo()}
+
+    #operaciones de escritura, con las mismas reglas que InterfazCLI. Quien
+    #actua es el usuario de la sesion; profesor_id/estudiante_id en la
+    #solicitud son opcionales y, si vienen, deben ser los suyos
+    @staticmethod
+    def _exigir_mismo(usuario: Usuario, usuario_id: Optional[int]):
+        if usuario_id is not None and int(usuario_id) != usuario.id:
+            raise SinPermiso("No puede actuar en nombre de otro usuario")
+
+    def _op_registrar_nota(self, usuario: Usuario, estudiante_id: int, asignatura_id: int,
+                           corte: int, actividad: str, nota: float, porcentaje: float,
+                           justificacion: str, profesor_id: Optional[int] = None):
+        self._exigir_mismo(usuario, profesor_id)
+        self._exigir_profesor_de(usuario, asignatura_id)
+        if corte not in [1, 2, 3]:
+            raise ValueError("El corte debe ser 1, 2 o 3")
+        if not self.logica.validar_nota(nota):
+            raise ValueError("La nota debe estar entre 0.0 y 5.0")
+        if not self.logica.validar_porcentaje(porcentaje):
+            raise ValueError("El porcentaje debe estar entre 0 y 100")
+        if not self.logica.validar_justificacion(justificacion):
+            raise ValueError("La justificación debe tener al menos 20 caracteres")
+        if not self.db.esta_inscrito(estudiante_id, asignatura_id):
+            raise ValueError("El estudiante no está inscrito en la asignatura")
+        nota_obj = Nota(
+            id=None, estudiante_id=estudiante_id, asignatura_id=asignatura_id,
+            corte=corte, actividad=actividad, nota=nota, porcentaje=porcentaje,
+            fecha_registro=datetime.now(), profesor_id=usuario.id,
+            justificacion=justificacion
+        )
+        return {"nota_id": self.escritor.registrar_nota(nota_obj)}
+
+    def _op_modificar_nota(self, usuario: Usuario, nota_id: int, nueva_nota: float,
+                           justificacion: str, profesor_id: Optional[int] = None,
+                           version_esperada: Optional[int] = None):
+        self._exigir_mismo(usuario, profesor_id)
+        nota = self.db.obtener_nota(nota_id)
+        if nota is None:
+            raise ValueError("Nota no encontrada")
+        if not self.logica.puede_modificar_nota(usuario.rol, nota.profesor_id == usuario.id):
+            raise SinPermiso("No tiene permisos para modificar esta nota")
+        if not self.logica.validar_nota(nueva_nota):
+            raise ValueError("La nota debe estar entre 0.0 y 5.0")
+        if not self.logica.validar_justificacion(justificacion):
+            raise ValueError("La justificación debe tener al menos 20 caracteres")
+        #sin version del cliente se usa la leida para el permiso: si otra sesion
+        #modifica la nota en medio, el cambio se rechaza en lugar de pisarla
+        if version_esperada is None:
+            version_esperada = nota.version
+        version = self.escritor.modificar_nota(nota_id, nueva_nota, justificacion,
+                                               usuario.id, version_esperada)
+        return {"nota_id": nota_id, "nota_anterior": nota.nota, "nota_nueva": nueva_nota,
+                "version": version}
+
+    def _op_inscribir(self, usuario: Usuario, asignatura_id: int, estudiante_ids: List[int],
+                      periodo: str):
+        self._exigir_profesor_de(usuario, asignatura_id)
+        return self.db.inscribir([(est, asignatura_id, periodo) for est in estudiante_ids])
+
+    def _op_desinscribir(self, usuario: Usuario, asignatura_id: int, estudiante_ids: List[int],
+                         periodo: str):
+        self._exigir_profesor_de(usuario, asignatura_id)
+        return self.db.desinscribir([(est, asignatura_id, periodo) for est in estudiante_ids])
+
+    def _op_crear_apelacion(self, usuario: Usuario, nota_id: int, descripcion: str,
+                            estudiante_id: Optional[int] = None):
+        self._exigir_mismo(usuario, estudiante_id)
+        self._exigir_rol(usuario, "estudiante")
+        nota = self.db.obtener_nota(nota_id)
+        if nota is None:
+            raise ValueError("Nota no encontrada")
+        if nota.estudiante_id != usuario.id:
+            raise SinPermiso("Esta nota no le pertenece")
+        if not self.logica.dentro_plazo_apelacion(nota.fecha_registro, datetime.now(), 5):
+            raise ValueError("El plazo para apelar esta nota ha expirado")
+        if not self.logica.validar_apelacion(descripcion):
+            raise ValueError("La apelación debe tener al menos 20 caracteres")
+        apelacion = Apelacion(
+            id=None, nota_id=nota_id, estudiante_id=usuario.id,
+            descripcion=descripcion, estado=EstadoApelacion.PENDIENTE,
+            fecha_creacion=datetime.now(), respuesta_profesor=None, fecha_respuesta=None
+        )
+        apelacion_id = self.db.crear_apelacion(apelacion)
+        if self.despachador is not None:
+            self.despachador.despertar()
+        return {"apelacion_id": apelacion_id}
+
+    def _op_responder_apelacion(self, usuario: Usuario, apelacion_id: int, respuesta: str,
+                                estado: str):
+        propietarios = self.db.propietarios_apelacion(apelacion_id)
+        if propietarios is None:
+            raise ValueError("Apelación no encontrada")
+        self._exigir_rol(usuario, "profesor")
+        if propietarios[1] != usuario.id:
+            raise SinPermiso("Solo el profesor de la nota puede responder la apelación")
+        estado_enum = EstadoApelacion(estado)
+        if estado_enum == EstadoApelacion.PENDIENTE:
+            raise ValueError("El estado debe ser aprobada o rechazada")
+        if not self.logica.validar_justificacion(respuesta):
+            raise ValueError("La respuesta debe tener al menos 20 caracteres")
+        self.db.responder_apelacion(apelacion_id, respuesta, estado_enum)
+        if self.despachador is not None:
+            self.despachador.despertar()
+        return {"apelacion_id": apelacion_id, "estado": estado_enum.value}
+
+    def _op_marcar_notificaciones_leidas(self, usuario: Usuario, usuario_id: int,
+                                         ids: Optional[List[int]] = None):
+        #sin ids, todas las recibidas hasta ahora; solo las propias
+        if usuario.id != usuario_id:
+            raise SinPermiso("Solo puede marcar sus propias notificaciones")
+        self.db.marcar_notificaciones_leidas(
+            usuario_id, None if ids is None else [int(i) for i in ids])
+        return {"usuario_id": usuario_id,
+                "sin_leer": self.db.notificaciones_sin_leer(usuario_id)}
+
+
+class CuerpoDemasiadoGrande(ValueError):
+    pass
+
+
+class ManejadorHTTP(BaseHTTPRequestHandler):
+    #API JSON sobre ProcesadorComandos; HTTP/1.1 para mantener conexiones vivas
+    protocol_version = "HTTP/1.1"
+    server_version = "Calificaciones/1.0"
+    disable_nagle_algorithm = True
+    timeout = 15
+    #bytes aceptados en el cuerpo de una solicitud (lotes incluidos)
+    CUERPO_MAXIMO = 1 << 20
+
+    def __init__(self, request, client_address, server):
+        #el servidor atiende la conexion solicitud por solicitud, asi que aqui
+        #solo se preparan los flujos sin entrar al ciclo de handle()
+        self.request = request
+        self.client_address = client_address
+        self.server = server
+        self.close_connection = False
+        self.setup()
+
+    def hay_datos_pendientes(self) -> bool:
+        #solicitudes encadenadas que ya llegaron por la misma conexion
+        self.request.settimeout(0)
+        try:
+            return bool(self.rfile.peek(1))
+        except (BlockingIOError, OSError):
+            return False
+        finally:
+            self.request.settimeout(self.timeout)
+
+    RUTAS = [
+        ("GET", r"/estudiantes/(\d+)/notas",
+         lambda m, q, b: {"op": "notas_estudiante", "estudiante_id": int(m[1]),
+                          "asignatura_id": _entero_opcional(q, "asignatura_id")}),
+        ("GET", r"/estudiantes/(\d+)/asignaturas",
+         lambda m, q, b: {"op": "asignaturas_estudiante", "estudiante_id": int(m[1])}),
+        ("GET", r"/estudiantes/(\d+)/asignaturas/(\d+)/promedio",
+         lambda m, q, b: {"op": "promedio_corte", "estudiante_id": int(m[1]),
+                          "asignatura_id": int(m[2]), "corte": int(q["corte"][0])}
+         if "corte" in q else
+         {"op": "promedio_final", "estudiante_id": int(m[1]), "asignatura_id": int(m[2])}),
+        ("GET", r"/estudiantes/(\d+)/asignaturas/(\d+)/simulacion",
+         lambda m, q, b: {"op": "simular_nota_necesaria", "estudiante_id": int(m[1]),
+                          "asignatura_id": int(m[2]),
+                          "nota_objetivo": float(q.get("nota_objetivo", ["3.0"])[0])}),
+        ("GET", r"/estudiantes/(\d+)/asignaturas/(\d+)/ranking",
+         lambda m, q, b: {"op": "posicion_estudiante", "estudiante_id": int(m[1]),
+                          "asignatura_id": int(m[2])}),
+        ("GET", r"/estudiantes/(\d+)/promedio-acumulado",
+         lambda m, q, b: {"op": "promedio_acumulado", "estudiante_id": int(m[1])}),
+        ("GET", r"/estudiantes/(\d+)/expediente",
+         lambda m, q, b: {"op": "expediente", "estudiante_id": int(m[1])}),
+        ("GET", r"/estudiantes/(\d+)/apelaciones",
+         lambda m, q, b: {"op": "apelaciones_estudiante", "estudiante_id": int(m[1])}),
+        ("GET", r"/profesores/(\d+)/asignaturas",
+         lambda m, q, b: {"op": "asignaturas_profesor", "profesor_id": int(m[1])}),
+        ("GET", r"/profesores/(\d+)/apelaciones",
+         lambda m, q, b: {"op": "apelaciones_profesor", "profesor_id": int(m[1])}),
+        ("GET", r"/asignaturas/(\d+)/estudiantes",
+         lambda m, q, b: {"op": "estudiantes_asignatura", "asignatura_id": int(m[1])}),
+        ("GET", r"/asignaturas/(\d+)/ranking",
+         lambda m, q, b: {"op": "ranking_asignatura", "asignatura_id": int(m[1]),
+                          "limite": int(q.get("limite", ["50"])[0]),
+                          "desplazamiento": int(q.get("desplazamiento", ["0"])[0])}),
+        ("GET", r"/ranking",
+         lambda m, q, b: {"op": "mejores_promedios", "limite": int(q.get("limite", ["10"])[0]),
+                          "desplazamiento": int(q.get("desplazamiento", ["0"])[0]),
+                          "periodo": q.get("periodo", [None])[0]}),
+        ("GET", r"/notas/(\d+)",
+         lambda m, q, b: {"op": "nota", "nota_id": int(m[1])}),
+        ("GET", r"/notas/(\d+)/historial",
+         lambda m, q, b: {"op": "historial_modificaciones", "nota_id": int(m[1])}),
+        ("GET", r"/busqueda",
+         lambda m, q, b: {"op": "buscar", "consulta": q["q"][0],
+                          "asignatura_id": _entero_opcional(q, "asignatura_id"),
+                          "profesor_id": _entero_opcional(q, "profesor_id"),
+                          "desde": q.get("desde", [None])[0], "hasta": q.get("hasta", [None])[0],
+                          "limite": int(q.get("limite", ["20"])[0]),
+                          "desplazamiento": int(q.get("desplazamiento", ["0"])[0])}),
+        ("GET", r"/alertas",
+         lambda m, q, b: {"op": "alertas", "asignatura_id": _entero_opcional(q, "asignatura_id"),
+                          "profesor_id": _entero_opcional(q, "profesor_id"),
+                          "nivel": q.get("nivel", [None])[0],
+                          "limite": int(q.get("limite", ["100"])[0]),
+                          "desplazamiento": int(q.get("desplazamiento", ["0"])[0])}),
+        ("POST", r"/alertas",
+         lambda m, q, b: {**b, "op": "actualizar_alertas"}),
+        ("GET", r"/asignaturas/(\d+)/serie",
+         lambda m, q, b: {"op": "serie_asignatura", "asignatura_id": int(m[1]),
+                          "desde": q.get("desde", [None])[0], "hasta": q.get("hasta", [None])[0],
+                          "paso": q.get("paso", ["dia"])[0]}),
+        ("POST", r"/series",
+         lambda m, q, b: {**b, "op": "actualizar_series"}),
+        ("GET", r"/auditoria/hallazgos",
+         lambda m, q, b: {"op": "hallazgos_auditoria", "tipo": q.get("tipo", [None])[0],
+                          "asignatura_id": _entero_opcional(q, "asignatura_id"),
+                          "profesor_id": _entero_opcional(q, "profesor_id"),
+                          "nota_id": _entero_opcional(q, "nota_id"),
+                          "desde": q.get("desde", [None])[0], "hasta": q.get("hasta", [None])[0],
+                          "limite": int(q.get("limite", ["100"])[0]),
+                          "desplazamiento": int(q.get("desplazamiento", ["0"])[0])}),
+        ("POST", r"/auditoria",
+         lambda m, q, b: {**b, "op": "auditar_historial"}),
+        ("GET", r"/metricas/sentencias",
+         lambda m, q, b: {"op": "metricas_sentencias",
+                          "reiniciar": q.get("reiniciar", ["0"])[0] == "1"}),
+        ("GET", r"/metricas/memoria", lambda m, q, b: {"op": "memoria"}),
+        ("GET", r"/usuarios/(\d+)/notificaciones",
+         lambda m, q, b: {"op": "notificaciones", "usuario_id": int(m[1]),
+                          "solo_sin_leer": q.get("todas", ["0"])[0] != "1",
+                          "limite": int(q.get("limite", ["50"])[0])}),
+        ("GET", r"/usuarios/(\d+)/notificaciones/sin-leer",
+         lambda m, q, b: {"op": "notificaciones_sin_leer", "usuario_id": int(m[1])}),
+        ("POST", r"/usuarios/(\d+)/notificaciones/leidas",
+         lambda m, q, b: {**b, "op": "marcar_notificaciones_leidas", "usuario_id": int(m[1])}),
+        ("GET", r"/notificaciones/estado",
+         lambda m, q, b: {"op": "estado_notificaciones"}),
+        ("POST", r"/sesiones",
+         lambda m, q, b: {**b, "op": "autenticar"}),
+        ("POST", r"/sesiones/cierre",
+         lambda m, q, b: {**b, "op": "cerrar_sesion"}),
+        ("POST", r"/notas",
+         lambda m, q, b: {**b, "op": "registrar_nota"}),
+        ("POST", r"/notas/(\d+)",
+         lambda m, q, b: {**b, "op": "modificar_nota", "nota_id": int(m[1])}),
+        ("POST", r"/asignaturas/(\d+)/inscripciones",
+         lambda m, q, b: {**b, "op": "inscribir", "asignatura_id": int(m[1])}),
+        ("POST", r"/asignaturas/(\d+)/retiros",
+         lambda m, q, b: {**b, "op": "desinscribir", "asignatura_id": int(m[1])}),
+        ("POST", r"/apelaciones",
+         lambda m, q, b: {**b, "op": "crear_apelacion"}),
+        ("POST", r"/apelaciones/(\d+)/respuesta",
+         lambda m, q, b: {**b, "op": "responder_apelacion", "apelacion_id": int(m[1])}),
+        ("POST", r"/comandos",
+         lambda m, q, b: b),
+    ]
+    RUTAS = [(metodo, re.compile(patron + "$"), armar) for metodo, patron, armar in RUTAS]
+
+    #respuestas que dependen solo de las notas de un (estudiante, asignatura)
+    OPERACIONES_CON_ETAG = {"notas_estudiante", "promedio_corte", "promedio_final",
+                            "simular_nota_necesaria"}
+
+    def do_GET(self):
+        self._atender("GET")
+
+    def do_POST(self):
+        self._atender("POST")
+
+    def _atender(self, metodo: str):
+        url = urlsplit(self.path)
+        consulta = parse_qs(url.query)
+        try:
+            cuerpo = self._leer_cuerpo()
+        except ValueError as e:
+            #si el cuerpo no se leyo, sus bytes quedarian como la siguiente solicitud
+            self.close_connection = True
+            estado = 413 if isinstance(e, CuerpoDemasiadoGrande) else 400
+            self._responder(estado, {"ok": False, "error": str(e)}, {"Connection": "close"})
+            return
+
+        for metodo_ruta, patron, armar in self.RUTAS:
+            coincidencia = patron.match(url.path)
+            if metodo_ruta != metodo or not coincidencia:
+                continue
+            try:
+                solicitud = armar(coincidencia, consulta, cuerpo)
+            except (ValueError, KeyError, TypeError) as e:
+                self._responder(400, {"ok": False, "error": f"Parámetros inválidos: {e}"})
+                return
+            procesador = self.server.procesador
+            #el token puede venir en el cuerpo o como "Authorization: Bearer ..."
+            token = self._token_de_encabezado()
+            if token:
+                for parte in solicitud if isinstance(solicitud, list) else [solicitud]:
+                    if isinstance(parte, dict) and parte.get("op") != "autenticar":
+                        parte.setdefault("token", token)
+            if isinstance(solicitud, list):
+                self._responder(200, procesador.procesar_lote(solicitud, self.client_address[0]))
+                return
+
+            encabezados = {}
+            if (solicitud.get("op") in self.OPERACIONES_CON_ETAG
+                    and solicitud.get("asignatura_id") is not None
+                    and procesador.puede_ver_notas(solicitud)):
+                #la version se lee antes que los datos: si cambia en medio,
+                #el cliente queda con un ETag viejo y solo pierde el 304
+                sin_cambios, etag = procesador.servicio.sin_cambios(
+                    solicitud["estudiante_id"], solicitud["asignatura_id"],
+                    self.headers.get("If-None-Match")
+                )
+                encabezados = {"ETag": etag, "Cache-Control": "no-cache"}
+                if sin_cambios:
+                    self._responder(304, None, encabezados)
+                    return
+
+            respuesta = procesador.ejecutar(solicitud, self.client_address[0])
+            if respuesta["ok"]:
+                estado = 200
+            elif "reintentar_en" in respuesta:
+                encabezados = {"Retry-After": str(max(1, round(respuesta["reintentar_en"])))}
+                estado = 429
+            else:
+                encabezados = {}
+                if respuesta.get("no_autenticado"):
+                    encabezados = {"WWW-Authenticate": "Bearer"}
+                    estado = 401
+                elif respuesta.get("prohibido"):
+                    estado = 403
+                else:
+                    estado = 409 if respuesta.get("conflicto") else 400
+            self._responder(estado, respuesta, encabezados)
+            return
+
+        self._responder(404, {"ok": False, "error": f"Ruta no encontrada: {metodo} {url.path}"})
+
+    def _token_de_encabezado(self) -> Optional[str]:
+        autorizacion = self.headers.get("Authorization") or ""
+        esquema, _, token = autorizacion.partition(" ")
+        return token.strip() or None if esquema.lower() == "bearer" else None
+
+    def _leer_cuerpo(self) -> Any:
+        longitud = (self.headers.get("Content-Length") or "0").strip()
+        if not longitud.isdigit():
+            raise ValueError(f"Content-Length inválido: {longitud!r}")
+        longitud = int(longitud)
+        if longitud > self.CUERPO_MAXIMO:
+            raise CuerpoDemasiadoGrande(
+                f"Cuerpo de {longitud} bytes; el máximo es {self.CUERPO_MAXIMO}")
+        if longitud == 0:
+            return {}
+        try:
+            return json.loads(self.rfile.read(longitud))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON inválido: {e}")
+
+    def _responder(self, estado: int, contenido: Any, encabezados: Optional[Dict] = None):
+        self.send_response(estado)
+        for nombre, valor in (encabezados or {}).items():
+            self.send_header(nombre, valor)
+        if estado == 304:
+            self.end_headers()
+            return
+        datos = json.dumps(contenido, ensure_ascii=False).encode("utf-8")
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def log_message(self, formato, *args):
+        if self.server.registrar_accesos:
+            super().log_message(formato, *args)
+
+
+def _limite(limite: Any, maximo: int) -> int:
+    #entre 1 y maximo: LIMIT negativo en SQLite no tiene tope
+    return max(1, min(int(limite), maximo))
+
+
+def _desplazamiento(desplazamiento: Any) -> int:
+    desplazamiento = int(desplazamiento)
+    if desplazamiento < 0:
+        raise ValueError("El desplazamiento no puede ser negativo")
+    return desplazamiento
+
+
+def _entero_opcional(consulta: Dict, nombre: str) -> Optional[int]:
+    return int(consulta[nombre][0]) if nombre in consulta else None
+
+
+class ServidorCalificaciones(HTTPServer):
+    #servidor HTTP con un pool fijo de hilos trabajadores. Las conexiones
+    #keep-alive inactivas esperan en un selector y no ocupan trabajador;
+    #cada trabajador conserva su propia conexion SQLite (reutilizar_conexion)
+
+    def __init__(self, direccion: Tuple[str, int], db_name: str = "calificaciones.db",
+                 trabajadores: int = 8, registrar_accesos: bool = False,
+                 inactividad_maxima: float = 15.0, agrupar_escrituras: bool = False,
+                 fragmentos: int = 0, sesiones: Optional[AlmacenSesiones] = None,
+                 notificaciones: Optional[List[DestinoNotificaciones]] = None):
+        super().__init__(direccion, ManejadorHTTP)
+        self.db = abrir_base_datos(db_name, reutilizar_conexion=True, fragmentos=fragmentos)
+        self.db.activar_wal()
+        self.coalescedor = CoalescedorEscrituras(self.db) if agrupar_escrituras else None
+        #con destinos, un hilo entrega los avisos de apelaciones mientras
+        #el servidor corre; sin ellos quedan en la bandeja (ver --despachar)
+        self.despachador = (DespachadorNotificaciones(self.db, notificaciones).iniciar()
+                            if notificaciones else None)
+        #sesiones en memoria salvo que se indique un almacen compartido
+        #(AlmacenSesionesSQLite) para varios procesos servidores
+        self.procesador = ProcesadorComandos(self.db, escritor=self.coalescedor,
+                                             autenticacion=ServicioAutenticacion(self.db, sesiones),
+                                             despachador=self.despachador)
+        self.registrar_accesos = registrar_accesos
+        self.inactividad_maxima = inactividad_maxima
+        self.pool = ThreadPoolExecutor(max_workers=trabajadores,
+                                       thread_name_prefix="trabajador")
+        self._selector = selectors.DefaultSelector()
+        self._despertador_r, self._despertador_w = socket.socketpair()
+        self._devueltas: List[ManejadorHTTP] = []
+        self._candado = threading.Lock()
+        self._detener = threading.Event()
+        self._detenido = threading.Event()
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        self._detenido.clear()
+        self._selector.register(self.socket, selectors.EVENT_READ, None)
+        self._selector.register(self._despertador_r, selectors.EVENT_READ, "despertar")
+        estacionadas: Dict[ManejadorHTTP, float] = {}
+        try:
+            while not self._detener.is_set():
+                for clave, _ in self._selector.select(poll_interval):
+                    if clave.data is None:
+                        self._aceptar(estacionadas)
+                    elif clave.data == "despertar":
+                        self._despertador_r.recv(4096)
+                    else:
+                        manejador = clave.data
+                        self._selector.unregister(manejador.request)
+                        estacionadas.pop(manejador, None)
+                        self.pool.submit(self._atender_conexion, manejador)
+
+                with self._candado:
+                    devueltas, self._devueltas = self._devueltas, []
+                ahora = time.monotonic()
+                for manejador in devueltas:
+                    self._selector.register(manejador.request, selectors.EVENT_READ, manejador)
+                    estacionadas[manejador] = ahora
+
+                for manejador, desde in list(estacionadas.items()):
+                    if ahora - desde > self.inactividad_maxima:
+                        self._selector.unregister(manejador.request)
+                        del estacionadas[manejador]
+                        self._cerrar_conexion(manejador)
+        finally:
+            for manejador in estacionadas:
+                self._selector.unregister(manejador.request)
+                self._cerrar_conexion(manejador)
+            self._selector.unregister(self.socket)
+            self._selector.unregister(self._despertador_r)
+            self._detenido.set()
+
+    def _aceptar(self, estacionadas: Dict):
+        try:
+            request, client_address = self.get_request()
+        except OSError:
+            return
+        manejador = ManejadorHTTP(request, client_address, self)
+        self._selector.register(request, selectors.EVENT_READ, manejador)
+        estacionadas[manejador] = time.monotonic()
+
+    def _atender_conexion(self, manejador: "ManejadorHTTP"):
+        #atiende las solicitudes ya disponibles y devuelve la conexion al selector
+        try:
+            while True:
+                manejador.handle_one_request()
+                if manejador.close_connection or not manejador.hay_datos_pendientes():
+                    break
+        except Exception:
+            self.handle_error(manejador.request, manejador.client_address)
+            manejador.close_connection = True
+
+        if manejador.close_connection or self._detener.is_set():
+            self._cerrar_conexion(manejador)
+            return
+        with self._candado:
+            self._devueltas.append(manejador)
+        self._despertador_w.send(b"\0")
+
+    def _cerrar_conexion(self, manejador: "ManejadorHTTP"):
+        try:
+            manejador.finish()
+        except OSError:
+            pass
+        self.shutdown_request(manejador.request)
+
+    def shutdown(self):
+        self._detener.set()
+        self._despertador_w.send(b"\0")
+        self._detenido.wait()
+
+    def server_close(self):
+        super().server_close()
+        #primero el coalescedor: los trabajadores que sigan escribiendo
+        #reciben un error en lugar de esperar un hilo que ya no existe
+        if self.coalescedor:
+            self.coalescedor.cerrar()
+        self.pool.shutdown(wait=False)
+        if self.despachador:
+            self.despachador.detener()
+        self._selector.close()
+        self._despertador_r.close()
+        self._despertador_w.close()
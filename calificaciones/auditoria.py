@@ -0,0 +1,170 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#analitica de auditoria sobre historial_modificaciones: un solo recorrido en
+#orden de fecha con agregados incrementales en ventanas deslizantes, asi la
+#memoria depende de lo ocurrido dentro de cada ventana y no del tamaño del historial
+
+import time
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from calificaciones.almacenamiento import BaseDatos
+
+_EPOCA = datetime(1970, 1, 1)
+
+
+def _segundos(fecha: str) -> float:
+    return (datetime.fromisoformat(fecha) - _EPOCA).total_seconds()
+
+
+class AnalizadorHistorial:
+    #tipos de hallazgo:
+    #- ediciones_repetidas: ediciones_maximas o mas modificaciones de una nota en
+    #  dias_ventana dias; valor = maximo de modificaciones dentro de una ventana
+    #- salto: una modificacion que cambia la nota en salto_minimo o mas;
+    #  valor = diferencia con signo
+    #- edicion_tardia: modificacion hecha dias_tardia dias o mas despues del
+    #  fecha_registro de la nota; valor = dias
+    #- rafaga_tras_apelacion: ediciones_rafaga o mas modificaciones de otras notas
+    #  de la asignatura en las horas_apelacion horas siguientes a una apelacion;
+    #  valor = modificaciones
+
+    TIPOS = ("ediciones_repetidas", "salto", "edicion_tardia", "rafaga_tras_apelacion")
+
+    def __init__(self, db: BaseDatos, ediciones_maximas: int = 3, dias_ventana: float = 30.0,
+                 salto_minimo: float = 1.5, dias_tardia: float = 30.0,
+                 horas_apelacion: float = 48.0, ediciones_rafaga: int = 5):
+        self.db = db
+        self.ediciones_maximas = ediciones_maximas
+        self.dias_ventana = dias_ventana
+        self.salto_minimo = salto_minimo
+        self.dias_tardia = dias_tardia
+        self.horas_apelacion = horas_apelacion
+        self.ediciones_rafaga = ediciones_rafaga
+        self.modificaciones = 0
+        self.apelaciones = 0
+        self.conteos: Dict[str, int] = dict.fromkeys(self.TIPOS, 0)
+
+    def ejecutar(self) -> Dict:
+        #analiza todo el historial y reemplaza hallazgos_auditoria
+        inicio = time.perf_counter()
+        total = self.db.auditar_historial(self.detectar)
+        return {
+            "modificaciones": self.modificaciones,
+            "apelaciones": self.apelaciones,
+            "hallazgos": total,
+            "por_tipo": dict(self.conteos),
+            "segundos": round(time.perf_counter() - inicio, 3)
+        }
+
+    def obtener_hallazgos(self, tipo: Optional[str] = None, asignatura_id: Optional[int] = None,
+                          profesor_id: Optional[int] = None, nota_id: Optional[int] = None,
+                          desde: Optional[str] = None, hasta: Optional[str] = None,
+                          limite: int = 100, desplazamiento: int = 0) -> List[Dict]:
+        if tipo is not None and tipo not in self.TIPOS:
+            raise ValueError(f"Tipo de hallazgo desconocido: {tipo}")
+        campos = ("id", "tipo", "nota_id", "historial_id", "apelacion_id", "estudiante_id",
+                  "asignatura_id", "profesor_id", "fecha", "valor", "detalle")
+        return [dict(zip(campos, fila))
+                for fila in self.db.obtener_hallazgos_auditoria(tipo, asignatura_id, profesor_id,
+                                                                nota_id, desde, hasta, limite,
+                                                                desplazamiento)]
+
+    def detectar(self, eventos: Iterable[Tuple]) -> Iterator[Tuple]:
+        #eventos en orden de fecha, ver BaseDatos.auditar_historial
+        self.modificaciones = self.apelaciones = 0
+        self.conteos = dict.fromkeys(self.TIPOS, 0)
+        ventana = self.dias_ventana * 86400
+        tardia = self.dias_tardia * 86400
+        plazo_apelacion = self.horas_apelacion * 3600
+
+        #modificaciones dentro de la ventana, en orden, y por nota
+        #[en la ventana, maximo del episodio, hallazgo sin valor ni detalle]
+        recientes: Deque[Tuple[float, int]] = deque()
+        por_nota: Dict[int, List] = {}
+        #ventanas de apelacion abiertas, en orden de cierre y por asignatura:
+        #[cierre, modificaciones, hallazgo sin valor ni detalle]
+        abiertas: Deque[List] = deque()
+        por_asignatura: Dict[int, Deque[List]] = {}
+
+        for (fecha, clase, id_, nota_id, asignatura_id, profesor_id, estudiante_id,
+             anterior, nueva, registro) in eventos:
+            instante = _segundos(fecha)
+
+            #las apelaciones duran lo mismo, asi que cierran en orden de apertura
+            while abiertas and abiertas[0][0] <= instante:
+                yield from self._cerrar_apelacion(abiertas.popleft(), por_asignatura)
+
+            while recientes and recientes[0][0] <= instante - ventana:
+                vieja = recientes.popleft()[1]
+                estado = por_nota[vieja]
+                estado[0] -= 1
+                if estado[0] == 0:
+                    del por_nota[vieja]
+                    yield from self._cerrar_episodio(estado)
+
+            if clase == 0:
+                self.apelaciones += 1
+                apelacion = [instante + plazo_apelacion, 0,
+                             ("rafaga_tras_apelacion", nota_id, None, id_, estudiante_id,
+                              asignatura_id, profesor_id, fecha)]
+                abiertas.append(apelacion)
+                por_asignatura.setdefault(asignatura_id, deque()).append(apelacion)
+                continue
+
+            self.modificaciones += 1
+            base = (nota_id, id_, None, estudiante_id, asignatura_id, profesor_id, fecha)
+
+            diferencia = nueva - anterior
+            if abs(diferencia) >= self.salto_minimo:
+                self.conteos["salto"] += 1
+                yield ("salto", *base, round(diferencia, 2), f"{anterior:.1f} -> {nueva:.1f}")
+
+            dias = instante - _segundos(registro)
+            if dias >= tardia:
+                self.conteos["edicion_tardia"] += 1
+                yield ("edicion_tardia", *base, round(dias / 86400, 1),
+                       f"{dias / 86400:.0f} días después del registro ({registro[:10]})")
+
+            recientes.append((instante, nota_id))
+            estado = por_nota.get(nota_id)
+            if estado is None:
+                estado = por_nota[nota_id] = [0, 0, None]
+            estado[0] += 1
+            estado[1] = max(estado[1], estado[0])
+            if estado[2] is None and estado[0] >= self.ediciones_maximas:
+                estado[2] = ("ediciones_repetidas", *base)
+
+            for apelacion in por_asignatura.get(asignatura_id, ()):
+                if apelacion[2][1] != nota_id:
+                    apelacion[1] += 1
+
+        for apelacion in abiertas:
+            yield from self._cerrar_apelacion(apelacion, None)
+        for estado in por_nota.values():
+            yield from self._cerrar_episodio(estado)
+
+    def _cerrar_episodio(self, estado: List) -> Iterator[Tuple]:
+        #la nota salio de la ventana; un hallazgo por episodio con su maximo
+        if estado[2] is not None:
+            self.conteos["ediciones_repetidas"] += 1
+            yield (*estado[2], float(estado[1]),
+                   f"{estado[1]} modificaciones en {self.dias_ventana:g} días")
+
+    def _cerrar_apelacion(self, apelacion: List,
+                          por_asignatura: Optional[Dict[int, Deque[List]]]
+                          ) -> Iterator[Tuple]:
+        #None al terminar el recorrido, cuando ya no hace falta desencolarla
+        if por_asignatura is not None:
+            asignatura_id = apelacion[2][5]
+            pendientes = por_asignatura[asignatura_id]
+            pendientes.popleft()
+            if not pendientes:
+                del por_asignatura[asignatura_id]
+        if apelacion[1] >= self.ediciones_rafaga:
+            self.conteos["rafaga_tras_apelacion"] += 1
+            yield (*apelacion[2], float(apelacion[1]),
+                   f"{apelacion[1]} modificaciones en {self.horas_apelacion:g} h "
+                   f"tras la apelación {apelacion[2][3]}")
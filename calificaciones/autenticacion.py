@@ -0,0 +1,327 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#inicio de sesion con limite de intentos (token bucket por usuario y por
+#origen) y sesiones con vencimiento. Un intento sin fichas disponibles se
+#rechaza sin consultar la base de datos
+
+import abc
+import dataclasses
+import heapq
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from calificaciones.almacenamiento import BaseDatos, _conectar
+from calificaciones.modelos import Usuario
+from calificaciones.sentencias import RegistroSentencias
+
+
+class DemasiadosIntentos(Exception):
+
+    def __init__(self, espera: float):
+        self.espera = espera
+        super().__init__(f"Demasiados intentos fallidos; intente de nuevo en {espera:.0f} s")
+
+
+class NoAutenticado(Exception):
+    #la operacion requiere un token de sesion valido (HTTP 401)
+
+    def __init__(self, mensaje: str = "Se requiere una sesión válida (token)"):
+        super().__init__(mensaje)
+
+
+class SinPermiso(Exception):
+    #el usuario de la sesion no puede hacer la operacion (HTTP 403)
+    pass
+
+
+class LimitadorIntentos:
+    #una cubeta de `capacidad` fichas por clave que se rellena a `por_segundo`;
+    #cada intento toma una ficha. Las cubetas llenas no guardan informacion y
+    #se descartan; por encima de max_claves se descartan las menos usadas
+
+    def __init__(self, capacidad: float = 5, por_segundo: float = 1 / 30,
+                 max_claves: int = 100_000, reloj: Callable[[], float] = time.monotonic):
+        self.capacidad = capacidad
+        self.por_segundo = por_segundo
+        self.max_claves = max_claves
+        self.reloj = reloj
+        #clave -> [fichas, instante de la ultima actualizacion], en orden de uso
+        self._cubetas: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._candado = threading.Lock()
+
+    def tomar(self, clave: str) -> float:
+        #0.0 si se tomo una ficha; si no, segundos hasta la siguiente
+        with self._candado:
+            ahora = self.reloj()
+            fichas = self._fichas(clave, ahora)
+            if fichas >= 1:
+                self._guardar(clave, fichas - 1, ahora)
+                return 0.0
+            self._guardar(clave, fichas, ahora)
+            return (1 - fichas) / self.por_segundo
+
+    def devolver(self, clave: str):
+        #reintegra la ficha de un intento que resulto valido
+        with self._candado:
+            ahora = self.reloj()
+            fichas = self._fichas(clave, ahora)
+            if fichas + 1 >= self.capacidad:
+                self._cubetas.pop(clave, None)
+            else:
+                self._guardar(clave, fichas + 1, ahora)
+
+    def __len__(self) -> int:
+        return len(self._cubetas)
+
+    def _fichas(self, clave: str, ahora: float) -> float:
+        cubeta = self._cubetas.get(clave)
+        if cubeta is None:
+            return self.capacidad
+        return min(self.capacidad, cubeta[0] + (ahora - cubeta[1]) * self.por_segundo)
+
+    def _guardar(self, clave: str, fichas: float, ahora: float):
+        self._cubetas[clave] = [fichas, ahora]
+        self._cubetas.move_to_end(clave)
+        if len(self._cubetas) > self.max_claves:
+            self._podar(ahora)
+
+    def _podar(self, ahora: float):
+        llenas = [clave for clave, (fichas, instante) in self._cubetas.items()
+                  if fichas + (ahora - instante) * self.por_segundo >= self.capacidad]
+        for clave in llenas:
+            del self._cubetas[clave]
+        while len(self._cubetas) > self.max_claves:
+            self._cubetas.popitem(last=False)
+
+
+class AlmacenSesiones(abc.ABC):
+    #interfaz de las sesiones: token -> usuario, con vencimiento deslizante de
+    #ttl segundos desde el ultimo uso. AlmacenSesionesMemoria sirve para un
+    #proceso; AlmacenSesionesSQLite se comparte entre procesos de la misma maquina
+
+    def __init__(self, ttl: float = 1800.0, reloj: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.reloj = reloj
+
+    @abc.abstractmethod
+    def crear(self, usuario: Usuario) -> str:
+        ...
+
+    @abc.abstractmethod
+    def obtener(self, token: str) -> Optional[Usuario]:
+        #None si no existe o vencio; si existe, renueva su vencimiento
+        ...
+
+    @abc.abstractmethod
+    def cerrar(self, token: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def purgar(self) -> int:
+        #elimina las sesiones vencidas y devuelve cuantas
+        ...
+
+    @staticmethod
+    def _nuevo_token() -> str:
+        return secrets.token_urlsafe(32)
+
+
+class AlmacenSesionesMemoria(AlmacenSesiones):
+    #las sesiones vencidas se purgan al crear sesiones, a lo sumo una vez
+    #cada ttl/10 segundos, usando un heap de vencimientos; las entradas del heap
+    #que quedaron viejas por una renovacion se descartan al sacarlas. Las
+    #sesiones no van al presupuesto de memoria: son estado, no cache, y el LRU
+    #cerraria sesiones vigentes para hacer lugar a otras caches. Las acota el
+    #vencimiento (y el limite de intentos al crearlas)
+
+    def __init__(self, ttl: float = 1800.0, reloj: Callable[[], float] = time.time):
+        super().__init__(ttl, reloj)
+        self._sesiones: Dict[str, List] = {}
+        self._vencimientos: List[Tuple[float, str]] = []
+        self._proxima_purga = 0.0
+        self._candado = threading.Lock()
+
+    def crear(self, usuario: Usuario) -> str:
+        token = self._nuevo_token()
+        with self._candado:
+            ahora = self.reloj()
+            if ahora >= self._proxima_purga:
+                self._purgar(ahora)
+            #la sesion no guarda la contraseña
+            self._sesiones[token] = [dataclasses.replace(usuario, password=""),
+                                     ahora + self.ttl]
+            heapq.heappush(self._vencimientos, (ahora + self.ttl, token))
+        return token
+
+    def obtener(self, token: str) -> Optional[Usuario]:
+        with self._candado:
+            sesion = self._sesiones.get(token)
+            if sesion is None:
+                return None
+            ahora = self.reloj()
+            if sesion[1] <= ahora:
+                del self._sesiones[token]
+                return None
+            #el heap conserva el vencimiento anterior; _purgar lo reencola
+            sesion[1] = ahora + self.ttl
+            return sesion[0]
+
+    def cerrar(self, token: str) -> bool:
+        with self._candado:
+            return self._sesiones.pop(token, None) is not None
+
+    def purgar(self) -> int:
+        with self._candado:
+            return self._purgar(self.reloj())
+
+    def __len__(self) -> int:
+        return len(self._sesiones)
+
+    def _purgar(self, ahora: float) -> int:
+        purgadas = 0
+        while self._vencimientos and self._vencimientos[0][0] <= ahora:
+            _, token = heapq.heappop(self._vencimientos)
+            sesion = self._sesiones.get(token)
+            if sesion is None:
+                continue
+            if sesion[1] <= ahora:
+                del self._sesiones[token]
+                purgadas += 1
+            else:
+                heapq.heappush(self._vencimientos, (sesion[1], token))
+        self._proxima_purga = ahora + self.ttl / 10
+        return purgadas
+
+
+class AlmacenSesionesSQLite(AlmacenSesiones):
+    #tabla de sesiones en un archivo aparte de la base de calificaciones, para
+    #no competir por su bloqueo de escritura. Para no escribir en cada
+    #consulta, obtener solo renueva cuando ya paso la mitad del ttl
+
+    def __init__(self, archivo: str, ttl: float = 1800.0,
+                 reloj: Callable[[], float] = time.time):
+        super().__init__(ttl, reloj)
+        self.archivo = archivo
+        self.sentencias = RegistroSentencias()
+        self._local = threading.local()
+        self._proxima_purga = 0.0
+        conn = self._conexion()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS sesiones (
+                token TEXT PRIMARY KEY,
+                usuario_id INTEGER NOT NULL,
+                username TEXT NOT NULL,
+                rol TEXT NOT NULL,
+                nombre_completo TEXT NOT NULL,
+                expira REAL NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sesiones_expira ON sesiones (expira)")
+        conn.commit()
+
+    def _conexion(self):
+        #una conexion por hilo, como BaseDatos con reutilizar_conexion
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _conectar(self.archivo)
+        return conn
+
+    def cerrar_conexion(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def crear(self, usuario: Usuario) -> str:
+        token = self._nuevo_token()
+        ahora = self.reloj()
+        if ahora >= self._proxima_purga:
+            self.purgar()
+        conn = self._conexion()
+        self.sentencias.ejecutar(conn, "sesiones.crear",
+                                 (token, usuario.id, usuario.username, usuario.rol,
+                                  usuario.nombre_completo, ahora + self.ttl))
+        conn.commit()
+        return token
+
+    def obtener(self, token: str) -> Optional[Usuario]:
+        conn = self._conexion()
+        ahora = self.reloj()
+        fila = self.sentencias.consultar_uno(conn, "sesiones.obtener", (token, ahora))
+        if fila is None:
+            return None
+        if fila[4] - ahora < self.ttl / 2:
+            self.sentencias.ejecutar(conn, "sesiones.renovar", (ahora + self.ttl, token))
+            conn.commit()
+        return Usuario(fila[0], fila[1], "", fila[2], fila[3])
+
+    def cerrar(self, token: str) -> bool:
+        conn = self._conexion()
+        cursor = self.sentencias.ejecutar(conn, "sesiones.cerrar", (token,))
+        conn.commit()
+        return cursor.rowcount > 0
+
+    def purgar(self) -> int:
+        ahora = self.reloj()
+        self._proxima_purga = ahora + self.ttl / 10
+        conn = self._conexion()
+        try:
+            cursor = self.sentencias.ejecutar(conn, "sesiones.purgar", (ahora,))
+            conn.commit()
+        except sqlite3.OperationalError:
+            #otro proceso tiene el bloqueo; purgara este o la siguiente vez
+            conn.rollback()
+            return 0
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self.sentencias.consultar_uno(self._conexion(), "sesiones.contar",
+                                             (self.reloj(),))[0]
+
+
+class ServicioAutenticacion:
+    #cada intento toma una ficha del usuario y otra del origen (IP del cliente,
+    #"cli", ...) antes de consultar la base; un inicio de sesion correcto las
+    #devuelve, asi que solo los intentos fallidos agotan el limite
+
+    def __init__(self, db: BaseDatos, sesiones: Optional[AlmacenSesiones] = None,
+                 por_usuario: Optional[LimitadorIntentos] = None,
+                 por_origen: Optional[LimitadorIntentos] = None):
+        self.db = db
+        #los tres definen __len__ y vacios son falsos: comparar con None
+        self.sesiones = AlmacenSesionesMemoria() if sesiones is None else sesiones
+        self.por_usuario = (LimitadorIntentos(capacidad=5, por_segundo=1 / 30)
+                            if por_usuario is None else por_usuario)
+        self.por_origen = (LimitadorIntentos(capacidad=30, por_segundo=1 / 2)
+                           if por_origen is None else por_origen)
+
+    def iniciar_sesion(self, username: str, password: str,
+                       origen: str = "local") -> Optional[Tuple[str, Usuario]]:
+        #(token, usuario), None si las credenciales no son validas, o
+        #DemasiadosIntentos sin llegar a la base
+        espera = self.por_usuario.tomar(username)
+        if espera:
+            raise DemasiadosIntentos(espera)
+        espera = self.por_origen.tomar(origen)
+        if espera:
+            self.por_usuario.devolver(username)
+            raise DemasiadosIntentos(espera)
+
+        usuario = self.db.autenticar_usuario(username, password)
+        if usuario is None:
+            return None
+        self.por_usuario.devolver(username)
+        self.por_origen.devolver(origen)
+        return self.sesiones.crear(usuario), usuario
+
+    def usuario_de_sesion(self, token: str) -> Optional[Usuario]:
+        return self.sesiones.obtener(token)
+
+    def cerrar_sesion(self, token: str) -> bool:
+        return self.sesiones.cerrar(token)
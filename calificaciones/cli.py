@@ -0,0 +1,1100 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#menu interactivo y punto de entrada de la linea de comandos. La API HTTP y
+#el modo --batch se importan solo cuando se usan
+
+import json
+import sys
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from calificaciones.almacenamiento import abrir_base_datos, restaurar_respaldo
+from calificaciones.auditoria import AnalizadorHistorial
+from calificaciones.autenticacion import (AlmacenSesionesSQLite, DemasiadosIntentos,
+                                          ServicioAutenticacion)
+from calificaciones.memoria import (ENTORNO as ENTORNO_MEMORIA, MB_PREDETERMINADOS,
+                                    configurar_presupuesto)
+from calificaciones.modelos import Apelacion, ConflictoVersion, EstadoApelacion, Nota, Usuario
+from calificaciones.perfil import Perfilador
+from calificaciones.reglas import ReglasLogicas
+from calificaciones.servicio import ServicioCalificaciones
+
+
+class InterfazCLI:
+
+    #acciones de los menus que se miden con --perfil
+    ACCIONES = (
+        "registrar_nota", "modificar_nota", "ver_apelaciones_profesor", "responder_apelacion",
+        "ver_historial_modificaciones", "generar_reportes_profesor", "buscar_texto",
+        "consultar_calificaciones", "ver_promedios_cortes", "calcular_promedio_final",
+        "simular_notas", "crear_apelacion", "ver_mis_apelaciones",
+    )
+    
+    def __init__(self, db_name: str = "calificaciones.db", fragmentos: int = 0,
+                 perfilador: Optional[Perfilador] = None):
+        self.db = abrir_base_datos(db_name, fragmentos=fragmentos)
+        self.servicio = ServicioCalificaciones(self.db)
+        self.autenticacion = ServicioAutenticacion(self.db)
+        self.logica = ReglasLogicas()
+        self.usuario_actual: Optional[Usuario] = None
+        self.sesion: Optional[str] = None
+        if perfilador is not None:
+            perfilador.instrumentar(self.servicio)
+            perfilador.instrumentar(self, self.ACCIONES)
+            #las acciones terminan esperando Enter; esa espera no se mide
+            globals()["input"] = perfilador.sin_medir(input)
+    
+    def limpiar_pantalla(self):
+        print("\n" * 50)
+    
+    def mostrar_encabezado(self, titulo: str):
+        print("\n" + "=" * 70)
+        print(f"  {titulo}")
+        print("=" * 70 + "\n")
+    
+    def iniciar(self):
+        self.limpiar_pantalla()
+        print("╔════════════════════════════════════════════════════════════╗")
+        print("║   SISTEMA DE GESTIÓN DE CALIFICACIONES CON LÓGICA FORMAL  ║")
+        print("╚════════════════════════════════════════════════════════════╝")
+        
+        while True:
+            if not self.usuario_actual:
+                self.menu_login()
+            else:
+                if self.usuario_actual.rol == "profesor":
+                    self.menu_profesor()
+                else:
+                    self.menu_estudiante()
+    
+    def menu_login(self):
+        #menu iniciar sesion
+        self.mostrar_encabezado("INICIO DE SESIÓN")
+        print("Usuarios de prueba:")
+        print("  Profesores: profesor1/pass123, profesor2/pass123")
+        print("  Estudiantes: estudiante1/pass123, estudiante2/pass123\n")
+        
+        username = input("Usuario: ").strip()
+        password = input("Contraseña: ").strip()
+        
+        try:
+            sesion = self.autenticacion.iniciar_sesion(username, password, origen="cli")
+        except DemasiadosIntentos as e:
+            print(f"\n✗ {e}.")
+            input("\nPresione Enter para continuar...")
+            return
+        if sesion:
+            self.sesion, self.usuario_actual = sesion
+            print(f"\n✓ Bienvenido, {self.usuario_actual.nombre_completo}!")
+            input("\nPresione Enter para continuar...")
+        else:
+            print("\n✗ Credenciales incorrectas.")
+            input("\nPresione Enter para continuar...")
+
+    def cerrar_sesion(self):
+        if self.sesion:
+            self.autenticacion.cerrar_sesion(self.sesion)
+        self.sesion = None
+        self.usuario_actual = None
+    
+    def menu_profesor(self):
+        #menu profesor
+        self.limpiar_pantalla()
+        self.mostrar_encabezado(f"MENÚ PROFESOR - {self.usuario_actual.nombre_completo}")
+        
+        print("1. Registrar nueva nota")
+        print("2. Modificar nota existente")
+        print("3. Ver apelaciones pendientes" + self._avisos_sin_leer("nuevas"))
+        print("4. Responder apelaciones")
+        print("5. Ver historial de modificaciones")
+        print("6. Generar reportes")
+        print("7. Buscar en justificaciones y apelaciones")
+        print("0. Cerrar sesión")
+        
+        opcion = input("\nSeleccione una opción: ").strip()
+        
+        if opcion == "1":
+            self.registrar_nota()
+        elif opcion == "2":
+            self.modificar_nota()
+        elif opcion == "3":
+            self.ver_apelaciones_profesor()
+        elif opcion == "4":
+            self.responder_apelacion()
+        elif opcion == "5":
+            self.ver_historial_modificaciones()
+        elif opcion == "6":
+            self.generar_reportes_profesor()
+        elif opcion == "7":
+            self.buscar_texto()
+        elif opcion == "0":
+            self.cerrar_sesion()
+        else:
+            print("\n✗ Opción inválida.")
+            input("\nPresione Enter para continuar...")
+    
+    def menu_estudiante(self):
+        #menu estudiante
+        self.limpiar_pantalla()
+        self.mostrar_encabezado(f"MENÚ ESTUDIANTE - {self.usuario_actual.nombre_completo}")
+        
+        print("1. Consultar mis calificaciones")
+        print("2. Ver promedios por corte")
+        print("3. Calcular promedio final")
+        print("4. Simular escenarios de notas")
+        print("5. Generar apelación")
+        print("6. Ver mis apelaciones" + self._avisos_sin_leer("respondidas"))
+        print("0. Cerrar sesión")
+        
+        opcion = input("\nSeleccione una opción: ").strip()
+        
+        if opcion == "1":
+            self.consultar_calificaciones()
+        elif opcion == "2":
+            self.ver_promedios_cortes()
+        elif opcion == "3":
+            self.calcular_promedio_final()
+        elif opcion == "4":
+            self.simular_notas()
+        elif opcion == "5":
+            self.crear_apelacion()
+        elif opcion == "6":
+            self.ver_mis_apelaciones()
+        elif opcion == "0":
+            self.cerrar_sesion()
+        else:
+            print("\n✗ Opción inválida.")
+            input("\nPresione Enter para continuar...")
+    
+    def _avisos_sin_leer(self, descripcion: str) -> str:
+        #sufijo del menu con los avisos de apelaciones aun no vistos
+        cantidad = self.db.notificaciones_sin_leer(self.usuario_actual.id)
+        return f" ({cantidad} {descripcion})" if cantidad else ""
+
+    def _tomar_avisos(self) -> set:
+        #apelaciones con avisos sin leer, que quedan leidos al mostrarlas
+        avisos = self.db.obtener_notificaciones(self.usuario_actual.id, limite=500)
+        if avisos:
+            self.db.marcar_notificaciones_leidas(self.usuario_actual.id,
+                                                 [aviso["id"] for aviso in avisos])
+        return {aviso["apelacion_id"] for aviso in avisos}
+
+    #metodos para profesores
+    def registrar_nota(self):
+        #registrar nueva nota
+        self.mostrar_encabezado("REGISTRAR NUEVA NOTA")
+        
+        #seleccionar asignatura
+        asignaturas = self.db.obtener_asignaturas_profesor(self.usuario_actual.id)
+        if not asignaturas:
+            print("No tiene asignaturas asignadas.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        print("Asignaturas:")
+        for i, (id_asig, codigo, nombre, creditos) in enumerate(asignaturas, 1):
+            print(f"{i}. {codigo} - {nombre}")
+        
+        try:
+            idx = int(input("\nSeleccione asignatura: ")) - 1
+            asignatura_id = asignaturas[idx][0]
+        except:
+            print("\n✗ Selección inválida.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        #seleccionar estudiante
+        estudiantes = self.db.obtener_estudiantes_asignatura(asignatura_id)
+        if not estudiantes:
+            print("\nNo hay estudiantes inscritos.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        print("\nEstudiantes:")
+        for i, (id_est, nombre, username) in enumerate(estudiantes, 1):
+            print(f"{i}. {nombre} ({username})")
+        
+        try:
+            idx = int(input("\nSeleccione estudiante: ")) - 1
+            estudiante_id = estudiantes[idx][0]
+        except:
+            print("\n✗ Selección inválida.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        #ingresar nota
+        try:
+            corte = int(input("\nCorte (1, 2 o 3): "))
+            if corte not in [1, 2, 3]:
+                raise ValueError
+            
+            actividad = input("Nombre de la actividad: ").strip()
+            nota_valor = float(input("Nota (0.0 - 5.0): "))
+            porcentaje = float(input("Porcentaje (0 - 100): "))
+            justificacion = input("Justificación (mín. 20 caracteres): ").strip()
+            
+            #validar usando logica formal
+            if not self.logica.validar_nota(nota_valor):
+                print("\n✗ La nota debe estar entre 0.0 y 5.0")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            if not self.logica.validar_porcentaje(porcentaje):
+                print("\n✗ El porcentaje debe estar entre 0 y 100")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            if not self.logica.validar_justificacion(justificacion):
+                print("\n✗ La justificación debe tener al menos 20 caracteres")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            #crear objeto nota
+            nota = Nota(
+                id=None,
+                estudiante_id=estudiante_id,
+                asignatura_id=asignatura_id,
+                corte=corte,
+                actividad=actividad,
+                nota=nota_valor,
+                porcentaje=porcentaje,
+                fecha_registro=datetime.now(),
+                profesor_id=self.usuario_actual.id,
+                justificacion=justificacion
+            )
+            
+            #registrar en base de datos
+            try:
+                nota_id = self.db.registrar_nota(nota)
+            except ValueError as e:
+                print(f"\n✗ {e}")
+                input("\nPresione Enter para continuar...")
+                return
+            print(f"\n:D Nota registrada exitosamente (ID: {nota_id})")
+
+        except ValueError:
+            print("\n D: Valores inválidos ingresados.")
+        
+        input("\nPresione Enter para continuar...")
+    
+    def modificar_nota(self):
+        #modificar nota existente
+        self.mostrar_encabezado("MODIFICAR NOTA EXISTENTE")
+        
+        try:
+            nota_id = int(input("ID de la nota a modificar: "))
+            
+            #verificar q la nota existe Y pertenece al profesor
+            nota = self.db.obtener_nota(nota_id)
+            
+            if not nota:
+                print("\n✗ Nota no encontrada.")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            nota_actual = nota.nota
+            
+            #validar permisos usando logica formal
+            if not self.logica.puede_modificar_nota("profesor", nota.profesor_id == self.usuario_actual.id):
+                print("\n✗ No tiene permisos para modificar esta nota.")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            print(f"\nNota actual: {nota_actual}")
+            nueva_nota = float(input("Nueva nota (0.0 - 5.0): "))
+            justificacion = input("Justificación de la modificación (mín. 20 caracteres): ").strip()
+            
+            #validar usando logica formal
+            if not self.logica.validar_nota(nueva_nota):
+                print("\n✗ La nota debe estar entre 0.0 y 5.0")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            if not self.logica.validar_justificacion(justificacion):
+                print("\n✗ La justificación debe tener al menos 20 caracteres")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            #modificar nota, solo si sigue en la version que se mostro
+            self.db.modificar_nota(nota_id, nueva_nota, justificacion, self.usuario_actual.id,
+                                   version_esperada=nota.version)
+            print(f"\n✓ Nota modificada exitosamente de {nota_actual} a {nueva_nota}")
+            
+        except ConflictoVersion as e:
+            print(f"\n✗ {e}. Vuelva a consultarla antes de modificarla.")
+        except ValueError:
+            print("\n✗ Valores inválidos ingresados.")
+        
+        input("\nPresione Enter para continuar...")
+    
+    def ver_apelaciones_profesor(self):
+        #apelaciones pendientes del profesor
+        self.mostrar_encabezado("APELACIONES PENDIENTES")
+        
+        nuevas = self._tomar_avisos()
+        
+        #se imprimen a medida que se leen: un profesor con miles de
+        #apelaciones no las carga todas en memoria
+        mostradas = 0
+        for apel in self.db.iterar_apelaciones_profesor(self.usuario_actual.id):
+            mostradas += 1
+            id_apel, nota_id, est_id, desc, estado, fecha, nombre_est, actividad, nota = apel
+            print(f"\n{'─' * 70}")
+            print(f"ID Apelación: {id_apel}" + ("  ★ NUEVA" if id_apel in nuevas else ""))
+            print(f"Estudiante: {nombre_est}")
+            print(f"Actividad: {actividad} | Nota: {nota}")
+            print(f"Estado: {estado}")
+            print(f"Fecha: {fecha}")
+            print(f"Descripción: {desc}")
+        
+        if not mostradas:
+            print("No hay apelaciones.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        input("\n\nPresione Enter para continuar...")
+    
+    def responder_apelacion(self):
+        #responder apelacion
+        self.mostrar_encabezado("RESPONDER APELACIÓN")
+        
+        try:
+            apelacion_id = int(input("ID de la apelación: "))
+            propietarios = self.db.propietarios_apelacion(apelacion_id)
+            if propietarios is None or propietarios[1] != self.usuario_actual.id:
+                print("\n✗ La apelación no existe o no es de una nota suya.")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            print("\nOpciones:")
+            print("1. Aprobar apelación")
+            print("2. Rechazar apelación")
+            opcion = input("\nSeleccione: ").strip()
+            
+            respuesta = input("Respuesta al estudiante (mín. 20 caracteres): ").strip()
+            
+            if not self.logica.validar_justificacion(respuesta):
+                print("\n✗ La respuesta debe tener al menos 20 caracteres")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            if opcion == "1":
+                estado = EstadoApelacion.APROBADA
+                print("\nSi aprueba la apelación, debe modificar la nota.")
+                modificar = input("¿Desea modificar la nota ahora? (s/n): ").strip().lower()
+                if modificar == 's':
+                    # Aquí se podría implementar la modificación directa
+                    pass
+            elif opcion == "2":
+                estado = EstadoApelacion.RECHAZADA
+            else:
+                print("\n✗ Opción inválida.")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            self.db.responder_apelacion(apelacion_id, respuesta, estado)
+            print(f"\n✓ Apelación {estado.value} exitosamente.")
+            
+        except ValueError:
+            print("\n✗ ID inválido.")
+        
+        input("\nPresione Enter para continuar...")
+    
+    def ver_historial_modificaciones(self):
+        #historial de modificaciones de una nota
+        self.mostrar_encabezado("HISTORIAL DE MODIFICACIONES")
+        
+        try:
+            nota_id = int(input("ID de la nota: "))
+            
+            historial = self.db.obtener_historial_modificaciones(nota_id)
+            
+            if not historial:
+                print("\nNo hay modificaciones registradas para esta nota.")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            print(f"\n{'─' * 70}")
+            for mod in historial:
+                nota_ant, nota_nueva, fecha, profesor, justif = mod
+                print(f"\nFecha: {fecha}")
+                print(f"Profesor: {profesor}")
+                print(f"Cambio: {nota_ant} → {nota_nueva}")
+                print(f"Justificación: {justif}")
+                print(f"{'─' * 70}")
+            
+        except ValueError:
+            print("\n✗ ID inválido.")
+        
+        input("\nPresione Enter para continuar...")
+    
+    def generar_reportes_profesor(self):
+        #reportes para el profesor
+        self.mostrar_encabezado("REPORTES")
+        
+        print("1. Reporte de apelaciones por estado")
+        print("2. Reporte de modificaciones recientes")
+        print("3. Reporte de promedios por asignatura")
+        print("4. Estudiantes en riesgo")
+        print("5. Evolución semanal de notas por asignatura")
+        
+        opcion = input("\nSeleccione tipo de reporte: ").strip()
+        
+        if opcion == "1":
+            #reporte de apelaciones
+            print("\n" + "─" * 40)
+            print("REPORTE DE APELACIONES POR ESTADO")
+            print("─" * 40)
+            for estado, cantidad in self.db.contar_apelaciones_por_estado(self.usuario_actual.id):
+                print(f"{estado.capitalize()}: {cantidad}")
+        
+        elif opcion == "2":
+            #modificaciones recientes (ultimos 30 dias)
+            fecha_limite = (datetime.now() - timedelta(days=30)).isoformat()
+            cantidad = self.db.contar_modificaciones_profesor(self.usuario_actual.id,
+                                                              fecha_limite)
+            print(f"\nModificaciones en los últimos 30 días: {cantidad}")
+        
+        elif opcion == "3":
+            #ranking del curso sobre los promedios materializados
+            asignaturas = self.db.obtener_asignaturas_profesor(self.usuario_actual.id)
+            if not asignaturas:
+                print("\nNo tiene asignaturas asignadas.")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            print("\nAsignaturas:")
+            for i, (id_asig, codigo, nombre, creditos) in enumerate(asignaturas, 1):
+                print(f"{i}. {codigo} - {nombre}")
+            
+            try:
+                seleccion = int(input("\nSeleccione asignatura: ")) - 1
+                id_asig, codigo, nombre, _ = asignaturas[seleccion]
+            except (ValueError, IndexError):
+                print("\n✗ Selección inválida.")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            desplazamiento = 0
+            while True:
+                ranking = self.servicio.ranking_asignatura(id_asig, 20, desplazamiento)
+                print("\n" + "─" * 70)
+                print(f"RANKING {codigo} - {nombre} ({ranking['total']} estudiantes)")
+                print("─" * 70)
+                print(f"{'Pos.':<6} {'Estudiante':<35} {'Promedio':<10} {'Percentil':<10} Cuartil")
+                for fila in ranking["estudiantes"]:
+                    print(f"{fila['posicion']:<6} {fila['nombre']:<35} "
+                          f"{fila['promedio_final']:<10.2f} {fila['percentil']:<10.1f} "
+                          f"{fila['cuartil']}")
+                desplazamiento += 20
+                if desplazamiento >= ranking["total"]:
+                    break
+                if input("\nEnter para ver más, 0 para terminar: ").strip() == "0":
+                    break
+        
+        elif opcion == "4":
+            #alertas de la ultima ejecucion del proceso nocturno
+            alertas = self.servicio.obtener_alertas(profesor_id=self.usuario_actual.id)
+            print("\n" + "─" * 80)
+            print("ESTUDIANTES EN RIESGO")
+            print("─" * 80)
+            if not alertas:
+                print("No hay estudiantes en riesgo.")
+            for alerta in alertas:
+                necesaria = (f"{alerta['nota_necesaria']:.2f}"
+                             if alerta["nota_necesaria"] is not None else "-")
+                print(f"{alerta['codigo']:<10} {alerta['nombre']:<30} "
+                      f"Promedio: {alerta['promedio_actual']:.2f}  "
+                      f"Necesita: {necesaria:<6} {alerta['nivel'].upper()}")
+        
+        elif opcion == "5":
+            #series pre-agregadas; antes se incorporan los cambios pendientes
+            asignaturas = self.db.obtener_asignaturas_profesor(self.usuario_actual.id)
+            if not asignaturas:
+                print("\nNo tiene asignaturas asignadas.")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            print("\nAsignaturas:")
+            for i, (id_asig, codigo, nombre, creditos) in enumerate(asignaturas, 1):
+                print(f"{i}. {codigo} - {nombre}")
+            
+            try:
+                seleccion = int(input("\nSeleccione asignatura: ")) - 1
+                id_asig, codigo, nombre, _ = asignaturas[seleccion]
+            except (ValueError, IndexError):
+                print("\n✗ Selección inválida.")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            self.servicio.actualizar_series()
+            serie = self.servicio.serie_asignatura(id_asig, paso="semana")
+            print("\n" + "─" * 70)
+            print(f"EVOLUCIÓN SEMANAL {codigo} - {nombre}")
+            print("─" * 70)
+            if not serie:
+                print("La asignatura aún no tiene notas.")
+            else:
+                print(f"{'Semana al':<12} {'Notas':>6} {'Promedio':>9} {'Mediana':>8} "
+                      f"{'Aprobados':>10}")
+            for punto in serie:
+                if not punto["cantidad"]:
+                    continue
+                barra = "█" * round(punto["promedio"] * 4)
+                print(f"{punto['fecha']:<12} {punto['cantidad']:>6} {punto['promedio']:>9.2f} "
+                      f"{punto['mediana']:>8.2f} {punto['aprobados']:>9.1f}% {barra}")
+        
+        input("\nPresione Enter para continuar...")
+    
+    def buscar_texto(self):
+        #busqueda en justificaciones, apelaciones y respuestas del profesor
+        self.mostrar_encabezado("BUSCAR")
+        
+        consulta = input("Palabras a buscar: ").strip()
+        if not consulta:
+            return
+        
+        desplazamiento = 0
+        while True:
+            resultados = self.db.buscar_texto(consulta, profesor_id=self.usuario_actual.id,
+                                              limite=10, desplazamiento=desplazamiento)
+            if not resultados:
+                print("\nNo hay más resultados." if desplazamiento else "\nSin resultados.")
+                break
+            
+            for r in resultados:
+                print(f"\n{'─' * 70}")
+                print(f"{r['origen'].capitalize()} {r['id']} | Nota {r['nota_id']} | {r['fecha'][:10]}")
+                print(r["fragmento"])
+            
+            if len(resultados) < 10:
+                break
+            if input("\n¿Ver más resultados? (s/n): ").strip().lower() != "s":
+                break
+            desplazamiento += 10
+        
+        input("\nPresione Enter para continuar...")
+    
+    #metodos para estudiantes
+    def consultar_calificaciones(self):
+        #consultar sus calificaciones
+        self.mostrar_encabezado("MIS CALIFICACIONES")
+        
+        #seleccionar asignatura
+        asignaturas = self.db.obtener_asignaturas_estudiante(self.usuario_actual.id)
+        
+        if not asignaturas:
+            print("No está inscrito en ninguna asignatura.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        print("Asignaturas:")
+        for i, (id_asig, codigo, nombre, creditos, profesor) in enumerate(asignaturas, 1):
+            print(f"{i}. {codigo} - {nombre} (Prof. {profesor})")
+        
+        try:
+            idx = int(input("\nSeleccione asignatura: ")) - 1
+            asignatura_id = asignaturas[idx][0]
+            asignatura_nombre = asignaturas[idx][2]
+        except:
+            print("\n✗ Selección inválida.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        #notas
+        notas = self.db.obtener_notas_estudiante(self.usuario_actual.id, asignatura_id)
+        
+        if not notas:
+            print(f"\nNo hay calificaciones registradas para {asignatura_nombre}.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        print(f"\n{'═' * 70}")
+        print(f"CALIFICACIONES - {asignatura_nombre}")
+        print(f"{'═' * 70}")
+        
+        for corte in [1, 2, 3]:
+            notas_corte = [n for n in notas if n.corte == corte]
+            if notas_corte:
+                print(f"\n{'─' * 70}")
+                print(f"CORTE {corte}")
+                print(f"{'─' * 70}")
+                for nota in notas_corte:
+                    print(f"\nActividad: {nota.actividad}")
+                    print(f"Nota: {nota.nota} | Porcentaje: {nota.porcentaje}%")
+                    print(f"Fecha: {nota.fecha_registro.strftime('%Y-%m-%d')}")
+                    print(f"Justificación: {nota.justificacion}")
+                
+                promedio = self.servicio.calcular_promedio_corte(
+                    self.usuario_actual.id, asignatura_id, corte
+                )
+                print(f"\n→ Promedio Corte {corte}: {promedio}")
+        
+        promedio_final = self.servicio.calcular_promedio_final(
+            self.usuario_actual.id, asignatura_id
+        )
+        print(f"\n{'═' * 70}")
+        print(f"PROMEDIO FINAL: {promedio_final}")
+        print(f"{'═' * 70}")
+        
+        input("\nPresione Enter para continuar...")
+    
+    def ver_promedios_cortes(self):
+        #ver promedios por corte
+        self.mostrar_encabezado("PROMEDIOS POR CORTE")
+        
+        asignaturas = self.db.obtener_asignaturas_estudiante(self.usuario_actual.id)
+        
+        if not asignaturas:
+            print("No está inscrito en ninguna asignatura.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        print(f"{'Asignatura':<30} {'Corte 1':<10} {'Corte 2':<10} {'Corte 3':<10}")
+        print("─" * 70)
+        
+        for id_asig, codigo, nombre, creditos, profesor in asignaturas:
+            promedios = []
+            for corte in [1, 2, 3]:
+                prom = self.servicio.calcular_promedio_corte(
+                    self.usuario_actual.id, id_asig, corte
+                )
+                promedios.append(f"{prom:.2f}" if prom > 0 else "---")
+            
+            print(f"{nombre:<30} {promedios[0]:<10} {promedios[1]:<10} {promedios[2]:<10}")
+        
+        input("\nPresione Enter para continuar...")
+    
+    def calcular_promedio_final(self):
+        #promedio final de todas las asignaturas
+        self.mostrar_encabezado("PROMEDIOS FINALES")
+        
+        asignaturas = self.db.obtener_asignaturas_estudiante(self.usuario_actual.id)
+        
+        if not asignaturas:
+            print("No está inscrito en ninguna asignatura.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        print(f"{'Asignatura':<40} {'Promedio Final':<15} {'Estado':<10}")
+        print("─" * 70)
+        
+        for id_asig, codigo, nombre, creditos, profesor in asignaturas:
+            promedio = self.servicio.calcular_promedio_final(
+                self.usuario_actual.id, id_asig
+            )
+            estado = "Aprobado" if promedio >= 3.0 else "Reprobado"
+            color = "✓" if promedio >= 3.0 else "✗"
+            
+            print(f"{nombre:<40} {promedio:<15.2f} {color} {estado}")
+            posicion = self.servicio.posicion_estudiante(self.usuario_actual.id, id_asig)
+            if posicion:
+                print(f"{'':<4}Puesto {posicion['posicion']} de {posicion['total']} "
+                      f"(percentil {posicion['percentil']:.1f})")
+        
+        acumulado = self.servicio.calcular_promedio_acumulado(self.usuario_actual.id)
+        print("─" * 70)
+        print(f"{'Promedio acumulado (ponderado por créditos)':<40} "
+              f"{acumulado['promedio_acumulado']:<15.2f} {acumulado['creditos']} créditos")
+        
+        input("\nPresione Enter para continuar...")
+    
+    def simular_notas(self):
+        #simular escenarios de notas
+        self.mostrar_encabezado("SIMULADOR DE NOTAS")
+        
+        #seleccionar asignatura
+        asignaturas = self.db.obtener_asignaturas_estudiante(self.usuario_actual.id)
+        
+        if not asignaturas:
+            print("No está inscrito en ninguna asignatura.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        print("Asignaturas:")
+        for i, (id_asig, codigo, nombre, creditos, profesor) in enumerate(asignaturas, 1):
+            print(f"{i}. {codigo} - {nombre}")
+        
+        try:
+            idx = int(input("\nSeleccione asignatura: ")) - 1
+            asignatura_id = asignaturas[idx][0]
+            asignatura_nombre = asignaturas[idx][2]
+        except:
+            print("\n✗ Selección inválida.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        try:
+            nota_objetivo = float(input("\n¿Qué nota final desea obtener? (0.0 - 5.0): "))
+            
+            if not self.logica.validar_nota(nota_objetivo):
+                print("\n✗ La nota debe estar entre 0.0 y 5.0")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            resultado = self.servicio.simular_nota_necesaria(
+                self.usuario_actual.id, asignatura_id, nota_objetivo
+            )
+            
+            print(f"\n{'═' * 70}")
+            print(f"SIMULACIÓN PARA {asignatura_nombre}")
+            print(f"{'═' * 70}")
+            print(f"Promedio actual: {resultado['promedio_actual']:.2f}")
+            print(f"Nota objetivo: {resultado['nota_objetivo']:.2f}")
+            print(f"Porcentaje completado: {resultado['porcentaje_completado']:.1f}%")
+            print(f"Porcentaje faltante: {resultado['porcentaje_faltante']:.1f}%")
+            print(f"\nNota necesaria en actividades restantes: {resultado['nota_necesaria']:.2f}")
+            
+            if resultado['es_alcanzable']:
+                print("✓ ¡Es alcanzable!")
+            else:
+                print("✗ No es alcanzable con las actividades restantes, cancele materia bro")
+            
+        except ValueError:
+            print("\n✗ Valor inválido.")
+        
+        input("\nPresione Enter para continuar...")
+    
+    def crear_apelacion(self):
+        #crear una apelación
+        self.mostrar_encabezado("CREAR APELACIÓN")
+        
+        try:
+            nota_id = int(input("ID de la nota a apelar: "))
+            
+            #verificar que la nota existe Y pertenece al estudiante
+            nota = self.db.obtener_nota(nota_id)
+            
+            if not nota:
+                print("\n✗ Nota no encontrada.")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            if nota.estudiante_id != self.usuario_actual.id:
+                print("\n✗ Esta nota no le pertenece.")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            fecha_nota = nota.fecha_registro
+            fecha_actual = datetime.now()
+            
+            #validar plazo usando logica formal
+            if not self.logica.dentro_plazo_apelacion(fecha_nota, fecha_actual, 5):
+                print("\n✗ El plazo para apelar esta nota ha expirado (máximo 5 días).")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            descripcion = input("\nDescripción de la apelación (mín. 50 caracteres): ").strip()
+            
+            if not self.logica.validar_apelacion(descripcion):
+                print("\n✗ La apelación debe tener al menos 50 caracteres y estar bien fundamentada.")
+                input("\nPresione Enter para continuar...")
+                return
+            
+            apelacion = Apelacion(
+                id=None,
+                nota_id=nota_id,
+                estudiante_id=self.usuario_actual.id,
+                descripcion=descripcion,
+                estado=EstadoApelacion.PENDIENTE,
+                fecha_creacion=datetime.now(),
+                respuesta_profesor=None,
+                fecha_respuesta=None
+            )
+            
+            apelacion_id = self.db.crear_apelacion(apelacion)
+            print(f"\n✓ Apelación creada exitosamente (ID: {apelacion_id})")
+            
+        except ValueError:
+            print("\n✗ ID inválido.")
+        
+        input("\nPresione Enter para continuar...")
+    
+    def ver_mis_apelaciones(self):
+        #apelaciones del estudiante
+        self.mostrar_encabezado("MIS APELACIONES")
+        
+        apelaciones = self.db.obtener_apelaciones_estudiante(self.usuario_actual.id)
+        respondidas = self._tomar_avisos()
+        
+        if not apelaciones:
+            print("No tiene apelaciones registradas.")
+            input("\nPresione Enter para continuar...")
+            return
+        
+        for apel in apelaciones:
+            print(f"\n{'═' * 70}")
+            print(f"ID: {apel.id} | Estado: {apel.estado.value.upper()}"
+                  + ("  ★ RESPUESTA NUEVA" if apel.id in respondidas else ""))
+            print(f"Fecha creación: {apel.fecha_creacion.strftime('%Y-%m-%d %H:%M')}")
+            print(f"{'─' * 70}")
+            print(f"Su solicitud:\n{apel.descripcion}")
+            
+            if apel.respuesta_profesor:
+                print(f"\n{'─' * 70}")
+                print(f"Respuesta del profesor ({apel.fecha_respuesta.strftime('%Y-%m-%d %H:%M')}):")
+                print(f"{apel.respuesta_profesor}")
+        
+        print(f"\n{'═' * 70}")
+        input("\nPresione Enter para continuar...")
+
+
+def auditar_porcentajes(db_name: str = "calificaciones.db", fragmentos: int = 0):
+    #reporte en formato JSON lines, una linea por corte mal ponderado
+    db = abrir_base_datos(db_name, fragmentos=fragmentos)
+    hallazgos = 0
+    for hallazgo in db.iterar_auditoria_porcentajes():
+        print(json.dumps(hallazgo, ensure_ascii=False))
+        hallazgos += 1
+    return 1 if hallazgos else 0
+
+
+def actualizar_alertas(db_name: str = "calificaciones.db", umbral: Optional[float] = None,
+                       completo: bool = False, periodo: Optional[str] = None,
+                       fragmentos: int = 0):
+    #pensado para ejecutarse cada noche desde cron; imprime el resumen en JSON
+    db = abrir_base_datos(db_name, reutilizar_conexion=True, fragmentos=fragmentos)
+    try:
+        resumen = ServicioCalificaciones(db).actualizar_alertas(umbral, completo, periodo)
+    finally:
+        db.cerrar()
+    print(json.dumps(resumen, ensure_ascii=False))
+    return 0
+
+
+def auditar_historial(db_name: str = "calificaciones.db", fragmentos: int = 0):
+    #analisis completo de historial_modificaciones; imprime el resumen en JSON
+    db = abrir_base_datos(db_name, fragmentos=fragmentos)
+    print(json.dumps(AnalizadorHistorial(db).ejecutar(), ensure_ascii=False))
+    return 0
+
+
+def actualizar_series(db_name: str = "calificaciones.db", completo: bool = False,
+                      fragmentos: int = 0):
+    #como actualizar_alertas, pensado para cron; imprime el resumen en JSON
+    db = abrir_base_datos(db_name, reutilizar_conexion=True, fragmentos=fragmentos)
+    try:
+        resumen = ServicioCalificaciones(db).actualizar_series(completo)
+    finally:
+        db.cerrar()
+    print(json.dumps(resumen, ensure_ascii=False))
+    return 0
+
+
+def ejecutar_respaldo(destino: str, db_name: str = "calificaciones.db", incremental: bool = False,
+                     comprimir: bool = False, paginas: int = 256, pausa: float = 0.0,
+                     fragmentos: int = 0, registrar_cambios: bool = False):
+    #una linea JSON por archivo respaldado
+    db = abrir_base_datos(db_name, fragmentos=fragmentos)
+    if incremental:
+        resultados = db.respaldar_cambios(destino, comprimir)
+    else:
+        resultados = db.respaldar(destino, paginas, pausa, comprimir, registrar_cambios)
+    for resultado in resultados:
+        print(json.dumps(resultado, ensure_ascii=False))
+    return 0
+
+
+def ejecutar_batch(origen: str, db_name: str = "calificaciones.db", tamano_lote: int = 256,
+                   fragmentos: int = 0, perfilador: Optional[Perfilador] = None):
+    #todas las solicitudes usan una sola conexion compartida
+    from calificaciones.api import ProcesadorComandos
+    db = abrir_base_datos(db_name, reutilizar_conexion=True, fragmentos=fragmentos)
+    procesador = ProcesadorComandos(db)
+    if perfilador is not None:
+        perfilador.instrumentar(procesador.servicio)
+        perfilador.instrumentar(procesador, procesador.operaciones())
+    try:
+        if origen == "-":
+            procesador.procesar_flujo(sys.stdin, sys.stdout, tamano_lote)
+        else:
+            with open(origen, encoding="utf-8") as entrada:
+                procesador.procesar_flujo(entrada, sys.stdout, tamano_lote)
+    finally:
+        db.cerrar()
+    return 0
+
+
+def destinos_notificaciones(archivo: Optional[str] = None, correo: Optional[str] = None,
+                            webhook: Optional[str] = None) -> List:
+    from calificaciones.notificaciones import DestinoArchivo, DestinoCorreoLocal, DestinoWebhook
+    destinos = []
+    if archivo:
+        destinos.append(DestinoArchivo(archivo))
+    if correo:
+        destinos.append(DestinoCorreoLocal(correo))
+    if webhook:
+        destinos.append(DestinoWebhook(webhook))
+    return destinos
+
+
+def despachar_notificaciones(db_name: str = "calificaciones.db", destinos: Optional[List] = None,
+                             fragmentos: int = 0):
+    #una pasada sobre la bandeja (p. ej. desde cron); imprime el resumen en JSON
+    from calificaciones.notificaciones import DespachadorNotificaciones
+    if not destinos:
+        print("✗ Indique al menos un destino: --notificar-log, --notificar-correo "
+              "o --notificar-webhook", file=sys.stderr)
+        return 2
+    db = abrir_base_datos(db_name, reutilizar_conexion=True, fragmentos=fragmentos)
+    despachador = DespachadorNotificaciones(db, destinos)
+    try:
+        resumen = despachador.despachar()
+        resumen["bandeja"] = db.resumen_bandeja()
+        if despachador.ultimo_error:
+            resumen["ultimo_error"] = despachador.ultimo_error
+    finally:
+        for destino in destinos:
+            destino.cerrar()
+        db.cerrar()
+    print(json.dumps(resumen, ensure_ascii=False))
+    return 0
+
+
+def ejecutar_servidor(host: str = "127.0.0.1", puerto: int = 8080,
+                      db_name: str = "calificaciones.db", trabajadores: int = 8,
+                      agrupar_escrituras: bool = False, fragmentos: int = 0,
+                      perfilador: Optional[Perfilador] = None,
+                      archivo_sesiones: Optional[str] = None,
+                      notificaciones: Optional[List] = None):
+    from calificaciones.api import ServidorCalificaciones
+    sesiones = AlmacenSesionesSQLite(archivo_sesiones) if archivo_sesiones else None
+    servidor = ServidorCalificaciones((host, puerto), db_name, trabajadores,
+                                      registrar_accesos=True,
+                                      agrupar_escrituras=agrupar_escrituras,
+                                      fragmentos=fragmentos, sesiones=sesiones,
+                                      notificaciones=notificaciones)
+    if perfilador is not None:
+        perfilador.instrumentar(servidor.procesador.servicio)
+        perfilador.instrumentar(servidor.procesador, servidor.procesador.operaciones())
+    print(f"✓ API de calificaciones en http://{host}:{puerto} ({trabajadores} trabajadores)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n✓ Servidor detenido.")
+    finally:
+        servidor.server_close()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sistema de Gestión de Calificaciones")
+    parser.add_argument("--db", default="calificaciones.db", help="archivo de base de datos")
+    parser.add_argument("--fragmentos", type=int, default=0,
+                        help="repartir las notas en N archivos por asignatura; --db es el catálogo")
+    parser.add_argument("--auditar-porcentajes", action="store_true",
+                        help="listar cortes cuyo porcentaje total no es 100%% (JSON lines)")
+    parser.add_argument("--auditar-historial", action="store_true",
+                        help="buscar patrones inusuales en el historial de modificaciones "
+                             "y guardarlos en hallazgos_auditoria")
+    parser.add_argument("--alertas", action="store_true",
+                        help="actualizar las alertas de estudiantes en riesgo (incremental)")
+    parser.add_argument("--series", action="store_true",
+                        help="incorporar a las series diarias de notas los cambios pendientes")
+    parser.add_argument("--completo", action="store_true",
+                        help="con --alertas, reevaluar todas las inscripciones; "
+                             "con --series, reconstruirlas")
+    parser.add_argument("--umbral", type=float,
+                        help="con --alertas, nota necesaria desde la que se alerta")
+    parser.add_argument("--periodo", help="con --alertas, limitar a un periodo")
+    parser.add_argument("--respaldo", metavar="DESTINO",
+                        help="respaldo en línea de --db (y sus fragmentos) en DESTINO")
+    parser.add_argument("--incremental", action="store_true",
+                        help="con --respaldo, solo los cambios desde el último respaldo")
+    parser.add_argument("--registrar-cambios", action="store_true",
+                        help="con --respaldo completo, iniciar la cadena de respaldos "
+                             "--incremental: registra desde ahora cada escritura")
+    parser.add_argument("--comprimir", action="store_true", help="con --respaldo, usar gzip")
+    parser.add_argument("--paginas", type=int, default=256,
+                        help="con --respaldo, páginas copiadas por paso")
+    parser.add_argument("--pausa", type=float, default=0.0,
+                        help="con --respaldo, segundos de espera entre pasos")
+    parser.add_argument("--restaurar", nargs="+", metavar="ARCHIVO",
+                        help="restaurar en --db un respaldo completo seguido de sus incrementales")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="ARCHIVO",
+                        help="modo no interactivo: solicitudes JSON lines desde ARCHIVO o stdin")
+    parser.add_argument("--tamano-lote", type=int, default=256,
+                        help="solicitudes leídas y respondidas por lote en modo --batch")
+    parser.add_argument("--servidor", action="store_true",
+                        help="iniciar la API HTTP JSON en lugar del menú interactivo")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--trabajadores", type=int, default=8,
+                        help="hilos del pool del servidor HTTP")
+    parser.add_argument("--agrupar-escrituras", action="store_true",
+                        help="confirmar en grupo las notas registradas por el servidor")
+    parser.add_argument("--sesiones", metavar="ARCHIVO",
+                        help="con --servidor, guardar las sesiones en este archivo SQLite "
+                             "para compartirlas entre procesos (por defecto en memoria)")
+    parser.add_argument("--notificar-log", metavar="ARCHIVO",
+                        help="entregar los avisos de apelaciones en ARCHIVO (JSON lines)")
+    parser.add_argument("--notificar-correo", metavar="DIRECTORIO",
+                        help="entregar los avisos como mensajes .eml en DIRECTORIO")
+    parser.add_argument("--notificar-webhook", metavar="URL",
+                        help="entregar los avisos por lotes con POST JSON a URL")
+    parser.add_argument("--despachar", action="store_true",
+                        help="entregar una vez los avisos pendientes a los destinos "
+                             "--notificar-* y salir; sin él, --servidor los entrega "
+                             "en segundo plano")
+    parser.add_argument("--perfil", nargs="?", const="perfil_calificaciones", metavar="PREFIJO",
+                        help="perfilar la sesión y escribir PREFIJO.collapsed/.txt/.pstats "
+                             f"al salir (también con {Perfilador.ENTORNO}=PREFIJO)")
+    parser.add_argument("--memoria", type=float, metavar="MB",
+                        help="presupuesto de las caches en memoria y de la cache de "
+                             f"páginas de SQLite (también con {ENTORNO_MEMORIA}=MB; "
+                             f"por omisión {MB_PREDETERMINADOS})")
+    args = parser.parse_args(argv)
+    if args.memoria:
+        configurar_presupuesto(args.memoria)
+    perfilador = Perfilador.desde_entorno(args.perfil)
+
+    if args.auditar_porcentajes:
+        return auditar_porcentajes(args.db, args.fragmentos)
+
+    if args.auditar_historial:
+        return auditar_historial(args.db, args.fragmentos)
+
+    if args.alertas:
+        return actualizar_alertas(args.db, args.umbral, args.completo, args.periodo,
+                                  args.fragmentos)
+
+    if args.series:
+        return actualizar_series(args.db, args.completo, args.fragmentos)
+
+    if args.respaldo:
+        return ejecutar_respaldo(args.respaldo, args.db, args.incremental, args.comprimir,
+                                 args.paginas, args.pausa, args.fragmentos,
+                                 args.registrar_cambios)
+
+    if args.restaurar:
+        print(json.dumps(restaurar_respaldo(args.restaurar[0], args.restaurar[1:], args.db),
+                         ensure_ascii=False))
+        return 0
+
+    destinos = destinos_notificaciones(args.notificar_log, args.notificar_correo,
+                                       args.notificar_webhook)
+    if args.despachar:
+        return despachar_notificaciones(args.db, destinos, args.fragmentos)
+
+    if args.batch:
+        return ejecutar_batch(args.batch, args.db, args.tamano_lote, args.fragmentos,
+                              perfilador)
+
+    if args.servidor:
+        return ejecutar_servidor(args.host, args.puerto, args.db, args.trabajadores,
+                                 args.agrupar_escrituras, args.fragmentos, perfilador,
+                                 args.sesiones, destinos)
+
+    try:
+        app = InterfazCLI(args.db, args.fragmentos, perfilador)
+        app.iniciar()
+    except KeyboardInterrupt:
+        print("\n\n✓ Sistema cerrado correctamente.")
+    except Exception as e:
+        print(f"\n✗ Error del sistema: {e}")
+        import traceback
+        traceback.print_exc()
+    return 0
@@ -0,0 +1,241 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#presupuesto de memoria del proceso: las caches (rosters, promedios) guardan
+#sus entradas en un solo LRU con un limite de bytes, asi una cache muy usada
+#desplaza a las demas en lugar de crecer sin tope. El mismo presupuesto fija
+#la cache de paginas de cada conexion SQLite. Las sesiones no estan aqui: un
+#LRU las cerraria estando vigentes
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ENTORNO = "CALIFICACIONES_MEMORIA_MB"
+MB_PREDETERMINADOS = 64
+
+#fraccion del presupuesto para la cache de paginas de una conexion; con el
+#presupuesto predeterminado son los 2 MB que SQLite usa por omision
+FRACCION_CACHE_SQLITE = 32
+
+#bytes por entrada fuera de su valor y su clave: las tuplas (espacio, clave)
+#y (valor, tamano) y el nodo del OrderedDict
+SOBRECARGA_ENTRADA = 160
+
+
+def tamano_aproximado(valor: Any, _vistos: Optional[set] = None) -> int:
+    #bytes de valor y lo que contiene (tuplas, listas, dicts, conjuntos y
+    #atributos de objetos); cada objeto compartido se cuenta una vez
+    vistos = set() if _vistos is None else _vistos
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    total = sys.getsizeof(valor)
+    if isinstance(valor, (str, bytes, int, float, bool)) or valor is None:
+        return total
+    if isinstance(valor, dict):
+        for clave, contenido in valor.items():
+            total += tamano_aproximado(clave, vistos) + tamano_aproximado(contenido, vistos)
+    elif isinstance(valor, (tuple, list, set, frozenset)):
+        for contenido in valor:
+            total += tamano_aproximado(contenido, vistos)
+    elif hasattr(valor, "__dict__"):
+        total += tamano_aproximado(vars(valor), vistos)
+    return total
+
+
+def rss_maximo() -> Optional[int]:
+    #pico de memoria residente del proceso en bytes (None si el sistema no
+    #lo informa). En Linux se lee VmHWM: ru_maxrss se hereda del padre al
+    #crear el proceso y ocultaria el pico propio de un subproceso
+    try:
+        with open("/proc/self/status", encoding="ascii") as estado:
+            for linea in estado:
+                if linea.startswith("VmHWM:"):
+                    return int(linea.split()[1]) << 10
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #macOS lo informa en bytes y los demas en KiB
+    return pico if sys.platform == "darwin" else pico << 10
+
+
+class PresupuestoMemoria:
+    #LRU compartido: (espacio, clave) -> (valor, bytes). Guardar por encima de
+    #limite descarta las entradas menos usadas de cualquier cache; una entrada
+    #mayor que el limite no se guarda. Cada cache (CacheAcotada) es un espacio
+    #propio y se cuenta por su nombre en estadisticas()
+
+    def __init__(self, limite: int = MB_PREDETERMINADOS << 20):
+        self.limite = limite
+        self.usado = 0
+        self._entradas: "OrderedDict[Tuple[int, Hashable], Tuple[Any, int]]" = OrderedDict()
+        #espacio -> [nombre, al_descartar, entradas]
+        self._espacios: Dict[int, List] = {}
+        #nombre -> [aciertos, fallos, descartadas]
+        self._contadores: Dict[str, List[int]] = {}
+        self._candado = threading.RLock()
+
+    def cache(self, nombre: str,
+              al_descartar: Optional[Callable[[Hashable, Any], None]] = None) -> "CacheAcotada":
+        #al_descartar(clave, valor) se llama cuando el LRU saca una entrada de
+        #esta cache para hacer espacio (no al quitarla con descartar o vaciar)
+        with self._candado:
+            espacio = len(self._espacios)
+            self._espacios[espacio] = [nombre, al_descartar, 0]
+            self._contadores.setdefault(nombre, [0, 0, 0])
+        return CacheAcotada(self, espacio, nombre)
+
+    def ajustar(self, limite: int):
+        with self._candado:
+            self.limite = limite
+            self._liberar(0)
+
+    def kib_cache_sqlite(self) -> int:
+        return max(64, (self.limite // FRACCION_CACHE_SQLITE) >> 10)
+
+    def obtener(self, espacio: int, clave: Hashable, defecto: Any = None) -> Any:
+        with self._candado:
+            entrada = self._entradas.get((espacio, clave))
+            contador = self._contadores[self._espacios[espacio][0]]
+            if entrada is None:
+                contador[1] += 1
+                return defecto
+            contador[0] += 1
+            self._entradas.move_to_end((espacio, clave))
+            return entrada[0]
+
+    def guardar(self, espacio: int, clave: Hashable, valor: Any,
+                tamano: Optional[int] = None) -> bool:
+        #False si la entrada sola supera el limite (y no queda guardada)
+        tamano = ((tamano_aproximado(valor) if tamano is None else tamano)
+                  + tamano_aproximado(clave) + SOBRECARGA_ENTRADA)
+        with self._candado:
+            self._quitar((espacio, clave))
+            if tamano > self.limite:
+                return False
+            self._liberar(tamano)
+            self._entradas[(espacio, clave)] = (valor, tamano)
+            self._espacios[espacio][2] += 1
+            self.usado += tamano
+            return True
+
+    def descartar(self, espacio: int, clave: Hashable) -> Any:
+        with self._candado:
+            entrada = self._quitar((espacio, clave))
+            return None if entrada is None else entrada[0]
+
+    def vaciar(self, espacio: Optional[int] = None):
+        with self._candado:
+            if espacio is None:
+                self._entradas.clear()
+                for datos in self._espacios.values():
+                    datos[2] = 0
+                self.usado = 0
+                return
+            for llave in [llave for llave in self._entradas if llave[0] == espacio]:
+                self._quitar(llave)
+
+    def cantidad(self, espacio: int) -> int:
+        return self._espacios[espacio][2]
+
+    def claves(self, espacio: int) -> List[Hashable]:
+        with self._candado:
+            return [clave for (propio, clave) in self._entradas if propio == espacio]
+
+    def estadisticas(self) -> Dict:
+        with self._candado:
+            por_cache = {nombre: {"entradas": 0, "bytes": 0, "aciertos": aciertos,
+                                  "fallos": fallos, "descartadas": descartadas}
+                         for nombre, (aciertos, fallos, descartadas)
+                         in self._contadores.items()}
+            for (espacio, _), (_, tamano) in self._entradas.items():
+                datos = por_cache[self._espacios[espacio][0]]
+                datos["entradas"] += 1
+                datos["bytes"] += tamano
+            return {"limite": self.limite, "usado": self.usado, "caches": por_cache}
+
+    def _quitar(self, llave: Tuple[int, Hashable]) -> Optional[Tuple[Any, int]]:
+        entrada = self._entradas.pop(llave, None)
+        if entrada is not None:
+            self.usado -= entrada[1]
+            self._espacios[llave[0]][2] -= 1
+        return entrada
+
+    def _liberar(self, necesario: int):
+        #saca entradas de la mas antigua en adelante hasta que quepa necesario
+        while self._entradas and self.usado + necesario > self.limite:
+            (espacio, clave), (valor, tamano) = self._entradas.popitem(last=False)
+            self.usado -= tamano
+            nombre, al_descartar, _ = self._espacios[espacio]
+            self._espacios[espacio][2] -= 1
+            self._contadores[nombre][2] += 1
+            if al_descartar is not None:
+                al_descartar(clave, valor)
+
+
+class CacheAcotada:
+    #vista tipo dict de un espacio del presupuesto; las lecturas la marcan
+    #como usada recientemente
+
+    def __init__(self, presupuesto: PresupuestoMemoria, espacio: int, nombre: str):
+        self.presupuesto = presupuesto
+        self.espacio = espacio
+        self.nombre = nombre
+
+    def get(self, clave: Hashable, defecto: Any = None) -> Any:
+        return self.presupuesto.obtener(self.espacio, clave, defecto)
+
+    def guardar(self, clave: Hashable, valor: Any, tamano: Optional[int] = None) -> bool:
+        return self.presupuesto.guardar(self.espacio, clave, valor, tamano)
+
+    def __setitem__(self, clave: Hashable, valor: Any):
+        self.guardar(clave, valor)
+
+    def pop(self, clave: Hashable, defecto: Any = None) -> Any:
+        valor = self.presupuesto.descartar(self.espacio, clave)
+        return defecto if valor is None else valor
+
+    def __delitem__(self, clave: Hashable):
+        self.presupuesto.descartar(self.espacio, clave)
+
+    def clear(self):
+        self.presupuesto.vaciar(self.espacio)
+
+    def __len__(self) -> int:
+        return self.presupuesto.cantidad(self.espacio)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.presupuesto.claves(self.espacio))
+
+
+_compartido: Optional[PresupuestoMemoria] = None
+_candado_compartido = threading.Lock()
+
+
+def presupuesto_compartido() -> PresupuestoMemoria:
+    #el presupuesto del proceso; su limite sale de configurar_presupuesto o de
+    #la variable CALIFICACIONES_MEMORIA_MB (por omision MB_PREDETERMINADOS)
+    global _compartido
+    with _candado_compartido:
+        if _compartido is None:
+            megas = float(os.environ.get(ENTORNO, "").strip() or MB_PREDETERMINADOS)
+            _compartido = PresupuestoMemoria(int(megas * (1 << 20)))
+        return _compartido
+
+
+def configurar_presupuesto(megas: float) -> PresupuestoMemoria:
+    #fija el limite del presupuesto compartido (p. ej. --memoria); las
+    #conexiones abiertas conservan su cache de paginas hasta cerrarse
+    presupuesto = presupuesto_compartido()
+    presupuesto.ajustar(int(megas * (1 << 20)))
+    return presupuesto
@@ -0,0 +1,80 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#entidades del dominio y su conversion a JSON
+
+from dataclasses import dataclass, asdict, is_dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional
+
+
+class EstadoApelacion(Enum):
+
+    PENDIENTE = "pendiente"
+    APROBADA = "aprobada"
+    RECHAZADA = "rechazada"
+
+
+@dataclass
+class Usuario:
+    id: int
+    username: str
+    password: str
+    rol: str
+    nombre_completo: str
+
+
+@dataclass
+class Nota:
+    id: Optional[int]
+    estudiante_id: int
+    asignatura_id: int
+    corte: int
+    actividad: str
+    nota: float
+    porcentaje: float
+    fecha_registro: datetime
+    profesor_id: int
+    justificacion: str
+    #se incrementa en cada modificacion (control de concurrencia optimista)
+    version: int = 0
+
+
+class ConflictoVersion(Exception):
+    #la nota cambio entre la lectura y la modificacion
+    def __init__(self, nota_id: int, version_esperada: int, version_actual: int):
+        super().__init__(
+            f"La nota {nota_id} fue modificada por otra sesión "
+            f"(versión esperada {version_esperada}, actual {version_actual})"
+        )
+        self.nota_id = nota_id
+        self.version_esperada = version_esperada
+        self.version_actual = version_actual
+
+
+@dataclass
+class Apelacion:
+    id: Optional[int]
+    nota_id: int
+    estudiante_id: int
+    descripcion: str
+    estado: EstadoApelacion
+    fecha_creacion: datetime
+    respuesta_profesor: Optional[str]
+    fecha_respuesta: Optional[datetime]
+
+
+def a_json(valor: Any) -> Any:
+    #convierte dataclasses, enums y fechas en valores serializables
+    if is_dataclass(valor):
+        return {k: a_json(v) for k, v in asdict(valor).items()}
+    if isinstance(valor, Enum):
+        return valor.value
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    if isinstance(valor, dict):
+        return {k: a_json(v) for k, v in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [a_json(v) for v in valor]
+    return valor
@@ -0,0 +1,184 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#entrega de los avisos de apelaciones. BaseDatos los deja en
+#bandeja_notificaciones en la misma transaccion que la apelacion; aqui un hilo
+#los toma por lotes y los pasa a uno o varios destinos, reintentando con
+#espera exponencial. La entrega es "al menos una vez": si un destino falla se
+#reintenta el lote completo en todos, asi que quien recibe descarta repetidos
+#por id
+
+import abc
+import json
+import os
+import threading
+import urllib.request
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+from calificaciones.almacenamiento import BaseDatos
+
+ASUNTOS = {
+    "apelacion_creada": "Nueva apelación de {actividad} (nota {nota})",
+    "apelacion_respondida": "Su apelación de {actividad} fue {estado}",
+}
+
+
+class DestinoNotificaciones(abc.ABC):
+    #recibe un lote de avisos (dicts de tomar_notificaciones_pendientes) y
+    #lanza una excepcion si no pudo entregarlo completo
+
+    @abc.abstractmethod
+    def entregar(self, lote: List[Dict]):
+        ...
+
+    def cerrar(self):
+        pass
+
+
+class DestinoArchivo(DestinoNotificaciones):
+    #un aviso por linea (JSON lines) al final del archivo
+
+    def __init__(self, archivo: str):
+        self.archivo = archivo
+
+    def entregar(self, lote: List[Dict]):
+        with open(self.archivo, "a", encoding="utf-8") as salida:
+            salida.write("".join(json.dumps(aviso, ensure_ascii=False) + "\n"
+                                 for aviso in lote))
+
+
+class DestinoCorreoLocal(DestinoNotificaciones):
+    #un mensaje .eml por aviso en un directorio (buzon de prueba, sin SMTP);
+    #el nombre es el id del aviso, asi un reintento reescribe el mismo archivo
+
+    def __init__(self, directorio: str, remitente: str = "calificaciones@localhost",
+                 direccion: str = "usuario{}@localhost"):
+        self.directorio = directorio
+        self.remitente = remitente
+        self.direccion = direccion
+        os.makedirs(directorio, exist_ok=True)
+
+    def entregar(self, lote: List[Dict]):
+        for aviso in lote:
+            mensaje = EmailMessage()
+            mensaje["From"] = self.remitente
+            mensaje["To"] = self.direccion.format(aviso["destinatario_id"])
+            mensaje["Subject"] = ASUNTOS.get(aviso["evento"], aviso["evento"]).format(
+                **aviso["datos"])
+            mensaje["Message-ID"] = f"<notificacion-{aviso['id']}@calificaciones>"
+            mensaje.set_content(json.dumps(aviso["datos"], ensure_ascii=False, indent=2))
+            archivo = os.path.join(self.directorio, f"{aviso['id']}.eml")
+            with open(archivo + ".tmp", "wb") as salida:
+                salida.write(bytes(mensaje))
+            os.replace(archivo + ".tmp", archivo)
+
+
+class DestinoWebhook(DestinoNotificaciones):
+    #un POST JSON por lote: {"notificaciones": [...]}; cualquier respuesta
+    #fuera de 2xx (o sin respuesta en tiempo_maximo) hace reintentar el lote
+
+    def __init__(self, url: str, tiempo_maximo: float = 10.0,
+                 encabezados: Optional[Dict[str, str]] = None):
+        self.url = url
+        self.tiempo_maximo = tiempo_maximo
+        self.encabezados = {"Content-Type": "application/json", **(encabezados or {})}
+
+    def entregar(self, lote: List[Dict]):
+        cuerpo = json.dumps({"notificaciones": lote}, ensure_ascii=False).encode("utf-8")
+        peticion = urllib.request.Request(self.url, data=cuerpo, method="POST",
+                                          headers=self.encabezados)
+        with urllib.request.urlopen(peticion, timeout=self.tiempo_maximo) as respuesta:
+            if not 200 <= respuesta.status < 300:
+                raise OSError(f"El webhook respondió {respuesta.status}")
+
+
+class DespachadorNotificaciones:
+    #vacia la bandeja por lotes de hasta lote avisos. despachar() hace una
+    #pasada (util desde cron); iniciar() la repite en un hilo cada intervalo
+    #segundos, o antes si se llama despertar() tras crear o responder una
+    #apelacion. Un lote fallido se reintenta tras espera_base * 2^intentos
+    #segundos (hasta espera_maxima) y queda 'fallida' tras max_intentos
+
+    def __init__(self, db: BaseDatos, destinos: List[DestinoNotificaciones], lote: int = 100,
+                 intervalo: float = 1.0, espera_base: float = 2.0,
+                 espera_maxima: float = 300.0, max_intentos: int = 10, reserva: float = 60.0):
+        self.db = db
+        self.destinos = destinos
+        self.lote = lote
+        self.intervalo = intervalo
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.max_intentos = max_intentos
+        self.reserva = reserva
+        self.entregadas = 0
+        self.reprogramadas = 0
+        self.ultimo_error: Optional[str] = None
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def despachar(self) -> Dict[str, int]:
+        #entrega todo lo que ya toca; lo que falla no vuelve a salir en esta pasada
+        resumen = {"lotes": 0, "entregadas": 0, "reprogramadas": 0}
+        while True:
+            lote = self.db.tomar_notificaciones_pendientes(self.lote, self.reserva)
+            if not lote:
+                break
+            resumen["lotes"] += 1
+            ids = [aviso["id"] for aviso in lote]
+            try:
+                for destino in self.destinos:
+                    destino.entregar(lote)
+            except Exception as e:
+                self.ultimo_error = f"{type(destino).__name__}: {e}"
+                self.db.reprogramar_notificaciones(ids, self.ultimo_error, self.espera_base,
+                                                   self.espera_maxima, self.max_intentos)
+                resumen["reprogramadas"] += len(ids)
+            else:
+                self.db.confirmar_notificaciones(ids)
+                resumen["entregadas"] += len(ids)
+            if len(lote) < self.lote:
+                break
+        self.entregadas += resumen["entregadas"]
+        self.reprogramadas += resumen["reprogramadas"]
+        return resumen
+
+    def despertar(self):
+        self._despertar.set()
+
+    def iniciar(self) -> "DespachadorNotificaciones":
+        if self._hilo is None:
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name="despachador", daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self, drenar: bool = True):
+        #con drenar hace una ultima pasada para no dejar avisos que ya tocaban
+        if self._hilo is not None:
+            self._detener.set()
+            self._despertar.set()
+            self._hilo.join()
+            self._hilo = None
+        if drenar:
+            self.despachar()
+        for destino in self.destinos:
+            destino.cerrar()
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            if self._detener.is_set():
+                break
+            try:
+                self.despachar()
+            except Exception as e:
+                #p. ej. la base ocupada: se reintenta en la siguiente pasada
+                self.ultimo_error = f"{type(e).__name__}: {e}"
+        self.db.cerrar()
+
+    def estado(self) -> Dict:
+        return {"entregadas": self.entregadas, "reprogramadas": self.reprogramadas,
+                "ultimo_error": self.ultimo_error, "bandeja": self.db.resumen_bandeja()}
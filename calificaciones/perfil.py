@@ -0,0 +1,228 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#perfilado opcional de sesiones (--perfil)
+
+import atexit
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class Perfilador:
+    #perfilado opcional de una sesion: cada accion envuelta es una seccion.
+    #Un hilo muestrea las pilas de los hilos que estan dentro de una seccion
+    #(pilas colapsadas para flamegraph.pl / speedscope) y la seccion mas
+    #externa de cada momento se mide ademas con cProfile para el resumen
+
+    ENTORNO = "CALIFICACIONES_PERFIL"
+
+    def __init__(self, destino: str = "perfil_calificaciones", intervalo: float = 0.005,
+                 funciones_resumen: int = 30):
+        self.destino = destino
+        self.intervalo = intervalo
+        self.funciones_resumen = funciones_resumen
+        self.muestras: Counter = Counter()
+        #seccion -> [llamadas, segundos totales, segundos maximo]
+        self.secciones: Dict[str, List[float]] = {}
+        self.estadisticas: Optional[pstats.Stats] = None
+        self._perfil = cProfile.Profile()
+        self._perfil_en_uso = threading.Lock()
+        self._activos: Dict[int, Tuple[Any, str]] = {}
+        self._candado = threading.Lock()
+        self._local = threading.local()
+        self._detener = threading.Event()
+        self._muestreador: Optional[threading.Thread] = None
+        self._codigos_internos = set()
+        self._escrito = False
+
+    @classmethod
+    def desde_entorno(cls, destino: Optional[str] = None) -> Optional["Perfilador"]:
+        #--perfil tiene prioridad; la variable vale "1" o el prefijo de salida
+        destino = destino or os.environ.get(cls.ENTORNO, "").strip()
+        if not destino or destino == "0":
+            return None
+        perfilador = cls() if destino == "1" else cls(destino)
+        perfilador.iniciar()
+        return perfilador
+
+    def iniciar(self):
+        if self._muestreador is None:
+            self._muestreador = threading.Thread(target=self._muestrear, daemon=True,
+                                                 name="perfilador")
+            self._muestreador.start()
+            atexit.register(self._al_salir)
+
+    def detener(self) -> List[str]:
+        #idempotente; devuelve los archivos escritos
+        self._detener.set()
+        if self._muestreador is not None:
+            self._muestreador.join()
+        if self._escrito:
+            return []
+        self._escrito = True
+        return self.escribir()
+
+    def _al_salir(self):
+        archivos = self.detener()
+        if archivos:
+            print(f"✓ Perfil escrito en {', '.join(archivos)}", file=sys.stderr)
+
+    @contextmanager
+    def seccion(self, nombre: str):
+        #pila por hilo de [nombre, segundos en pausa]; solo la seccion mas
+        #externa se muestrea y perfila
+        pila = getattr(self._local, "pila", None)
+        if pila is None:
+            pila = self._local.pila = []
+            self._local.perfilando = False
+        externa = not pila
+        entrada = [nombre, 0.0]
+        pila.append(entrada)
+        if externa:
+            self._local.raiz = sys._getframe(2)
+            self._reanudar()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - inicio - entrada[1]
+            if externa:
+                self._suspender()
+            pila.pop()
+            with self._candado:
+                datos = self.secciones.setdefault(nombre, [0, 0.0, 0.0])
+                datos[0] += 1
+                datos[1] += duracion
+                datos[2] = max(datos[2], duracion)
+
+    @contextmanager
+    def pausa(self):
+        #el tiempo esperando al usuario no cuenta en las secciones abiertas
+        pila = getattr(self._local, "pila", None)
+        if not pila:
+            yield
+            return
+        self._suspender()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            espera = time.perf_counter() - inicio
+            for entrada in pila:
+                entrada[1] += espera
+            self._reanudar()
+
+    def sin_medir(self, funcion):
+        perfilador = self
+
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            with perfilador.pausa():
+                return funcion(*args, **kwargs)
+        return envuelta
+
+    def _reanudar(self):
+        with self._candado:
+            self._activos[threading.get_ident()] = (self._local.raiz, self._local.pila[0][0])
+        #cProfile solo admite un perfil activo a la vez en 3.12+
+        self._local.perfilando = self._perfil_en_uso.acquire(blocking=False)
+        if self._local.perfilando:
+            self._perfil.enable()
+
+    def _suspender(self):
+        if self._local.perfilando:
+            self._perfil.disable()
+            self._perfil_en_uso.release()
+            self._local.perfilando = False
+        with self._candado:
+            self._activos.pop(threading.get_ident(), None)
+
+    def envolver(self, funcion, nombre: str):
+        perfilador = self
+
+        @functools.wraps(funcion)
+        def envuelta(*args, **kwargs):
+            with perfilador.seccion(nombre):
+                return funcion(*args, **kwargs)
+        self._codigos_internos.add(envuelta.__code__)
+        return envuelta
+
+    def instrumentar(self, objeto: Any, metodos: Optional[Tuple[str, ...]] = None):
+        #reemplaza en la instancia los metodos indicados (o todos los publicos)
+        clase = type(objeto).__name__
+        if metodos is None:
+            metodos = tuple(nombre for nombre in dir(type(objeto))
+                            if not nombre.startswith("_") and callable(getattr(objeto, nombre)))
+        for nombre in metodos:
+            setattr(objeto, nombre, self.envolver(getattr(objeto, nombre), f"{clase}.{nombre}"))
+        return objeto
+
+    def _muestrear(self):
+        archivo_propio = __file__
+        while not self._detener.wait(self.intervalo):
+            with self._candado:
+                activos = dict(self._activos)
+            if not activos:
+                continue
+            marcos = sys._current_frames()
+            for hilo, (raiz, nombre) in activos.items():
+                marco = marcos.get(hilo)
+                pila = []
+                while marco is not None and marco is not raiz:
+                    codigo = marco.f_code
+                    if codigo not in self._codigos_internos and not (
+                            codigo.co_filename == archivo_propio
+                            and codigo.co_name in ("seccion", "__enter__", "__exit__")):
+                        pila.append(f"{codigo.co_name} "
+                                    f"({os.path.basename(codigo.co_filename)}:"
+                                    f"{codigo.co_firstlineno})")
+                    marco = marco.f_back
+                pila.append(nombre)
+                self.muestras[";".join(reversed(pila))] += 1
+            del marcos
+
+    def escribir(self) -> List[str]:
+        #<destino>.collapsed (pilas colapsadas), <destino>.txt (resumen)
+        #y <destino>.pstats si hubo secciones perfiladas con cProfile
+        archivos = []
+        colapsado = f"{self.destino}.collapsed"
+        with open(colapsado, "w", encoding="utf-8") as salida:
+            for pila, cuenta in sorted(self.muestras.items()):
+                salida.write(f"{pila} {cuenta}\n")
+        archivos.append(colapsado)
+
+        try:
+            self.estadisticas = pstats.Stats(self._perfil)
+        except TypeError:
+            self.estadisticas = None
+        if self.estadisticas is not None:
+            binario = f"{self.destino}.pstats"
+            self.estadisticas.dump_stats(binario)
+            archivos.append(binario)
+
+        resumen = f"{self.destino}.txt"
+        with open(resumen, "w", encoding="utf-8") as salida:
+            salida.write(f"Secciones ({sum(self.muestras.values())} muestras cada "
+                         f"{self.intervalo * 1000:g} ms)\n\n")
+            salida.write(f"{'seccion':<48} {'llamadas':>9} {'total s':>10} "
+                         f"{'media ms':>10} {'max ms':>10}\n")
+            for nombre, (llamadas, total, maximo) in sorted(
+                    self.secciones.items(), key=lambda item: item[1][1], reverse=True):
+                salida.write(f"{nombre:<48} {llamadas:>9} {total:>10.3f} "
+                             f"{total / llamadas * 1000:>10.2f} {maximo * 1000:>10.2f}\n")
+            if self.estadisticas is not None:
+                salida.write("\nFunciones con mayor tiempo acumulado (cProfile)\n\n")
+                self.estadisticas.stream = salida
+                self.estadisticas.sort_stats("cumulative").print_stats(self.funciones_resumen)
+                salida.write("\nFunciones con mayor tiempo propio (cProfile)\n\n")
+                self.estadisticas.sort_stats("tottime").print_stats(self.funciones_resumen)
+        archivos.append(resumen)
+        return archivos
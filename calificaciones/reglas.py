@@ -0,0 +1,182 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#reglas de la logica formal del sistema; no depende de la base de datos.
+#NumPy (opcional) se importa la primera vez que se usa una regla en lote
+
+from datetime import datetime
+from enum import IntFlag
+from typing import Any, List, Optional, Tuple
+
+
+_NUMPY_SIN_CARGAR = object()
+_np: Any = _NUMPY_SIN_CARGAR
+
+
+def _numpy():
+    #None si NumPy no esta instalado
+    global _np
+    if _np is _NUMPY_SIN_CARGAR:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = None
+    return _np
+
+
+def __getattr__(nombre: str):
+    #calificaciones.reglas.np sigue disponible, pero se importa al pedirlo
+    if nombre == "np":
+        return _numpy()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+
+class CodigoError(IntFlag):
+    #codigos por fila para validacion en lote, combinables con |
+    NINGUNO = 0
+    NOTA_INVALIDA = 1
+    PORCENTAJE_INVALIDO = 2
+    JUSTIFICACION_CORTA = 4
+    FUERA_DE_PLAZO = 8
+
+
+class ReglasLogicas:
+    
+    TOLERANCIA_PORCENTAJE = 0.01
+    NOTA_MINIMA = 0.0
+    NOTA_MAXIMA = 5.0
+    PORCENTAJE_MINIMO = 0
+    PORCENTAJE_MAXIMO = 100
+    LONGITUD_MINIMA_JUSTIFICACION = 20
+    # porcentajes 1er corte y 2do corte = 30%, 3er corte = 40%
+    PESOS_CORTE = {1: 0.3, 2: 0.3, 3: 0.4}
+    NOTA_APROBATORIA = 3.0
+    #nota necesaria a partir de la cual se alerta al estudiante en riesgo
+    UMBRAL_ALERTA = 4.0
+     
+    @staticmethod
+    def validar_nota(nota: float) -> bool:
+        return ReglasLogicas.NOTA_MINIMA <= nota <= ReglasLogicas.NOTA_MAXIMA
+    
+    @staticmethod
+    def validar_porcentaje(porcentaje: float) -> bool:
+        return ReglasLogicas.PORCENTAJE_MINIMO <= porcentaje <= ReglasLogicas.PORCENTAJE_MAXIMO
+    
+    @staticmethod
+    def validar_justificacion(texto: str) -> bool:
+        return len(texto.strip()) >= ReglasLogicas.LONGITUD_MINIMA_JUSTIFICACION
+    
+    @staticmethod
+    def validar_apelacion(texto: str) -> bool:
+        return len(texto.strip()) >= 20
+    
+    @staticmethod
+    def dentro_plazo_apelacion(fecha_nota: datetime, fecha_actual: datetime, dias_limite: int = 3) -> bool:
+        diferencia = fecha_actual - fecha_nota
+        return diferencia.days <= dias_limite
+    
+    @staticmethod
+    def puede_modificar_nota(rol: str, es_propietario: bool) -> bool:
+        return rol == "profesor" and es_propietario
+    
+    @staticmethod
+    def suma_porcentajes_correcta(porcentajes: List[float]) -> bool:
+        return abs(sum(porcentajes) - 100.0) < ReglasLogicas.TOLERANCIA_PORCENTAJE
+    
+    @staticmethod
+    def porcentaje_acumulado_valido(total_actual: float, porcentaje: float) -> bool:
+        #un corte nunca puede superar el 100% de actividades
+        return total_actual + porcentaje <= 100.0 + ReglasLogicas.TOLERANCIA_PORCENTAJE
+    
+    @staticmethod
+    def inferir_necesidad_nota(nota_actual: float, nota_objetivo: float, 
+                               porcentaje_restante: float, porcentaje_faltante: float) -> float:
+        if porcentaje_faltante == 0:
+            return 0.0
+        nota_necesaria = ReglasLogicas.nota_necesaria_sin_limite(
+            nota_actual, nota_objetivo, porcentaje_restante, porcentaje_faltante)
+        return max(0.0, min(5.0, nota_necesaria))
+
+    @staticmethod
+    def nota_necesaria_sin_limite(nota_actual: float, nota_objetivo: float,
+                                  porcentaje_restante: float, porcentaje_faltante: float) -> float:
+        #misma inferencia sin recortar a [0, 5]: mayor que NOTA_MAXIMA es inalcanzable;
+        #sin porcentaje faltante el objetivo ya se cumplio (0.0) o no (infinito)
+        puntos_actuales = nota_actual * (porcentaje_restante / 100)
+        puntos_necesarios = nota_objetivo - puntos_actuales
+        if porcentaje_faltante <= 0:
+            return 0.0 if puntos_necesarios <= 0 else float("inf")
+        return (puntos_necesarios * 100) / porcentaje_faltante
+
+    #versiones en lote: reciben columnas (arreglos NumPy o secuencias) y
+    #devuelven mascaras booleanas. Usan las mismas constantes que las reglas
+    #escalares; sin NumPy se aplican las reglas escalares fila por fila
+    @staticmethod
+    def validar_notas_lote(notas) -> Any:
+        np = _numpy()
+        if np is None:
+            return [ReglasLogicas.validar_nota(n) for n in notas]
+        notas = np.asarray(notas, dtype=float)
+        return (notas >= ReglasLogicas.NOTA_MINIMA) & (notas <= ReglasLogicas.NOTA_MAXIMA)
+
+    @staticmethod
+    def validar_porcentajes_lote(porcentajes) -> Any:
+        np = _numpy()
+        if np is None:
+            return [ReglasLogicas.validar_porcentaje(p) for p in porcentajes]
+        porcentajes = np.asarray(porcentajes, dtype=float)
+        return ((porcentajes >= ReglasLogicas.PORCENTAJE_MINIMO) &
+                (porcentajes <= ReglasLogicas.PORCENTAJE_MAXIMO))
+
+    @staticmethod
+    def validar_justificaciones_lote(textos) -> Any:
+        #el texto no se vectoriza: strip() define la regla y se respeta tal cual
+        resultado = [ReglasLogicas.validar_justificacion(t) for t in textos]
+        np = _numpy()
+        if np is None:
+            return resultado
+        return np.fromiter(resultado, dtype=bool, count=len(resultado))
+
+    @staticmethod
+    def dentro_plazo_apelacion_lote(fechas_nota, fecha_actual: datetime,
+                                    dias_limite: int = 3) -> Any:
+        np = _numpy()
+        if np is None:
+            return [ReglasLogicas.dentro_plazo_apelacion(f, fecha_actual, dias_limite)
+                    for f in fechas_nota]
+        fechas = np.asarray(fechas_nota, dtype="datetime64[us]")
+        diferencia = np.datetime64(fecha_actual, "us") - fechas
+        #division entera hacia abajo, igual que timedelta.days
+        dias = diferencia // np.timedelta64(1, "D")
+        return dias <= dias_limite
+
+    @staticmethod
+    def validar_lote(notas, porcentajes, justificaciones,
+                     fechas_nota=None, fecha_actual: Optional[datetime] = None,
+                     dias_limite: int = 3) -> Tuple[Any, Any]:
+        #devuelve (mascara_valida, codigos) con un CodigoError por fila
+        verificaciones = [
+            (ReglasLogicas.validar_notas_lote(notas), CodigoError.NOTA_INVALIDA),
+            (ReglasLogicas.validar_porcentajes_lote(porcentajes), CodigoError.PORCENTAJE_INVALIDO),
+            (ReglasLogicas.validar_justificaciones_lote(justificaciones),
+             CodigoError.JUSTIFICACION_CORTA),
+        ]
+        if fechas_nota is not None:
+            fecha_actual = fecha_actual or datetime.now()
+            verificaciones.append((
+                ReglasLogicas.dentro_plazo_apelacion_lote(fechas_nota, fecha_actual, dias_limite),
+                CodigoError.FUERA_DE_PLAZO
+            ))
+
+        np = _numpy()
+        if np is None:
+            codigos = [CodigoError.NINGUNO] * len(verificaciones[0][0])
+            for mascara, codigo in verificaciones:
+                codigos = [c if ok else c | codigo for c, ok in zip(codigos, mascara)]
+            return [c == CodigoError.NINGUNO for c in codigos], codigos
+
+        codigos = np.zeros(len(verificaciones[0][0]), dtype=np.uint8)
+        for mascara, codigo in verificaciones:
+            codigos |= np.where(mascara, 0, int(codigo)).astype(np.uint8)
+        return codigos == 0, codigos
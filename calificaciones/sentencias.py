@@ -0,0 +1,674 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#registro central de las sentencias SQL de BaseDatos y de las sesiones, por
+#nombre. Todas se ejecutan a traves de RegistroSentencias, que mide llamadas,
+#filas y tiempo de cada una. El texto de cada sentencia es fijo, o una
+#plantilla cuyas partes ({esquema}, {filtro}, ...) toman pocos valores, asi la
+#cache de sentencias preparadas de cada conexion (TAMANO_CACHE_SENTENCIAS)
+#compila cada variante una sola vez. El DDL del esquema, el control de
+#transacciones y los respaldos por archivo no pasan por aqui
+
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+#sentencias preparadas que conserva cada conexion (sqlite3 usa 128): alcanza
+#para todas las variantes del registro con el maximo de fragmentos adjuntos
+TAMANO_CACHE_SENTENCIAS = 1024
+
+#filas leidas por paso al recorrer un resultado con iterar
+TAMANO_LOTE_FLUJO = 500
+
+
+def redondeo_sql(expresion: str, decimales: int = 2) -> str:
+    #round() de Python en SQL puro, para triggers y consultas que corren en
+    #cualquier conexion (sin funciones registradas). ROUND de SQLite redondea
+    #la representacion decimal y difiere en valores como 1.015. Aqui se
+    #compara el valor binario exacto x*10^d (producto exacto de Dekker) con
+    #la mitad entre dos enteros; los empates exactos van al par
+    #expresion se repite: debe ser una columna o algo igual de barato
+    factor = 10 ** decimales
+    x = f"({expresion})"
+    y = f"({x} * {factor})"
+    piso = f"(CAST({y} AS INTEGER) - ({y} < CAST({y} AS INTEGER)))"
+    alto = f"(134217729.0 * {x} - (134217729.0 * {x} - {x}))"
+    error = f"(({alto} * {factor} - {y}) + ({x} - {alto}) * {factor})"
+    diferencia = f"(({y} - ({piso} + 0.5)) + {error})"
+    return (f"(({piso} + CASE WHEN {diferencia} > 0 THEN 1 WHEN {diferencia} < 0 THEN 0"
+            f" ELSE {piso} % 2 != 0 END) / {factor}.0)")
+
+
+SENTENCIAS: Dict[str, str] = {
+    #usuarios y asignaturas
+    "usuarios.autenticar": '''
+        SELECT id, username, password, rol, nombre_completo FROM usuarios
+        WHERE username = ? AND password = ?
+    ''',
+    "asignaturas.por_profesor": '''
+        SELECT id, codigo, nombre, creditos
+        FROM asignaturas WHERE profesor_id = ?
+    ''',
+    "asignaturas.profesor": '''
+        SELECT profesor_id FROM asignaturas WHERE id = ?
+    ''',
+    "asignaturas.por_estudiante": '''
+        SELECT a.id, a.codigo, a.nombre, a.creditos, u.nombre_completo
+        FROM asignaturas a
+        JOIN inscripciones i ON a.id = i.asignatura_id
+        JOIN usuarios u ON a.profesor_id = u.id
+        WHERE i.estudiante_id = ?
+    ''',
+
+    #notas e historial
+    "totales_corte.obtener": '''
+        SELECT porcentaje_total FROM totales_corte
+        WHERE estudiante_id = ? AND asignatura_id = ? AND corte = ?
+    ''',
+    "notas.insertar": '''
+        INSERT INTO notas (estudiante_id, asignatura_id, corte, actividad, nota,
+                           porcentaje, fecha_registro, profesor_id, justificacion)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    "notas.valor_version": "SELECT nota, version FROM notas WHERE id = ?",
+    "notas.actualizar": '''
+        UPDATE notas SET nota = ?, justificacion = ?, version = version + 1
+        WHERE id = ? AND version = ?
+    ''',
+    "notas.obtener": '''
+        SELECT id, estudiante_id, asignatura_id, corte, actividad, nota,
+               porcentaje, fecha_registro, profesor_id, justificacion, version
+        FROM notas WHERE id = ?
+    ''',
+    "notas.por_estudiante": '''
+        SELECT id, estudiante_id, asignatura_id, corte, actividad, nota,
+               porcentaje, fecha_registro, profesor_id, justificacion, version
+        FROM notas
+        WHERE estudiante_id = ?
+        ORDER BY asignatura_id, corte, fecha_registro
+    ''',
+    "notas.por_estudiante_asignatura": '''
+        SELECT id, estudiante_id, asignatura_id, corte, actividad, nota,
+               porcentaje, fecha_registro, profesor_id, justificacion, version
+        FROM notas
+        WHERE estudiante_id = ? AND asignatura_id = ?
+        ORDER BY corte, fecha_registro
+    ''',
+    "notas.porcentajes_distintos_de_100": '''
+        SELECT estudiante_id, asignatura_id, corte, SUM(porcentaje), COUNT(*)
+        FROM notas
+        GROUP BY estudiante_id, asignatura_id, corte
+        HAVING ABS(SUM(porcentaje) - 100.0) >= ?
+        ORDER BY asignatura_id, estudiante_id, corte
+    ''',
+    "historial.insertar": '''
+        INSERT INTO historial_modificaciones
+        (nota_id, nota_anterior, nota_nueva, fecha_modificacion, profesor_id, justificacion)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''',
+    "historial.por_nota": '''
+        SELECT h.nota_anterior, h.nota_nueva, h.fecha_modificacion,
+               u.nombre_completo, h.justificacion
+        FROM historial_modificaciones h
+        JOIN usuarios u ON h.profesor_id = u.id
+        WHERE h.nota_id = ?
+        ORDER BY h.fecha_modificacion DESC
+    ''',
+    "historial.contar_profesor_desde": '''
+        SELECT COUNT(*)
+        FROM historial_modificaciones
+        WHERE profesor_id = ? AND fecha_modificacion >= ?
+    ''',
+    "versiones_notas.obtener": '''
+        SELECT version FROM versiones_notas
+        WHERE estudiante_id = ? AND asignatura_id = ?
+    ''',
+
+    #apelaciones
+    "apelaciones.insertar": '''
+        INSERT INTO apelaciones (nota_id, estudiante_id, descripcion, estado, fecha_creacion)
+        VALUES (?, ?, ?, ?, ?)
+    ''',
+    "apelaciones.responder": '''
+        UPDATE apelaciones
+        SET respuesta_profesor = ?, estado = ?, fecha_respuesta = ?
+        WHERE id = ?
+    ''',
+    "apelaciones.propietarios": '''
+        SELECT a.estudiante_id, n.profesor_id
+        FROM apelaciones a JOIN notas n ON a.nota_id = n.id
+        WHERE a.id = ?
+    ''',
+    "apelaciones.por_estudiante": '''
+        SELECT id, nota_id, estudiante_id, descripcion, estado,
+               fecha_creacion, respuesta_profesor, fecha_respuesta
+        FROM apelaciones WHERE estudiante_id = ?
+        ORDER BY fecha_creacion DESC
+    ''',
+    "apelaciones.por_profesor": '''
+        SELECT a.id, a.nota_id, a.estudiante_id, a.descripcion, a.estado,
+               a.fecha_creacion, u.nombre_completo, n.actividad, n.nota
+        FROM apelaciones a
+        JOIN notas n ON a.nota_id = n.id
+        JOIN usuarios u ON a.estudiante_id = u.id
+        WHERE n.profesor_id = ?
+        ORDER BY a.fecha_creacion DESC
+    ''',
+    "apelaciones.contar_por_estado": '''
+        SELECT a.estado, COUNT(*)
+        FROM apelaciones a
+        JOIN notas n ON a.nota_id = n.id
+        WHERE n.profesor_id = ?
+        GROUP BY a.estado
+    ''',
+
+    #inscripciones
+    "inscripciones.roster": '''
+        SELECT DISTINCT u.id, u.nombre_completo, u.username
+        FROM inscripciones i
+        JOIN usuarios u ON u.id = i.estudiante_id
+        WHERE i.asignatura_id = ? AND u.rol = 'estudiante'
+        ORDER BY u.id
+    ''',
+    "inscripciones.version":
+        "SELECT version FROM versiones_inscripciones WHERE asignatura_id = ?",
+    "inscripciones.insertar": '''
+        INSERT INTO inscripciones (estudiante_id, asignatura_id, periodo) VALUES (?, ?, ?)
+        ON CONFLICT (estudiante_id, asignatura_id, periodo) DO NOTHING
+    ''',
+    "inscripciones.eliminar": '''
+        DELETE FROM inscripciones
+        WHERE estudiante_id = ? AND asignatura_id = ? AND periodo = ?
+    ''',
+    "inscripciones.no_estudiantes": '''
+        SELECT DISTINCT value FROM json_each(?)
+        WHERE value NOT IN (SELECT id FROM usuarios WHERE rol = 'estudiante')
+    ''',
+    "inscripciones.asignaturas_inexistentes": '''
+        SELECT DISTINCT value FROM json_each(?)
+        WHERE value NOT IN (SELECT id FROM asignaturas)
+    ''',
+    #{filtro}: vacio o un WHERE por estudiante
+    "inscripciones.promedios_por_periodo": '''
+        SELECT i.estudiante_id, i.periodo,
+               SUM(COALESCE(p.promedio_final, 0.0) * a.creditos), SUM(a.creditos)
+        FROM (SELECT DISTINCT estudiante_id, asignatura_id, periodo FROM inscripciones) i
+        JOIN asignaturas a ON a.id = i.asignatura_id
+        LEFT JOIN promedios_asignatura p
+               ON p.estudiante_id = i.estudiante_id AND p.asignatura_id = i.asignatura_id
+        {filtro}
+        GROUP BY i.estudiante_id, i.periodo
+        ORDER BY i.estudiante_id, i.periodo
+    ''',
+    "inscripciones.expediente": '''
+        SELECT i.periodo, a.id, a.codigo, a.nombre, a.creditos,
+               COALESCE(p.promedio_final, 0.0)
+        FROM (SELECT DISTINCT estudiante_id, asignatura_id, periodo FROM inscripciones) i
+        JOIN asignaturas a ON a.id = i.asignatura_id
+        LEFT JOIN promedios_asignatura p
+               ON p.estudiante_id = i.estudiante_id AND p.asignatura_id = i.asignatura_id
+        WHERE i.estudiante_id = ?
+        ORDER BY i.periodo, a.codigo
+    ''',
+    #{origen}: inscripciones i, o las cambiadas desde una marca (versiones_notas.cambios)
+    "inscripciones.estado": '''
+        WITH pares AS (
+            SELECT i.estudiante_id, i.asignatura_id, MAX(i.periodo) AS periodo
+            FROM {origen}
+            {filtro}
+            GROUP BY i.estudiante_id, i.asignatura_id
+        )
+        SELECT pa.estudiante_id, pa.asignatura_id, pa.periodo,
+               COALESCE(p.promedio_final, 0.0),
+               COALESCE((SELECT SUM(t.porcentaje_total) FROM totales_corte t
+                         WHERE t.estudiante_id = pa.estudiante_id
+                               AND t.asignatura_id = pa.asignatura_id), 0.0)
+        FROM pares pa
+        LEFT JOIN promedios_asignatura p
+               ON p.estudiante_id = pa.estudiante_id AND p.asignatura_id = pa.asignatura_id
+    ''',
+    "versiones_notas.ultima_secuencia":
+        "SELECT COALESCE(MAX(secuencia), 0) FROM {esquema}.versiones_notas",
+    #una parte de {origen} por fragmento, unidas con UNION ALL
+    "versiones_notas.cambios": '''
+        SELECT estudiante_id, asignatura_id FROM {esquema}.versiones_notas
+        WHERE secuencia > ? AND secuencia <= ?
+    ''',
+
+    #rankings
+    "ranking.asignatura": '''
+        WITH curso AS (
+            SELECT i.estudiante_id, COALESCE(p.promedio_final, 0.0) AS promedio
+            FROM (SELECT DISTINCT estudiante_id FROM inscripciones
+                  WHERE asignatura_id = ?) i
+            LEFT JOIN promedios_asignatura p
+                   ON p.estudiante_id = i.estudiante_id AND p.asignatura_id = ?
+        ), ranking AS (
+            SELECT estudiante_id, promedio,
+                   RANK() OVER (ORDER BY promedio DESC) AS posicion,
+                   PERCENT_RANK() OVER (ORDER BY promedio) AS percentil,
+                   NTILE(?) OVER (ORDER BY promedio DESC, estudiante_id) AS grupo,
+                   COUNT(*) OVER () AS total
+            FROM curso
+        )
+        SELECT r.posicion, r.estudiante_id, u.nombre_completo, r.promedio,
+               r.percentil, r.grupo, r.total
+        FROM ranking r
+        JOIN usuarios u ON u.id = r.estudiante_id
+        {filtro}
+        ORDER BY r.posicion, r.estudiante_id
+        LIMIT ? OFFSET ?
+    ''',
+    "ranking.institucion": '''
+        WITH acumulados AS (
+            SELECT i.estudiante_id,
+                   SUM(COALESCE(p.promedio_final, 0.0) * a.creditos)
+                   / SUM(a.creditos) AS exacto,
+                   SUM(a.creditos) AS creditos
+            FROM (SELECT DISTINCT estudiante_id, asignatura_id, periodo
+                  FROM inscripciones {filtro}) i
+            JOIN asignaturas a ON a.id = i.asignatura_id
+            LEFT JOIN promedios_asignatura p
+                   ON p.estudiante_id = i.estudiante_id AND p.asignatura_id = i.asignatura_id
+            GROUP BY i.estudiante_id
+            HAVING SUM(a.creditos) > 0
+        )
+        SELECT RANK() OVER (ORDER BY c.promedio DESC) AS posicion,
+               c.estudiante_id, u.nombre_completo, c.promedio, c.creditos
+        FROM (SELECT estudiante_id, creditos, ''' + redondeo_sql("exacto") + ''' AS promedio
+              FROM acumulados) c
+        JOIN usuarios u ON u.id = c.estudiante_id
+        ORDER BY posicion, c.estudiante_id
+        LIMIT ? OFFSET ?
+    ''',
+
+    #marcas de procesos incrementales
+    "marcas.obtener":
+        "SELECT proceso, secuencia FROM marcas_procesamiento WHERE proceso IN ({marcadores})",
+    "marcas.avanzar": '''
+        INSERT INTO marcas_procesamiento (proceso, secuencia) VALUES (?, ?)
+        ON CONFLICT (proceso) DO UPDATE SET
+            secuencia = MAX(secuencia, excluded.secuencia)
+    ''',
+    #solo si la marca sigue en el valor leido (rowcount 0 si otro la movio)
+    "marcas.reclamar": '''
+        INSERT INTO marcas_procesamiento (proceso, secuencia) VALUES (?, ?)
+        ON CONFLICT (proceso) DO UPDATE SET secuencia = excluded.secuencia
+        WHERE secuencia = ?
+    ''',
+
+    #alertas
+    "alertas.eliminar_periodo": "DELETE FROM alertas WHERE periodo = ?",
+    "alertas.eliminar_todas": "DELETE FROM alertas",
+    "alertas.eliminar_resuelta":
+        "DELETE FROM alertas WHERE estudiante_id = ? AND asignatura_id = ?",
+    "alertas.eliminar_inscripcion":
+        "DELETE FROM alertas WHERE estudiante_id = ? AND asignatura_id = ? AND periodo = ?",
+    "alertas.guardar": '''
+        INSERT INTO alertas (estudiante_id, asignatura_id, periodo, nivel,
+                             promedio_actual, porcentaje_completado, nota_necesaria,
+                             fecha_deteccion, fecha_actualizacion)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?8)
+        ON CONFLICT (estudiante_id, asignatura_id) DO UPDATE SET
+            periodo = excluded.periodo,
+            nivel = excluded.nivel,
+            promedio_actual = excluded.promedio_actual,
+            porcentaje_completado = excluded.porcentaje_completado,
+            nota_necesaria = excluded.nota_necesaria,
+            fecha_actualizacion = excluded.fecha_actualizacion
+    ''',
+    "alertas.listar": '''
+        SELECT al.estudiante_id, u.nombre_completo, al.asignatura_id, a.codigo, al.periodo,
+               al.nivel, al.promedio_actual, al.porcentaje_completado, al.nota_necesaria,
+               al.fecha_deteccion
+        FROM alertas al
+        JOIN asignaturas a ON a.id = al.asignatura_id
+        JOIN usuarios u ON u.id = al.estudiante_id
+        {filtro}
+        ORDER BY al.nivel = 'inalcanzable' DESC, al.nota_necesaria IS NULL DESC,
+                 al.nota_necesaria DESC, al.asignatura_id, al.estudiante_id
+        LIMIT ? OFFSET ?
+    ''',
+
+    #series de notas
+    "notas.ultimo_id": "SELECT COALESCE(MAX(id), 0) FROM {esquema}.notas",
+    "historial.ultimo_id": "SELECT COALESCE(MAX(id), 0) FROM {esquema}.historial_modificaciones",
+    "notas.contar_rango": "SELECT COUNT(*) FROM {esquema}.notas WHERE id > ? AND id <= ?",
+    "historial.contar_rango":
+        "SELECT COUNT(*) FROM {esquema}.historial_modificaciones WHERE id > ? AND id <= ?",
+    "series.vaciar": "DELETE FROM series_notas",
+    "series.acumular": '''
+        INSERT INTO main.series_notas (asignatura_id, dia, casilla, cantidad, suma)
+        SELECT asignatura_id, dia, CAST(round(valor * 10) AS INTEGER) AS casilla,
+               SUM(cantidad), SUM(cantidad * valor)
+        FROM (
+            SELECT n.asignatura_id, substr(n.fecha_registro, 1, 10) AS dia,
+                   COALESCE((SELECT h.nota_anterior
+                             FROM {esquema}.historial_modificaciones h
+                             WHERE h.nota_id = n.id ORDER BY h.id LIMIT 1),
+                            n.nota) AS valor,
+                   1 AS cantidad
+            FROM {esquema}.notas n
+            WHERE n.id > ?1 AND n.id <= ?2
+            UNION ALL
+            SELECT n.asignatura_id, substr(h.fecha_modificacion, 1, 10),
+                   h.nota_anterior, -1
+            FROM {esquema}.historial_modificaciones h
+            JOIN {esquema}.notas n ON n.id = h.nota_id
+            WHERE h.id > ?3 AND h.id <= ?4
+            UNION ALL
+            SELECT n.asignatura_id, substr(h.fecha_modificacion, 1, 10),
+                   h.nota_nueva, 1
+            FROM {esquema}.historial_modificaciones h
+            JOIN {esquema}.notas n ON n.id = h.nota_id
+            WHERE h.id > ?3 AND h.id <= ?4
+        )
+        WHERE 1
+        GROUP BY asignatura_id, dia, casilla
+        ON CONFLICT (asignatura_id, dia, casilla) DO UPDATE SET
+            cantidad = cantidad + excluded.cantidad,
+            suma = suma + excluded.suma
+    ''',
+    "series.inicial": '''
+        SELECT casilla, SUM(cantidad), SUM(suma) FROM series_notas
+        WHERE asignatura_id = ? AND dia < ?
+        GROUP BY casilla
+    ''',
+    "series.cambios": '''
+        SELECT dia, casilla, cantidad, suma FROM series_notas
+        WHERE asignatura_id = ? AND dia >= ? AND dia <= ?
+        ORDER BY dia
+    ''',
+
+    #auditoria del historial
+    "auditoria.flujo_historial": '''
+        SELECT h.fecha_modificacion, 1, h.id, h.nota_id, n.asignatura_id,
+               h.profesor_id, n.estudiante_id, h.nota_anterior, h.nota_nueva,
+               n.fecha_registro
+        FROM {esquema}.historial_modificaciones h
+        JOIN {esquema}.notas n ON n.id = h.nota_id
+        ORDER BY h.fecha_modificacion, h.id
+    ''',
+    "auditoria.flujo_apelaciones": '''
+        SELECT a.fecha_creacion, 0, a.id, a.nota_id, n.asignatura_id, n.profesor_id,
+               a.estudiante_id, NULL, NULL, NULL
+        FROM {esquema}.apelaciones a
+        JOIN {esquema}.notas n ON n.id = a.nota_id
+        ORDER BY a.fecha_creacion, a.id
+    ''',
+    "auditoria.crear_temporal": '''
+        CREATE TEMP TABLE hallazgos_nuevos (tipo, nota_id, historial_id, apelacion_id,
+            estudiante_id, asignatura_id, profesor_id, fecha, valor, detalle)
+    ''',
+    "auditoria.insertar_temporal": '''
+        INSERT INTO temp.hallazgos_nuevos (tipo, nota_id, historial_id, apelacion_id,
+            estudiante_id, asignatura_id, profesor_id, fecha, valor, detalle)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    "auditoria.vaciar": "DELETE FROM main.hallazgos_auditoria",
+    "auditoria.publicar": '''
+        INSERT INTO main.hallazgos_auditoria (tipo, nota_id, historial_id, apelacion_id,
+            estudiante_id, asignatura_id, profesor_id, fecha, valor, detalle)
+        SELECT tipo, nota_id, historial_id, apelacion_id, estudiante_id, asignatura_id,
+               profesor_id, fecha, valor, detalle
+        FROM temp.hallazgos_nuevos
+    ''',
+    "auditoria.hallazgos": '''
+        SELECT id, tipo, nota_id, historial_id, apelacion_id, estudiante_id, asignatura_id,
+               profesor_id, fecha, valor, detalle
+        FROM hallazgos_auditoria
+        {filtro}
+        ORDER BY fecha DESC, id DESC
+        LIMIT ? OFFSET ?
+    ''',
+
+    #busqueda de texto; {filtro} y los parametros salen de _filtros_busqueda
+    "busqueda.fts": '''
+        SELECT origen, id, nota_id, asignatura_id, profesor_id, fecha, fragmento, rango
+        FROM (
+            SELECT 'nota' AS origen, n.id AS id, n.id AS nota_id, n.asignatura_id,
+                   n.profesor_id, n.fecha_registro AS fecha,
+                   snippet(fts_notas, -1, '[', ']', '…', 12) AS fragmento,
+                   bm25(fts_notas) AS rango
+            FROM fts_notas JOIN notas n ON n.id = fts_notas.rowid
+            WHERE fts_notas MATCH :consulta
+            UNION ALL
+            SELECT 'apelacion', a.id, a.nota_id, n.asignatura_id, n.profesor_id,
+                   a.fecha_creacion, snippet(fts_apelaciones, -1, '[', ']', '…', 12),
+                   bm25(fts_apelaciones)
+            FROM fts_apelaciones
+            JOIN apelaciones a ON a.id = fts_apelaciones.rowid
+            JOIN notas n ON n.id = a.nota_id
+            WHERE fts_apelaciones MATCH :consulta
+            UNION ALL
+            SELECT 'modificacion', h.id, h.nota_id, n.asignatura_id, h.profesor_id,
+                   h.fecha_modificacion, snippet(fts_historial, -1, '[', ']', '…', 12),
+                   bm25(fts_historial)
+            FROM fts_historial
+            JOIN historial_modificaciones h ON h.id = fts_historial.rowid
+            JOIN notas n ON n.id = h.nota_id
+            WHERE fts_historial MATCH :consulta
+        )
+        {filtro}
+        ORDER BY rango
+        LIMIT :limite OFFSET :desplazamiento
+    ''',
+    #{en_notas}, {en_apelaciones}, {en_historial}: un LIKE por palabra
+    "busqueda.like": '''
+        SELECT origen, id, nota_id, asignatura_id, profesor_id, fecha, fragmento, 0.0
+        FROM (
+            SELECT 'nota' AS origen, n.id AS id, n.id AS nota_id, n.asignatura_id,
+                   n.profesor_id, n.fecha_registro AS fecha, n.justificacion AS fragmento
+            FROM notas n
+            WHERE {en_notas}
+            UNION ALL
+            SELECT 'apelacion', a.id, a.nota_id, n.asignatura_id, n.profesor_id,
+                   a.fecha_creacion, a.descripcion
+            FROM apelaciones a JOIN notas n ON n.id = a.nota_id
+            WHERE {en_apelaciones}
+            UNION ALL
+            SELECT 'modificacion', h.id, h.nota_id, n.asignatura_id, h.profesor_id,
+                   h.fecha_modificacion, h.justificacion
+            FROM historial_modificaciones h JOIN notas n ON n.id = h.nota_id
+            WHERE {en_historial}
+        )
+        {filtro}
+        LIMIT :limite OFFSET :desplazamiento
+    ''',
+
+    #fragmentos
+    "fragmentos.primer_id": '''
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)
+    ''',
+    "fragmentos.asignar": '''
+        INSERT OR IGNORE INTO fragmentos_asignatura (asignatura_id, fragmento)
+        VALUES (?, ?)
+    ''',
+    "fragmentos.de_asignatura":
+        "SELECT fragmento FROM fragmentos_asignatura WHERE asignatura_id = ?",
+    "fragmentos.maximo": "SELECT MAX(fragmento) FROM fragmentos_asignatura",
+    #filas de un solo archivo en el catalogo; {tabla} es una de TABLAS_FRAGMENTADAS
+    "fragmentos.filas_locales": "SELECT EXISTS (SELECT 1 FROM main.{tabla})",
+
+    #bandeja de notificaciones; las lecturas por destinatario van por
+    #fragmento ({esquema}), el despachador usa la conexion de escritura
+    "notificaciones.sin_leer": '''
+        SELECT COUNT(*) AS cantidad FROM {esquema}.bandeja_notificaciones
+        WHERE destinatario_id = ? AND id > ?
+    ''',
+    "notificaciones.contar": "SELECT COALESCE(SUM(cantidad), 0) FROM ({partes})",
+    "notificaciones.de_usuario": '''
+        SELECT id, evento, apelacion_id, nota_id, datos, fecha
+        FROM {esquema}.bandeja_notificaciones
+        WHERE destinatario_id = ? AND id > ?
+    ''',
+    "notificaciones.listar": "SELECT * FROM ({partes}) ORDER BY fecha DESC, id DESC LIMIT ?",
+    "notificaciones.ultima": '''
+        SELECT COALESCE(MAX(id), 0) FROM {esquema}.bandeja_notificaciones
+        WHERE destinatario_id = ?
+    ''',
+    "notificaciones.pendientes": '''
+        SELECT id, evento, apelacion_id, nota_id, destinatario_id, datos, fecha, intentos
+        FROM bandeja_notificaciones
+        WHERE estado = 'pendiente' AND proximo_intento <= ?
+        ORDER BY proximo_intento, id LIMIT ?
+    ''',
+    #aparta el lote hasta ?1 para que otro despachador no lo tome a la vez
+    "notificaciones.reservar": '''
+        UPDATE bandeja_notificaciones SET proximo_intento = ?
+        WHERE id IN (SELECT value FROM json_each(?))
+    ''',
+    "notificaciones.confirmar": '''
+        UPDATE bandeja_notificaciones
+        SET estado = 'entregada', intentos = intentos + 1, ultimo_error = NULL,
+            fecha_entrega = ?
+        WHERE id IN (SELECT value FROM json_each(?))
+    ''',
+    #espera exponencial: ?3 * 2^intentos, con tope ?4; 'fallida' al llegar a ?5
+    "notificaciones.reprogramar": '''
+        UPDATE bandeja_notificaciones
+        SET intentos = intentos + 1, ultimo_error = ?1,
+            proximo_intento = ?2 + MIN(?3 * (1 << MIN(intentos, 30)), ?4),
+            estado = CASE WHEN intentos + 1 >= ?5 THEN 'fallida' ELSE 'pendiente' END
+        WHERE id IN (SELECT value FROM json_each(?6))
+    ''',
+    "notificaciones.por_estado": '''
+        SELECT estado, COUNT(*) FROM bandeja_notificaciones GROUP BY estado
+    ''',
+
+    #sesiones (archivo propio, ver AlmacenSesionesSQLite)
+    "sesiones.crear": '''
+        INSERT INTO sesiones (token, usuario_id, username, rol, nombre_completo, expira)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''',
+    "sesiones.obtener": '''
+        SELECT usuario_id, username, rol, nombre_completo, expira FROM sesiones
+        WHERE token = ? AND expira > ?
+    ''',
+    "sesiones.renovar": "UPDATE sesiones SET expira = ? WHERE token = ?",
+    "sesiones.cerrar": "DELETE FROM sesiones WHERE token = ?",
+    "sesiones.purgar": "DELETE FROM sesiones WHERE expira <= ?",
+    "sesiones.contar": "SELECT COUNT(*) FROM sesiones WHERE expira > ?",
+}
+
+
+class RegistroSentencias:
+    #ejecuta sentencias de SENTENCIAS por nombre sobre una conexion o cursor
+    #y acumula por nombre [llamadas, filas, segundos, maximo, errores]. consultar
+    #y consultar_uno miden tambien la lectura de las filas; ejecutar devuelve
+    #el cursor y mide solo el primer paso (en un SELECT que se recorre despues,
+    #filas queda en 0)
+
+    def __init__(self, sentencias: Optional[Dict[str, str]] = None):
+        self.sentencias = SENTENCIAS if sentencias is None else sentencias
+        self._metricas: Dict[str, List[float]] = {}
+        self._candado = threading.Lock()
+
+    def sql(self, nombre: str, **partes: str) -> str:
+        try:
+            sql = self.sentencias[nombre]
+        except KeyError:
+            raise KeyError(f"Sentencia no registrada: {nombre}") from None
+        return sql.format(**partes) if partes else sql
+
+    def ejecutar(self, destino, nombre: str, parametros: Any = (), **partes: str):
+        sql = self.sql(nombre, **partes)
+        inicio = time.perf_counter()
+        try:
+            cursor = destino.execute(sql, parametros)
+        except Exception:
+            self._registrar(nombre, 0, time.perf_counter() - inicio, error=True)
+            raise
+        self._registrar(nombre, max(cursor.rowcount, 0), time.perf_counter() - inicio)
+        return cursor
+
+    def ejecutar_varios(self, destino, nombre: str, filas: Iterable, **partes: str):
+        sql = self.sql(nombre, **partes)
+        inicio = time.perf_counter()
+        try:
+            cursor = destino.executemany(sql, filas)
+        except Exception:
+            self._registrar(nombre, 0, time.perf_counter() - inicio, error=True)
+            raise
+        self._registrar(nombre, max(cursor.rowcount, 0), time.perf_counter() - inicio)
+        return cursor
+
+    def consultar(self, destino, nombre: str, parametros: Any = (),
+                  **partes: str) -> List[Tuple]:
+        sql = self.sql(nombre, **partes)
+        inicio = time.perf_counter()
+        try:
+            filas = destino.execute(sql, parametros).fetchall()
+        except Exception:
+            self._registrar(nombre, 0, time.perf_counter() - inicio, error=True)
+            raise
+        self._registrar(nombre, len(filas), time.perf_counter() - inicio)
+        return filas
+
+    def iterar(self, destino, nombre: str, parametros: Any = (),
+               lote: int = TAMANO_LOTE_FLUJO, **partes: str) -> Iterator[Tuple]:
+        #como consultar, pero lee lote filas a la vez: la memoria no depende
+        #del tamaño del resultado. Se mide al terminar (o abandonar) el
+        #recorrido, sin contar el tiempo de quien consume las filas
+        sql = self.sql(nombre, **partes)
+        filas, segundos, error = 0, 0.0, False
+        cursor = None
+        inicio = time.perf_counter()
+        try:
+            cursor = destino.execute(sql, parametros)
+            while True:
+                bloque = cursor.fetchmany(lote)
+                segundos += time.perf_counter() - inicio
+                if not bloque:
+                    break
+                filas += len(bloque)
+                yield from bloque
+                inicio = time.perf_counter()
+        except Exception:
+            error = True
+            segundos += time.perf_counter() - inicio
+            raise
+        finally:
+            if cursor is not None and cursor is not destino:
+                cursor.close()
+            self._registrar(nombre, filas, segundos, error=error)
+
+    def consultar_uno(self, destino, nombre: str, parametros: Any = (),
+                      **partes: str) -> Optional[Tuple]:
+        sql = self.sql(nombre, **partes)
+        inicio = time.perf_counter()
+        try:
+            fila = destino.execute(sql, parametros).fetchone()
+        except Exception:
+            self._registrar(nombre, 0, time.perf_counter() - inicio, error=True)
+            raise
+        self._registrar(nombre, fila is not None, time.perf_counter() - inicio)
+        return fila
+
+    def metricas(self, reiniciar: bool = False) -> List[Dict]:
+        #una entrada por sentencia usada, de mayor a menor tiempo total
+        with self._candado:
+            metricas = self._metricas
+            if reiniciar:
+                self._metricas = {}
+            else:
+                metricas = {nombre: list(valores) for nombre, valores in metricas.items()}
+        return [{"sentencia": nombre, "llamadas": int(llamadas), "filas": int(filas),
+                 "total_ms": round(segundos * 1000, 3),
+                 "promedio_ms": round(segundos * 1000 / llamadas, 4),
+                 "maximo_ms": round(maximo * 1000, 3), "errores": int(errores)}
+                for nombre, (llamadas, filas, segundos, maximo, errores)
+                in sorted(metricas.items(), key=lambda m: -m[1][2])]
+
+    def _registrar(self, nombre: str, filas: int, segundos: float, error: bool = False):
+        with self._candado:
+            valores = self._metricas.get(nombre)
+            if valores is None:
+                valores = self._metricas[nombre] = [0, 0, 0.0, 0.0, 0]
+            valores[0] += 1
+            valores[1] += filas
+            valores[2] += segundos
+            if segundos > valores[3]:
+                valores[3] = segundos
+            valores[4] += error
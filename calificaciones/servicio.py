@@ -0,0 +1,329 @@
+#Sistema de Gestión de Calificaciones con Lógica Formal
+#Hecho por: María José Herrera Bonilla
+
+#calculos de promedios, simulaciones, alertas, rankings y series sobre BaseDatos
+
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from calificaciones.almacenamiento import BaseDatos
+from calificaciones.memoria import PresupuestoMemoria
+from calificaciones.reglas import ReglasLogicas
+
+
+class ServicioCalificaciones:
+    
+    def __init__(self, db: BaseDatos, presupuesto: Optional[PresupuestoMemoria] = None):
+        self.db = db
+        self.logica = ReglasLogicas()
+        #(estudiante_id, asignatura_id) -> (version, {corte: promedio}, porcentaje
+        #registrado); valida mientras la version de sus notas no cambie
+        self._promedios = (presupuesto or db.presupuesto).cache("promedios")
+
+    def etag_notas(self, estudiante_id: int, asignatura_id: int) -> str:
+        #identifica el estado de las notas del estudiante en la asignatura
+        version = self.db.obtener_version_notas(estudiante_id, asignatura_id)
+        return f'"{estudiante_id}-{asignatura_id}-{version}"'
+
+    def sin_cambios(self, estudiante_id: int, asignatura_id: int,
+                    etag: Optional[str]) -> Tuple[bool, str]:
+        #(True, etag) cuando el cliente ya tiene la version actual; solo se
+        #consulta la version, nunca las filas de notas
+        actual = self.etag_notas(estudiante_id, asignatura_id)
+        if not etag:
+            return False, actual
+        candidatos = [e.strip().removeprefix("W/") for e in etag.split(",")]
+        return actual in candidatos or "*" in candidatos, actual
+    
+    def _resumen_notas(self, estudiante_id: int,
+                       asignatura_id: int) -> Tuple[Dict[int, float], float]:
+        #({corte: promedio}, porcentaje registrado) desde la cache si la version
+        #de las notas no cambio. La version se lee antes que las notas: si
+        #cambia en medio, lo guardado queda con la version vieja y se recalcula
+        version = self.db.obtener_version_notas(estudiante_id, asignatura_id)
+        guardado = self._promedios.get((estudiante_id, asignatura_id))
+        if guardado is not None and guardado[0] == version:
+            return guardado[1], guardado[2]
+        notas = self.db.obtener_notas_estudiante(estudiante_id, asignatura_id)
+        por_corte: Dict[int, List] = {}
+        for nota in notas:
+            por_corte.setdefault(nota.corte, []).append(nota)
+        promedios = {corte: round(sum(n.nota * (n.porcentaje / 100) for n in notas_corte), 2)
+                     for corte, notas_corte in por_corte.items()}
+        porcentaje = sum(n.porcentaje for n in notas)
+        self._promedios[(estudiante_id, asignatura_id)] = (version, promedios, porcentaje)
+        return promedios, porcentaje
+
+    def calcular_promedio_corte(self, estudiante_id: int, asignatura_id: int, corte: int) -> float:
+        #promedio del corte
+        return self._resumen_notas(estudiante_id, asignatura_id)[0].get(corte, 0.0)
+    
+    def calcular_promedio_final(self, estudiante_id: int, asignatura_id: int) -> float:
+        #promedio final
+        por_corte = self._resumen_notas(estudiante_id, asignatura_id)[0]
+        promedios = [por_corte.get(corte, 0.0) for corte in [1, 2, 3]]
+        
+        if not promedios:
+            return 0.0
+        
+        pesos = ReglasLogicas.PESOS_CORTE
+        promedio_ponderado = (
+            promedios[0] * pesos[1] +
+            promedios[1] * pesos[2] +
+            promedios[2] * pesos[3]
+        )
+        return round(promedio_ponderado, 2)
+    
+    def simular_nota_necesaria(self, estudiante_id: int, asignatura_id: int,
+                              nota_objetivo: float) -> Dict:
+        #simular nota necesaria para alcanzar x nota
+        #calcular promedio actual
+        promedio_actual = self.calcular_promedio_final(estudiante_id, asignatura_id)
+        
+        #calcular porcentaje completado y faltante
+        porcentaje_registrado = self._resumen_notas(estudiante_id, asignatura_id)[1]
+        porcentaje_completado = porcentaje_registrado / 3  # Dividido por 3 cortes
+        porcentaje_faltante = 100 - porcentaje_completado
+        
+        #calcular nota necesaria por inferencia
+        nota_necesaria = self.logica.inferir_necesidad_nota(
+            promedio_actual, nota_objetivo, porcentaje_completado, porcentaje_faltante
+        )
+        sin_limite = self.logica.nota_necesaria_sin_limite(
+            promedio_actual, nota_objetivo, porcentaje_completado, porcentaje_faltante
+        )
+        
+        return {
+            "promedio_actual": promedio_actual,
+            "nota_objetivo": nota_objetivo,
+            "porcentaje_completado": porcentaje_completado,
+            "porcentaje_faltante": porcentaje_faltante,
+            "nota_necesaria": nota_necesaria,
+            "es_alcanzable": sin_limite <= ReglasLogicas.NOTA_MAXIMA
+        }
+
+    def actualizar_alertas(self, umbral: Optional[float] = None, completo: bool = False,
+                           periodo: Optional[str] = None) -> Dict:
+        #alerta temprana: marca las inscripciones cuya nota necesaria para aprobar
+        #supera el umbral ("riesgo") o la nota maxima ("inalcanzable"). Misma
+        #inferencia que simular_nota_necesaria, sobre los promedios materializados.
+        #Incremental desde la ultima marca salvo la primera vez o con completo=True
+        #(necesario tras cambiar el umbral)
+        umbral = ReglasLogicas.UMBRAL_ALERTA if umbral is None else umbral
+        proceso = "alertas" if periodo is None else f"alertas:{periodo}"
+        marca = None if completo else self.db.obtener_marca_procesamiento(proceso)
+        secuencias, filas = self.db.obtener_estado_inscripciones(marca, periodo)
+
+        ahora = datetime.now().isoformat()
+        alertas, resueltas = [], []
+        for estudiante_id, asignatura_id, periodo_ins, promedio, porcentaje_total in filas:
+            completado = porcentaje_total / 3
+            necesaria = self.logica.nota_necesaria_sin_limite(
+                promedio, ReglasLogicas.NOTA_APROBATORIA, completado, 100 - completado
+            )
+            if necesaria > ReglasLogicas.NOTA_MAXIMA:
+                nivel = "inalcanzable"
+            elif necesaria > umbral:
+                nivel = "riesgo"
+            else:
+                resueltas.append((estudiante_id, asignatura_id))
+                continue
+            alertas.append((estudiante_id, asignatura_id, periodo_ins, nivel, promedio,
+                            round(completado, 2),
+                            round(necesaria, 2) if necesaria != float("inf") else None, ahora))
+
+        self.db.guardar_alertas(proceso, secuencias, alertas, resueltas,
+                                reemplazar=marca is None, periodo=periodo)
+        return {
+            "completo": marca is None,
+            "evaluadas": len(filas),
+            "en_riesgo": sum(1 for a in alertas if a[3] == "riesgo"),
+            "inalcanzables": sum(1 for a in alertas if a[3] == "inalcanzable"),
+            "resueltas": len(resueltas),
+            "secuencias": secuencias
+        }
+
+    def obtener_alertas(self, asignatura_id: Optional[int] = None,
+                        profesor_id: Optional[int] = None, nivel: Optional[str] = None,
+                        limite: int = 100, desplazamiento: int = 0) -> List[Dict]:
+        campos = ("estudiante_id", "nombre", "asignatura_id", "codigo", "periodo", "nivel",
+                  "promedio_actual", "porcentaje_completado", "nota_necesaria",
+                  "fecha_deteccion")
+        return [dict(zip(campos, fila))
+                for fila in self.db.obtener_alertas(asignatura_id, profesor_id, nivel,
+                                                    limite, desplazamiento)]
+
+    def calcular_promedio_acumulado(self, estudiante_id: int) -> Dict:
+        #promedio ponderado por creditos, acumulado y por periodo
+        filas = self.db.obtener_promedios_por_periodo(estudiante_id)
+        return self._resumen_creditos([(periodo, suma, creditos)
+                                       for _, periodo, suma, creditos in filas])
+
+    def calcular_promedios_acumulados(self) -> Dict[int, Dict]:
+        #toda la institucion con una sola consulta agrupada
+        return dict(self.iterar_promedios_acumulados())
+
+    def iterar_promedios_acumulados(self) -> Iterator[Tuple[int, Dict]]:
+        #(estudiante_id, resumen) de a un estudiante: las filas llegan ordenadas
+        #por estudiante, asi que solo se retiene el que se esta resumiendo
+        for estudiante_id, filas in groupby(self.db.iterar_promedios_por_periodo(),
+                                            key=lambda fila: fila[0]):
+            yield estudiante_id, self._resumen_creditos([(periodo, suma, creditos)
+                                                         for _, periodo, suma, creditos in filas])
+
+    def obtener_expediente(self, estudiante_id: int) -> Dict:
+        #asignaturas por periodo con su promedio final, mas los promedios ponderados
+        periodos: Dict[str, List[Dict]] = {}
+        totales = []
+        for periodo, asig_id, codigo, nombre, creditos, promedio in \
+                self.db.obtener_expediente(estudiante_id):
+            periodos.setdefault(periodo, []).append({
+                "asignatura_id": asig_id, "codigo": codigo, "nombre": nombre,
+                "creditos": creditos, "promedio_final": promedio,
+                "aprobada": promedio >= ReglasLogicas.NOTA_APROBATORIA
+            })
+        for periodo, asignaturas in periodos.items():
+            totales.append((periodo, sum(a["promedio_final"] * a["creditos"] for a in asignaturas),
+                            sum(a["creditos"] for a in asignaturas)))
+        resumen = self._resumen_creditos(totales)
+        for periodo, datos in resumen["periodos"].items():
+            datos["asignaturas"] = periodos[periodo]
+        return resumen
+
+    def ranking_asignatura(self, asignatura_id: int, limite: int = 50,
+                           desplazamiento: int = 0) -> Dict:
+        #posicion (RANK), percentil y cuartil de cada estudiante del curso, paginado
+        filas = self.db.obtener_ranking_asignatura(asignatura_id, limite, desplazamiento)
+        return {
+            "asignatura_id": asignatura_id,
+            "total": filas[0][-1] if filas else 0,
+            "limite": limite,
+            "desplazamiento": desplazamiento,
+            "estudiantes": [self._fila_ranking(fila) for fila in filas]
+        }
+
+    def posicion_estudiante(self, estudiante_id: int, asignatura_id: int) -> Optional[Dict]:
+        #None si el estudiante no esta inscrito en la asignatura
+        filas = self.db.obtener_ranking_asignatura(asignatura_id, 1, 0,
+                                                   estudiante_id=estudiante_id)
+        if not filas:
+            return None
+        posicion = self._fila_ranking(filas[0])
+        posicion["total"] = filas[0][-1]
+        return posicion
+
+    def mejores_promedios(self, limite: int = 10, desplazamiento: int = 0,
+                          periodo: Optional[str] = None) -> List[Dict]:
+        #top-N institucional por promedio ponderado por creditos
+        campos = ("posicion", "estudiante_id", "nombre", "promedio", "creditos")
+        return [dict(zip(campos, fila))
+                for fila in self.db.obtener_mejores_promedios(limite, desplazamiento, periodo)]
+
+    def actualizar_series(self, completo: bool = False) -> Dict:
+        #incremental desde la ultima marca, ver BaseDatos.actualizar_series_notas
+        return self.db.actualizar_series_notas(completo)
+
+    def serie_asignatura(self, asignatura_id: int, desde: Optional[str] = None,
+                         hasta: Optional[str] = None, paso: str = "dia") -> List[Dict]:
+        #evolucion de las notas del curso al cierre de cada dia o semana (fechas
+        #AAAA-MM-DD, por defecto el primer y el ultimo dia con cambios): cantidad,
+        #promedio, cuartiles, porcentaje aprobado y distribucion en tramos de 0.5.
+        #Se calcula con series_notas, sin leer las notas
+        if paso not in ("dia", "semana"):
+            raise ValueError("El paso debe ser 'dia' o 'semana'")
+        inicial, cambios = self.db.obtener_serie_notas(asignatura_id, desde, hasta)
+        if not (cambios or inicial or desde and hasta):
+            return []
+        #sin desde no hay acumulado inicial, asi que cambios no esta vacio
+        inicio = date.fromisoformat(desde or cambios[0][0])
+        fin = date.fromisoformat(hasta or (cambios[-1][0] if cambios else desde))
+
+        casillas = [0] * (round(ReglasLogicas.NOTA_MAXIMA * 10) + 1)
+        #notas fuera de rango guardadas antes de validarlas al escribir: se
+        #cuentan en la casilla del extremo mas cercano
+        tope = len(casillas) - 1
+        suma = 0.0
+        for casilla, (cantidad, suma_casilla) in inicial.items():
+            casillas[min(max(casilla, 0), tope)] += cantidad
+            suma += suma_casilla
+        dias = 1 if paso == "dia" else 7
+        serie = []
+        i = 0
+        while inicio <= fin:
+            cierre = min(inicio + timedelta(days=dias - 1), fin)
+            limite = cierre.isoformat()
+            while i < len(cambios) and cambios[i][0] <= limite:
+                _, casilla, cantidad, suma_casilla = cambios[i]
+                casillas[min(max(casilla, 0), tope)] += cantidad
+                suma += suma_casilla
+                i += 1
+            serie.append(self._punto_serie(limite, casillas, suma))
+            inicio = cierre + timedelta(days=1)
+        return serie
+
+    @staticmethod
+    def _punto_serie(fecha: str, casillas: List[int], suma: float) -> Dict:
+        cantidad = sum(casillas)
+        tramos = {f"{tramo / 2:.1f}": 0 for tramo in range(2 * int(ReglasLogicas.NOTA_MAXIMA))}
+        if cantidad <= 0:
+            return {"fecha": fecha, "cantidad": 0, "promedio": None, "mediana": None,
+                    "p25": None, "p75": None, "aprobados": None, "distribucion": tramos}
+        ultimo_tramo = len(tramos) - 1
+        for casilla, n in enumerate(casillas):
+            if n:
+                tramos[f"{min(casilla // 5, ultimo_tramo) / 2:.1f}"] += n
+        aprobados = sum(casillas[round(ReglasLogicas.NOTA_APROBATORIA * 10):])
+        cuartil = ServicioCalificaciones._percentil_casillas
+        return {
+            "fecha": fecha,
+            "cantidad": cantidad,
+            "promedio": round(suma / cantidad, 2),
+            "mediana": cuartil(casillas, cantidad, 0.5),
+            "p25": cuartil(casillas, cantidad, 0.25),
+            "p75": cuartil(casillas, cantidad, 0.75),
+            "aprobados": round(100 * aprobados / cantidad, 1),
+            "distribucion": tramos
+        }
+
+    @staticmethod
+    def _percentil_casillas(casillas: List[int], cantidad: int, p: float) -> float:
+        #interpolacion lineal entre posiciones, como statistics.median con p=0.5
+        posicion = p * (cantidad - 1)
+        bajo = int(posicion)
+        objetivos = (bajo, min(bajo + 1, cantidad - 1))
+        valores = []
+        acumulado = 0
+        for casilla, n in enumerate(casillas):
+            acumulado += n
+            while len(valores) < 2 and acumulado > objetivos[len(valores)]:
+                valores.append(casilla / 10)
+            if len(valores) == 2:
+                break
+        return round(valores[0] + (valores[1] - valores[0]) * (posicion - bajo), 2)
+
+    @staticmethod
+    def _fila_ranking(fila: Tuple) -> Dict:
+        #percentil: porcentaje del curso con promedio estrictamente menor
+        posicion, estudiante_id, nombre, promedio, percentil, cuartil, _ = fila
+        return {"posicion": posicion, "estudiante_id": estudiante_id, "nombre": nombre,
+                "promedio_final": promedio, "percentil": round(percentil * 100, 1),
+                "cuartil": cuartil}
+
+    @staticmethod
+    def _resumen_creditos(filas: List[Tuple]) -> Dict:
+        #filas: (periodo, suma de promedio x creditos, creditos)
+        periodos = {}
+        suma_total, creditos_total = 0.0, 0
+        for periodo, suma, creditos in filas:
+            periodos[periodo] = {
+                "promedio": round(suma / creditos, 2) if creditos else 0.0,
+                "creditos": creditos
+            }
+            suma_total += suma
+            creditos_total += creditos
+        return {
+            "promedio_acumulado": round(suma_total / creditos_total, 2) if creditos_total else 0.0,
+            "creditos": creditos_total,
+            "periodos": periodos
+        }